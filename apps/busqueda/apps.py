@@ -0,0 +1,23 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class BusquedaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.busqueda'
+    verbose_name = 'Búsqueda'
+
+    def ready(self):
+        post_migrate.connect(_asegurar_indices, sender=self)
+
+
+def _asegurar_indices(sender, using, apps, **kwargs):
+    # En SQLite, las migraciones que rehacen una tabla eliminan sus triggers
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+    from .indices import instalar
+    connection = connections[using]
+    # Solo si la migración de los índices está aplicada (no tras revertirla)
+    aplicadas = MigrationRecorder(connection).applied_migrations()
+    if apps is not None and (sender.label, '0001_indices_busqueda') in aplicadas:
+        instalar(connection, apps)
@@ -0,0 +1,112 @@
+"""
+Búsqueda de texto completo con ranking sobre los índices de
+apps.busqueda.indices, en lugar de `icontains` (LIKE '%texto%' recorre la
+tabla completa en cada búsqueda).
+
+Cada palabra del texto se busca como prefijo y todas deben aparecer:
+"reun equi" encuentra "Reunión de equipo". El motor se elige según la base
+de datos de la conexión; otros motores recurren a `icontains`.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .indices import COLUMNA_VECTOR, fts5_disponible, indice_de
+
+
+# Palabras consideradas por búsqueda (acota el tamaño de la consulta)
+MAX_PALABRAS = 8
+
+
+def palabras(texto):
+    """Palabras buscables de `texto` (letras y dígitos, en minúsculas)"""
+    return re.findall(r'\w+', texto.lower())[:MAX_PALABRAS]
+
+
+class BusquedaPostgres:
+    """tsvector con prefijos más trigramas para coincidencias dentro de palabras"""
+
+    def filtrar(self, queryset, indice, texto, ordenar):
+        meta = queryset.model._meta
+        tabla = meta.db_table
+        vector = f'"{tabla}"."{COLUMNA_VECTOR}"'
+        documento = indice.documento_sql([meta.get_field(c).column for c in indice.campos], tabla)
+        consulta = ' & '.join(f'{p}:*' for p in palabras(texto))
+        tsquery = f"to_tsquery('{indice.configuracion}'::regconfig, %s)"
+        patron = '%' + re.sub(r'([\\%_])', r'\\\1', texto.strip()) + '%'
+
+        queryset = queryset.filter(RawSQL(
+            f'({vector} @@ {tsquery} OR ({documento}) ILIKE %s)',
+            [consulta, patron],
+            output_field=BooleanField(),
+        ))
+        if ordenar:
+            queryset = queryset.annotate(rango_busqueda=RawSQL(
+                f'ts_rank({vector}, {tsquery}) + similarity(({documento}), %s)',
+                [consulta, texto],
+                output_field=FloatField(),
+            ))
+        return queryset
+
+
+class BusquedaSQLite:
+    """Tabla FTS5 del índice; el ranking es bm25"""
+
+    def filtrar(self, queryset, indice, texto, ordenar):
+        meta = queryset.model._meta
+        consulta = ' AND '.join(f'"{p}"*' for p in palabras(texto))
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {indice.nombre} WHERE {indice.nombre} MATCH %s',
+            [consulta],
+        ))
+        if ordenar:
+            # bm25 es negativo: más pequeño es más relevante
+            queryset = queryset.annotate(rango_busqueda=RawSQL(
+                f'SELECT -bm25({indice.nombre}) FROM {indice.nombre} '
+                f'WHERE {indice.nombre} MATCH %s AND rowid = "{meta.db_table}"."{meta.pk.column}"',
+                [consulta],
+                output_field=FloatField(),
+            ))
+        return queryset
+
+
+class BusquedaLike:
+    """Motores sin índice de texto: `icontains` sobre cada columna"""
+
+    def filtrar(self, queryset, indice, texto, ordenar):
+        condicion = Q()
+        for campo in indice.campos:
+            condicion |= Q(**{f'{campo}__icontains': texto.strip()})
+        queryset = queryset.filter(condicion)
+        if ordenar:
+            queryset = queryset.annotate(rango_busqueda=Value(0.0, output_field=FloatField()))
+        return queryset
+
+
+def obtener_motor():
+    """Motor de búsqueda para la base de datos configurada"""
+    if connection.vendor == 'postgresql':
+        return BusquedaPostgres()
+    if connection.vendor == 'sqlite' and fts5_disponible():
+        return BusquedaSQLite()
+    return BusquedaLike()
+
+
+def aplicar_busqueda(queryset, texto, ordenar=True):
+    """
+    Filtra `queryset` a las filas que coinciden con `texto`. Con `ordenar`
+    anota `rango_busqueda` y ordena por relevancia (y por pk descendente);
+    sin él se conserva el orden del queryset.
+    """
+    indice = indice_de(queryset.model)
+    if indice is None:
+        raise ValueError(f'{queryset.model._meta.label} no tiene índice de búsqueda')
+    if not palabras(texto):
+        return queryset.none()
+    queryset = obtener_motor().filtrar(queryset, indice, texto, ordenar)
+    if ordenar:
+        queryset = queryset.order_by('-rango_busqueda', '-pk')
+    return queryset
@@ -0,0 +1,154 @@
+"""
+Índices de texto completo de eventos, notificaciones y usuarios
+Cada índice declara el modelo y las columnas buscables. La estructura depende
+del motor:
+
+- PostgreSQL: columna generada `vector_busqueda` (tsvector, se mantiene sola
+  en cada escritura) con índice GIN, más un índice GIN de trigramas
+  (pg_trgm) sobre el texto concatenado para coincidencias dentro de palabras.
+- SQLite: tabla virtual FTS5 de contenido externo mantenida con triggers
+  (también cubren `update()`, `bulk_create` y SQL directo).
+
+`instalar()` es idempotente: lo usan la migración, el comando
+`reconstruir_indices_busqueda` y post_migrate (en SQLite, rehacer una tabla
+al migrarla elimina sus triggers).
+"""
+
+from functools import lru_cache
+
+
+COLUMNA_VECTOR = 'vector_busqueda'
+
+
+class IndiceBusqueda:
+    """Columnas de texto de un modelo que se indexan juntas"""
+
+    def __init__(self, modelo, campos, configuracion):
+        self.modelo = modelo
+        self.campos = campos
+        # Configuración de texto de PostgreSQL (stemming); 'simple' no lo aplica
+        self.configuracion = configuracion
+
+    @property
+    def nombre(self):
+        return 'busqueda_' + self.modelo.split('.')[1].lower()
+
+    def tabla(self, apps):
+        return apps.get_model(self.modelo)._meta.db_table
+
+    def columnas(self, apps):
+        meta = apps.get_model(self.modelo)._meta
+        return [meta.get_field(campo).column for campo in self.campos]
+
+    def documento_sql(self, columnas, tabla=None):
+        """Texto concatenado (misma expresión en la columna, el índice y la consulta)"""
+        prefijo = f'"{tabla}".' if tabla else ''
+        return " || ' ' || ".join(f"coalesce({prefijo}\"{c}\", '')" for c in columnas)
+
+
+INDICES = {
+    indice.modelo: indice for indice in (
+        IndiceBusqueda('eventos.Evento', ('nombre_evento', 'objetivo'), 'spanish'),
+        IndiceBusqueda('notificaciones.Notificacion', ('titulo', 'mensaje'), 'spanish'),
+        IndiceBusqueda('authentication.User', ('username', 'email', 'first_name', 'last_name'), 'simple'),
+    )
+}
+
+
+def indice_de(modelo):
+    """Índice registrado para `modelo` (clase), o None"""
+    return INDICES.get(modelo._meta.label)
+
+
+@lru_cache(maxsize=None)
+def fts5_disponible():
+    """El SQLite enlazado incluye FTS5"""
+    import sqlite3
+    conexion = sqlite3.connect(':memory:')
+    try:
+        conexion.execute('CREATE VIRTUAL TABLE prueba USING fts5(texto)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conexion.close()
+
+
+def _sql_postgres(indice, apps):
+    tabla = indice.tabla(apps)
+    documento = indice.documento_sql(indice.columnas(apps))
+    return [
+        f"""ALTER TABLE "{tabla}" ADD COLUMN IF NOT EXISTS {COLUMNA_VECTOR} tsvector
+            GENERATED ALWAYS AS (to_tsvector('{indice.configuracion}'::regconfig, {documento})) STORED""",
+        f'CREATE INDEX IF NOT EXISTS {indice.nombre}_vector ON "{tabla}" USING GIN ({COLUMNA_VECTOR})',
+        f'CREATE INDEX IF NOT EXISTS {indice.nombre}_trgm ON "{tabla}" USING GIN (({documento}) gin_trgm_ops)',
+    ]
+
+
+def _sql_sqlite(indice, apps):
+    tabla = indice.tabla(apps)
+    columnas = indice.columnas(apps)
+    pk = apps.get_model(indice.modelo)._meta.pk.column
+    nombre = indice.nombre
+    lista = ', '.join(columnas)
+    nuevos = ', '.join(f'new.{c}' for c in columnas)
+    viejos = ', '.join(f'old.{c}' for c in columnas)
+    borrar = f"INSERT INTO {nombre}({nombre}, rowid, {lista}) VALUES ('delete', old.{pk}, {viejos});"
+    insertar = f'INSERT INTO {nombre}(rowid, {lista}) VALUES (new.{pk}, {nuevos});'
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {nombre} USING fts5(
+            {lista}, content='{tabla}', content_rowid='{pk}',
+            tokenize='unicode61 remove_diacritics 2')""",
+        f'CREATE TRIGGER IF NOT EXISTS {nombre}_ai AFTER INSERT ON "{tabla}" BEGIN {insertar} END',
+        f'CREATE TRIGGER IF NOT EXISTS {nombre}_ad AFTER DELETE ON "{tabla}" BEGIN {borrar} END',
+        f'CREATE TRIGGER IF NOT EXISTS {nombre}_au AFTER UPDATE OF {lista} ON "{tabla}" BEGIN {borrar} {insertar} END',
+    ]
+
+
+def _triggers_sqlite(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'busqueda\\_%' ESCAPE '\\'")
+    return {fila[0] for fila in cursor.fetchall()}
+
+
+def instalar(connection, apps):
+    """
+    Crea lo que falte de los índices en `connection`. En SQLite reconstruye
+    el contenido de los índices a los que les faltaba algún trigger.
+    Devuelve los nombres de los índices reconstruidos.
+    """
+    reconstruidos = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for indice in INDICES.values():
+                for sentencia in _sql_postgres(indice, apps):
+                    cursor.execute(sentencia)
+        elif connection.vendor == 'sqlite' and fts5_disponible():
+            previos = _triggers_sqlite(cursor)
+            for indice in INDICES.values():
+                for sentencia in _sql_sqlite(indice, apps):
+                    cursor.execute(sentencia)
+                esperados = {f'{indice.nombre}_{sufijo}' for sufijo in ('ai', 'ad', 'au')}
+                if not esperados <= previos:
+                    reconstruir(cursor, indice)
+                    reconstruidos.append(indice.nombre)
+    return reconstruidos
+
+
+def reconstruir(cursor, indice):
+    """Vuelve a leer la tabla de contenido de un índice FTS5"""
+    cursor.execute(f"INSERT INTO {indice.nombre}({indice.nombre}) VALUES ('rebuild')")
+
+
+def desinstalar(connection, apps):
+    with connection.cursor() as cursor:
+        for indice in INDICES.values():
+            tabla = indice.tabla(apps)
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {indice.nombre}_trgm')
+                cursor.execute(f'DROP INDEX IF EXISTS {indice.nombre}_vector')
+                cursor.execute(f'ALTER TABLE "{tabla}" DROP COLUMN IF EXISTS {COLUMNA_VECTOR}')
+            elif connection.vendor == 'sqlite':
+                for sufijo in ('ai', 'ad', 'au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {indice.nombre}_{sufijo}')
+                cursor.execute(f'DROP TABLE IF EXISTS {indice.nombre}')
@@ -0,0 +1,26 @@
+"""
+Crea lo que falte de los índices de búsqueda y, en SQLite, vuelve a leer el
+contenido de todas las tablas FTS5 (por ejemplo tras restaurar una copia de
+la base sin los triggers). En PostgreSQL la columna generada no necesita
+reconstrucción.
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.busqueda.indices import INDICES, fts5_disponible, instalar, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Crea y reconstruye los índices de texto completo de eventos, notificaciones y usuarios'
+
+    def handle(self, *args, **options):
+        instalar(connection, apps)
+        if connection.vendor == 'sqlite' and fts5_disponible():
+            with connection.cursor() as cursor:
+                for indice in INDICES.values():
+                    reconstruir(cursor, indice)
+        self.stdout.write(self.style.SUCCESS(
+            f'Índices de búsqueda listos ({connection.vendor}): ' + ', '.join(i.nombre for i in INDICES.values())
+        ))
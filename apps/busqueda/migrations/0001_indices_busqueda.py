@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def crear_indices(apps, schema_editor):
+    from apps.busqueda.indices import instalar
+    instalar(schema_editor.connection, apps)
+
+
+def eliminar_indices(apps, schema_editor):
+    from apps.busqueda.indices import desinstalar
+    desinstalar(schema_editor.connection, apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('eventos', '0008_conteo_mensual_eventos'),
+        ('notificaciones', '0005_indice_notificaciones_vigentes'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,5 @@
+"""
+Los índices de búsqueda no son modelos del ORM (ver apps.busqueda.indices)
+Este módulo existe porque Django solo envía post_migrate a las aplicaciones
+con módulo de modelos, y BusquedaConfig lo usa para reinstalar los triggers.
+"""
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.eventos.models import Evento
+from .consultas import aplicar_busqueda, palabras
+
+
+class BusquedaTextoCompletoTests(TestCase):
+	def setUp(self):
+		self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pass1234', user_level='ADMIN')
+		self.client.force_login(self.admin)
+
+	def _evento(self, nombre, objetivo):
+		return Evento.objects.create(
+			nombre_evento=nombre,
+			objetivo=objetivo,
+			fecha_evento=timezone.now().date() + timedelta(days=1),
+			hora_evento='09:00',
+			duracion='1',
+			sede='Sala',
+			prioridad='media',
+			etapa='planificacion',
+			aforo=10,
+			usuario=self.admin,
+		)
+
+	def test_palabras(self):
+		self.assertEqual(palabras('  Reunión, de-equipo! '), ['reunión', 'de', 'equipo'])
+		self.assertEqual(aplicar_busqueda(Evento.objects.all(), '%%').count(), 0)
+
+	def test_prefijos_acentos_y_ranking(self):
+		reunion = self._evento('Reunión de equipo', 'Agenda de la reunión y del trimestre')
+		taller = self._evento('Taller', 'Preparar la reunión mensual')
+		self._evento('Capacitación', 'Seguridad')
+
+		encontrados = list(aplicar_busqueda(Evento.objects.all(), 'reunion'))
+		self.assertEqual(set(encontrados), {reunion, taller})
+		self.assertEqual(list(aplicar_busqueda(Evento.objects.all(), 'reun equi')), [reunion])
+		# Más apariciones, más relevante
+		self.assertEqual(encontrados[0], reunion)
+
+	def test_el_indice_sigue_las_escrituras(self):
+		evento = self._evento('Inventario', 'Bodega')
+		evento.nombre_evento = 'Auditoría'
+		evento.save()
+		self.assertFalse(aplicar_busqueda(Evento.objects.all(), 'inventario').exists())
+		Evento.objects.filter(pk=evento.pk).update(objetivo='Revisión de almacén')
+		self.assertTrue(aplicar_busqueda(Evento.objects.all(), 'almacen').exists())
+		evento.delete()
+		self.assertFalse(aplicar_busqueda(Evento.objects.all(), 'auditoria').exists())
+
+	def test_vistas_usan_el_indice(self):
+		self._evento('Congreso anual', 'Ponencias')
+		self._evento('Junta', 'Presupuesto')
+		resp = self.client.get(reverse('eventos:api_eventos'), {'search': 'congreso'})
+		self.assertEqual([e['titulo'] for e in resp.json()['eventos']], ['Congreso anual'])
+		resp = self.client.get(reverse('frontend:eventos_usuarios_stats'), {'q': 'congreso'})
+		self.assertEqual(len(resp.context['filas']), 1)
+
+		User.objects.create_user(username='mgarcia', email='maria@empresa.mx', password='pass1234', first_name='María')
+		resp = self.client.get(reverse('frontend:user_management'), {'search': 'maria'})
+		self.assertEqual([u.username for u in resp.context['users']], ['mgarcia'])
+
+	def test_comando_reconstruye(self):
+		self._evento('Feria', 'Stands')
+		if connection.vendor == 'sqlite':
+			with connection.cursor() as cursor:
+				cursor.execute('DROP TRIGGER busqueda_evento_ai')
+				cursor.execute("INSERT INTO busqueda_evento(busqueda_evento) VALUES ('delete-all')")
+			self.assertFalse(aplicar_busqueda(Evento.objects.all(), 'feria').exists())
+		call_command('reconstruir_indices_busqueda', stdout=StringIO())
+		self.assertTrue(aplicar_busqueda(Evento.objects.all(), 'feria').exists())
+		self._evento('Feria del libro', 'Lectura')
+		self.assertEqual(aplicar_busqueda(Evento.objects.all(), 'feria').count(), 2)
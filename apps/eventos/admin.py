@@ -16,10 +16,24 @@ class CategoriaEventoAdmin(admin.ModelAdmin):
     )
 
 
+class SobreAforoFilter(admin.SimpleListFilter):
+    """Eventos con más participantes que aforo (comparación en SQL)"""
+    title = 'aforo'
+    parameter_name = 'sobre_aforo'
+    
+    def lookups(self, request, model_admin):
+        return (('1', 'Sobre el aforo'),)
+    
+    def queryset(self, request, queryset):
+        if self.value() == '1':
+            return queryset.sobre_aforo()
+        return queryset
+
+
 @admin.register(Evento)
 class EventoAdmin(admin.ModelAdmin):
-    list_display = ('nombre_evento', 'usuario', 'fecha_evento', 'hora_evento', 'etapa', 'prioridad', 'aforo')
-    list_filter = ('etapa', 'prioridad', 'fecha_evento', 'carpeta_ejecutiva', 'marca_temporal')
+    list_display = ('nombre_evento', 'usuario', 'fecha_evento', 'hora_evento', 'etapa', 'prioridad', 'aforo', 'total_participantes')
+    list_filter = ('etapa', 'prioridad', 'fecha_evento', 'carpeta_ejecutiva', 'marca_temporal', SobreAforoFilter)
     search_fields = ('nombre_evento', 'objetivo', 'sede', 'participantes')
     date_hierarchy = 'fecha_evento'
     ordering = ('-fecha_evento', '-hora_evento')
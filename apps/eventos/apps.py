@@ -5,3 +5,7 @@ class EventosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.eventos"
     verbose_name = "Eventos"
+
+    def ready(self):
+        # Registrar los receptores que mantienen los resúmenes precalculados
+        import apps.eventos.estadisticas  # noqa: F401
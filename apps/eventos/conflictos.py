@@ -0,0 +1,83 @@
+"""
+Detección de conflictos (traslapes) entre eventos
+Un conflicto es un traslape de horario con el mismo responsable o en la misma sede.
+"""
+
+import heapq
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Evento
+
+
+# Sedes genéricas que no identifican un lugar real
+SEDES_SIN_CONFLICTO = {'', 'Por definir'}
+
+COLUMNAS_CONFLICTO = ('id', 'nombre_evento', 'sede', 'usuario_id', 'fecha_hora_inicio', 'fecha_hora_fin')
+
+
+def _resumen(fila):
+    tz = timezone.get_current_timezone()
+    return {
+        'id': fila['id'],
+        'titulo': fila['nombre_evento'],
+        'sede': fila['sede'],
+        'usuario_id': fila['usuario_id'],
+        'fecha_inicio': fila['fecha_hora_inicio'].astimezone(tz).isoformat(),
+        'fecha_fin': fila['fecha_hora_fin'].astimezone(tz).isoformat(),
+    }
+
+
+def buscar_conflictos(evento):
+    """
+    Eventos que chocan con `evento` (instancia con rango temporal calculado).
+    Consulta acotada por los índices (usuario|sede, fecha_hora_inicio): no
+    recorre la tabla completa.
+    """
+    criterio = Q(usuario_id=evento.usuario_id)
+    if evento.sede not in SEDES_SIN_CONFLICTO:
+        criterio |= Q(sede=evento.sede)
+    qs = Evento.objects.solapados(evento.fecha_hora_inicio, evento.fecha_hora_fin).filter(criterio)
+    if evento.pk:
+        qs = qs.exclude(pk=evento.pk)
+    return [_resumen(fila) for fila in qs.order_by('fecha_hora_inicio').values(*COLUMNAS_CONFLICTO)]
+
+
+def barrido_traslapes(intervalos):
+    """
+    Barrido de línea sobre (inicio, fin, item) ordenados por inicio.
+    Genera (item_a, item_b, inicio_traslape, fin_traslape) en O(n log n + k).
+    """
+    activos = []  # heap de (fin, secuencia, inicio, item)
+    for secuencia, (inicio, fin, item) in enumerate(intervalos):
+        while activos and activos[0][0] <= inicio:
+            heapq.heappop(activos)
+        for fin_a, _, inicio_a, item_a in activos:
+            yield item_a, item, max(inicio, inicio_a), min(fin, fin_a)
+        heapq.heappush(activos, (fin, secuencia, inicio, item))
+
+
+def pares_en_conflicto(inicio, fin, usuario_id=None, sede=None):
+    """
+    Pares de eventos traslapados dentro de [inicio, fin) para un responsable
+    o una sede. Se lee la ventana una sola vez ya ordenada por el índice.
+    """
+    qs = Evento.objects.solapados(inicio, fin)
+    if usuario_id is not None:
+        qs = qs.filter(usuario_id=usuario_id)
+    if sede is not None:
+        qs = qs.filter(sede=sede)
+    filas = qs.order_by('fecha_hora_inicio', 'id').values(*COLUMNAS_CONFLICTO)
+
+    tz = timezone.get_current_timezone()
+    pares = []
+    intervalos = ((f['fecha_hora_inicio'], f['fecha_hora_fin'], f) for f in filas.iterator())
+    for a, b, traslape_inicio, traslape_fin in barrido_traslapes(intervalos):
+        pares.append({
+            'evento_a': _resumen(a),
+            'evento_b': _resumen(b),
+            'traslape_inicio': traslape_inicio.astimezone(tz).isoformat(),
+            'traslape_fin': traslape_fin.astimezone(tz).isoformat(),
+        })
+    return pares
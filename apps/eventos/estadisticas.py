@@ -0,0 +1,317 @@
+"""
+Resúmenes precalculados de eventos: por usuario (EstadisticasEventosUsuario)
+y por mes (ConteoMensualEventos). Cada escritura de eventos aplica a los
+resúmenes la diferencia entre la huella anterior y la nueva de los eventos
+escritos; la página de estadísticas los lee sin recorrer la tabla de eventos.
+Los terminados dependen del reloj y se refrescan con
+`manage.py refrescar_estadisticas_vencidas` (tarea programada).
+"""
+
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.authentication.models import User
+from .models import ConteoMensualEventos, EstadisticasEventosUsuario, Evento
+from .signals import eventos_modificados
+
+
+TAMANO_LOTE = 500
+
+# Con más responsables afectados por una escritura conviene recalcular por
+# lotes en lugar de aplicar los deltas usuario por usuario
+MAX_RESUMENES_INCREMENTALES = 50
+
+CAMPOS_RESUMEN = [
+    'total', 'urgentes', 'terminados', 'proximo_fin',
+    'ultimo_fecha', 'ultimo_hora', 'ultimo_nombre', 'calculado_en',
+]
+
+CAMPOS_DELTA = ['total', 'urgentes', 'terminados', 'proximo_fin', 'ultimo_fecha', 'ultimo_hora', 'ultimo_nombre']
+
+
+def _lotes(valores, tamano):
+    iterador = iter(valores)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def recalcular_estadisticas(usuario_ids, ahora=None, tamano_lote=TAMANO_LOTE):
+    """
+    Recalcula el resumen de `usuario_ids` con consultas agrupadas por lote y
+    elimina el de quienes ya no tienen eventos. Devuelve los resúmenes escritos.
+    """
+    ahora = ahora or timezone.now()
+    escritos = 0
+    for lote in _lotes(sorted(set(usuario_ids) - {None}), tamano_lote):
+        eventos = Evento.objects.filter(usuario_id__in=lote).order_by()
+        resumenes = {
+            fila['usuario_id']: EstadisticasEventosUsuario(calculado_en=ahora, **fila)
+            for fila in eventos.values('usuario_id').annotate(
+                total=Count('id'),
+                urgentes=Count('id', filter=Q(prioridad='urgente')),
+                terminados=Count('id', filter=Q(fecha_hora_fin__lt=ahora)),
+                proximo_fin=Min('fecha_hora_fin', filter=Q(fecha_hora_fin__gte=ahora)),
+            )
+        }
+
+        ultimo = (Evento.objects
+                  .filter(usuario_id=OuterRef('pk'))
+                  .order_by('-fecha_evento', '-hora_evento', '-id')
+                  .values('id')[:1])
+        ultimos_ids = (User.objects
+                       .filter(pk__in=list(resumenes))
+                       .annotate(ultimo_id=Subquery(ultimo))
+                       .values_list('ultimo_id', flat=True))
+        filas_ultimo = Evento.objects.filter(pk__in=list(ultimos_ids)).values(
+            'usuario_id', 'fecha_evento', 'hora_evento', 'nombre_evento'
+        )
+        for fila in filas_ultimo:
+            resumen = resumenes[fila['usuario_id']]
+            resumen.ultimo_fecha = fila['fecha_evento']
+            resumen.ultimo_hora = fila['hora_evento']
+            resumen.ultimo_nombre = fila['nombre_evento']
+
+        EstadisticasEventosUsuario.objects.filter(usuario_id__in=lote).exclude(usuario_id__in=list(resumenes)).delete()
+        EstadisticasEventosUsuario.objects.bulk_create(
+            resumenes.values(),
+            update_conflicts=True,
+            unique_fields=['usuario'],
+            update_fields=CAMPOS_RESUMEN,
+        )
+        escritos += len(resumenes)
+    return escritos
+
+
+def refrescar_vencidos(ahora):
+    """Recalcula los resúmenes en los que algún evento terminó desde el último cálculo"""
+    vencidos = EstadisticasEventosUsuario.objects.filter(proximo_fin__lt=ahora).values_list('usuario_id', flat=True)
+    return recalcular_estadisticas(list(vencidos), ahora)
+
+
+def reconciliar_estadisticas(ahora=None, tamano_lote=TAMANO_LOTE):
+    """Recalcula todos los resúmenes (usuarios con eventos o con resumen previo)"""
+    usuario_ids = set(Evento.objects.order_by().values_list('usuario_id', flat=True).distinct())
+    usuario_ids.update(EstadisticasEventosUsuario.objects.values_list('usuario_id', flat=True))
+    return recalcular_estadisticas(usuario_ids, ahora, tamano_lote)
+
+
+def filas_estadisticas(ahora, usuario_id=None, chunk_size=2000):
+    """
+    Filas del resumen (mayor total primero) con el mismo formato que el
+    agregado en vivo de la página de estadísticas (ver EventosUsuariosStatsView).
+    Solo lee: los terminados valen a la fecha del último refresco.
+    """
+    hoy = timezone.localdate(ahora)
+    mes_actual = (ConteoMensualEventos.objects
+                  .filter(usuario_id=OuterRef('usuario_id'), anio=hoy.year, mes=hoy.month)
+                  .order_by()
+                  .values('usuario_id')
+                  .annotate(c=Sum('total'))
+                  .values('c'))
+    qs = EstadisticasEventosUsuario.objects.annotate(mes_actual=Coalesce(Subquery(mes_actual), 0))
+    if usuario_id is not None:
+        qs = qs.filter(usuario_id=usuario_id)
+    columnas = (
+        'usuario_id', 'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__email',
+        'total', 'urgentes', 'terminados', 'mes_actual', 'ultimo_fecha', 'ultimo_hora', 'ultimo_nombre',
+    )
+    for fila in qs.order_by('-total', 'usuario_id').values(*columnas).iterator(chunk_size=chunk_size):
+        fila['last_fecha'] = fila.pop('ultimo_fecha')
+        fila['last_hora'] = fila.pop('ultimo_hora')
+        fila['last_nombre'] = fila.pop('ultimo_nombre')
+        fila['_ended_sum'] = fila.pop('terminados')
+        yield fila
+
+
+def _conteos_en_vivo(eventos):
+    """Agregado por (anio, mes, usuario, prioridad, etapa) directo de la tabla de eventos"""
+    return (eventos
+            .order_by()
+            .values('usuario_id', 'prioridad', 'etapa', anio=ExtractYear('fecha_evento'), mes=ExtractMonth('fecha_evento'))
+            .annotate(total=Count('id')))
+
+
+DIMENSIONES_CONTEO = ['anio', 'mes', 'usuario', 'prioridad', 'etapa']
+
+# Clave de cada fila de conteo
+CLAVE_CONTEO = ('anio', 'mes', 'usuario_id', 'prioridad', 'etapa')
+
+
+def recalcular_conteos_mensuales(usuario_ids, tamano_lote=TAMANO_LOTE):
+    """Reemplaza los conteos mensuales de `usuario_ids`; devuelve las filas escritas"""
+    escritas = 0
+    for lote in _lotes(sorted(set(usuario_ids) - {None}), tamano_lote):
+        conteos = [
+            ConteoMensualEventos(**fila)
+            for fila in _conteos_en_vivo(Evento.objects.filter(usuario_id__in=lote))
+        ]
+        with transaction.atomic():
+            # Poner en cero y hacer upsert en lugar de borrar e insertar: dos
+            # recálculos simultáneos del mismo usuario no violan conteo_mensual_unico
+            ConteoMensualEventos.objects.filter(usuario_id__in=lote).update(total=0)
+            ConteoMensualEventos.objects.bulk_create(
+                conteos,
+                batch_size=tamano_lote,
+                update_conflicts=True,
+                unique_fields=DIMENSIONES_CONTEO,
+                update_fields=['total'],
+            )
+        escritas += len(conteos)
+    return escritas
+
+
+def reconstruir_conteos_mensuales(tamano_lote=TAMANO_LOTE):
+    """Reconstruye la tabla completa de conteos mensuales"""
+    usuario_ids = set(Evento.objects.order_by().values_list('usuario_id', flat=True).distinct())
+    with transaction.atomic():
+        ConteoMensualEventos.objects.exclude(usuario_id__in=usuario_ids).delete()
+        escritas = recalcular_conteos_mensuales(usuario_ids, tamano_lote)
+        ConteoMensualEventos.objects.filter(total=0).delete()
+        return escritas
+
+
+def diferencias_conteos_mensuales():
+    """
+    Compara la tabla con el agregado en vivo.
+    Devuelve [(anio, mes, usuario_id, prioridad, etapa, esperado, guardado)].
+    """
+    def indexar(filas):
+        return {tuple(fila[d] for d in CLAVE_CONTEO): fila['total'] for fila in filas}
+
+    esperados = indexar(_conteos_en_vivo(Evento.objects.all()))
+    guardados = indexar(ConteoMensualEventos.objects.values(*CLAVE_CONTEO, 'total'))
+    return [
+        clave + (esperados.get(clave, 0), guardados.get(clave, 0))
+        for clave in sorted(esperados.keys() | guardados.keys())
+        if esperados.get(clave, 0) != guardados.get(clave, 0)
+    ]
+
+
+def serie_mensual(meses, usuario_id=None, prioridad=None):
+    """
+    Conteos de eventos para `meses` (lista cronológica de (anio, mes)) leyendo
+    solo las filas de la ventana en ConteoMensualEventos.
+    """
+    (anio_desde, mes_desde), (anio_hasta, mes_hasta) = meses[0], meses[-1]
+    qs = ConteoMensualEventos.objects.filter(
+        Q(anio__gt=anio_desde) | Q(anio=anio_desde, mes__gte=mes_desde),
+        Q(anio__lt=anio_hasta) | Q(anio=anio_hasta, mes__lte=mes_hasta),
+    )
+    if usuario_id is not None:
+        qs = qs.filter(usuario_id=usuario_id)
+    if prioridad:
+        qs = qs.filter(prioridad=prioridad)
+    conteos = {(f['anio'], f['mes']): f['c'] for f in qs.values('anio', 'mes').annotate(c=Sum('total'))}
+    return [conteos.get(par, 0) for par in meses]
+
+
+def _aplicar_conteos_mensuales(por_usuario):
+    """Suma a ConteoMensualEventos los deltas de las huellas de `por_usuario`"""
+    deltas = Counter()
+    for usuario_id, huellas in por_usuario.items():
+        for huella, signo in huellas:
+            fecha = huella['fecha_evento']
+            deltas[(fecha.year, fecha.month, usuario_id, huella['prioridad'], huella['etapa'])] += signo
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    # Crear en cero las filas que falten y sumar con F(): dos escrituras
+    # simultáneas sobre el mismo mes no se pisan
+    ConteoMensualEventos.objects.bulk_create(
+        [ConteoMensualEventos(**dict(zip(CLAVE_CONTEO, clave))) for clave in deltas],
+        batch_size=TAMANO_LOTE,
+        ignore_conflicts=True,
+    )
+    for clave, delta in deltas.items():
+        # Greatest: una tabla desviada no debe romper la escritura del evento
+        ConteoMensualEventos.objects.filter(**dict(zip(CLAVE_CONTEO, clave))).update(
+            total=Greatest(F('total') + delta, 0)
+        )
+
+
+def _aplicar_resumen(usuario_id, huellas):
+    """
+    Aplica al resumen de `usuario_id` los deltas de `huellas` [(huella, ±1)].
+    Los terminados se cuentan respecto a `calculado_en`, como en el recálculo;
+    el próximo fin y el último evento solo se consultan si el cambio los afecta.
+    """
+    resumen = EstadisticasEventosUsuario.objects.select_for_update().filter(usuario_id=usuario_id).first()
+    if resumen is None:
+        recalcular_estadisticas([usuario_id])
+        return
+    for huella, signo in huellas:
+        resumen.total += signo
+        if huella['prioridad'] == 'urgente':
+            resumen.urgentes += signo
+        if huella['fecha_hora_fin'] < resumen.calculado_en:
+            resumen.terminados += signo
+    if min(resumen.total, resumen.urgentes, resumen.terminados) < 0:
+        # Resumen desviado (escrituras sin el ORM): recalcular
+        recalcular_estadisticas([usuario_id])
+        return
+    if resumen.total == 0:
+        resumen.delete()
+        return
+
+    eventos = Evento.objects.filter(usuario_id=usuario_id).order_by()
+    if any(signo < 0 and huella['fecha_hora_fin'] == resumen.proximo_fin for huella, signo in huellas):
+        resumen.proximo_fin = (eventos
+                               .filter(fecha_hora_fin__gte=resumen.calculado_en)
+                               .aggregate(m=Min('fecha_hora_fin'))['m'])
+    else:
+        fines = [huella['fecha_hora_fin'] for huella, signo in huellas
+                 if signo > 0 and huella['fecha_hora_fin'] >= resumen.calculado_en]
+        resumen.proximo_fin = min(filter(None, [resumen.proximo_fin, *fines]), default=None)
+
+    ultimo = (resumen.ultimo_fecha, resumen.ultimo_hora)
+    if resumen.ultimo_fecha is None or any(
+        (huella['fecha_evento'], huella['hora_evento']) >= ultimo for huella, _ in huellas
+    ):
+        fila = (eventos
+                .order_by('-fecha_evento', '-hora_evento', '-id')
+                .values_list('fecha_evento', 'hora_evento', 'nombre_evento')
+                .first())
+        if fila is None:
+            recalcular_estadisticas([usuario_id])
+            return
+        resumen.ultimo_fecha, resumen.ultimo_hora, resumen.ultimo_nombre = fila
+    resumen.save(update_fields=CAMPOS_DELTA)
+
+
+def aplicar_cambios(cambios):
+    """
+    Aplica a los resúmenes las huellas [(antes, despues)] de eventos escritos
+    (None si el evento no existía o ya no existe). Devuelve los responsables
+    afectados.
+    """
+    por_usuario = defaultdict(list)
+    for antes, despues in cambios:
+        if antes == despues:
+            continue
+        if antes is not None:
+            por_usuario[antes['usuario_id']].append((antes, -1))
+        if despues is not None:
+            por_usuario[despues['usuario_id']].append((despues, 1))
+    por_usuario.pop(None, None)
+    with transaction.atomic():
+        _aplicar_conteos_mensuales(por_usuario)
+        if len(por_usuario) > MAX_RESUMENES_INCREMENTALES:
+            recalcular_estadisticas(por_usuario)
+        else:
+            for usuario_id in sorted(por_usuario):
+                _aplicar_resumen(usuario_id, por_usuario[usuario_id])
+    return set(por_usuario)
+
+
+@receiver(eventos_modificados)
+def actualizar_estadisticas(sender, usuario_ids, cambios=None, **kwargs):
+    if cambios is None:
+        # Sin huellas (p. ej. instancias con campos diferidos) se recalcula
+        recalcular_estadisticas(usuario_ids)
+        recalcular_conteos_mensuales(usuario_ids)
+        return
+    aplicar_cambios(cambios)
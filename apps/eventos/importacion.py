@@ -0,0 +1,147 @@
+"""
+Importación y exportación masiva de eventos en formato NDJSON (JSON Lines)
+Una línea por evento; la importación valida por lotes e inserta con bulk_create.
+"""
+
+import json
+from datetime import datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.authentication.models import User
+from .models import Evento
+
+
+TAMANO_LOTE = 500
+
+# Campos aceptados en cada línea (además de `usuario`, email del responsable)
+CAMPOS_IMPORTABLES = (
+    'nombre_evento', 'objetivo', 'fecha_evento', 'hora_evento', 'duracion', 'duracion_personalizada',
+    'sede', 'link_maps', 'aforo', 'participantes', 'etapa', 'prioridad', 'carpeta_ejecutiva',
+    'carpeta_ejecutiva_liga', 'evidencias', 'compromisos', 'observaciones',
+)
+# Campos informativos que agrega la exportación y que la importación ignora
+CAMPOS_SOLO_EXPORTACION = ('id', 'fecha_inicio')
+
+
+def _leer_lineas(lineas):
+    """Genera (número de línea, dict | error) ignorando líneas vacías"""
+    for numero, linea in enumerate(lineas, 1):
+        if isinstance(linea, bytes):
+            linea = linea.decode('utf-8')
+        if not linea.strip():
+            continue
+        try:
+            data = json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, f'JSON inválido: {e.msg}'
+            continue
+        if not isinstance(data, dict):
+            yield numero, 'Cada línea debe ser un objeto JSON'
+            continue
+        if data.get('usuario') is not None and not isinstance(data['usuario'], str):
+            yield numero, 'El campo usuario debe ser el email del responsable'
+            continue
+        yield numero, data
+
+
+def _construir_evento(data, responsable):
+    """Crea (sin guardar) y valida un Evento; lanza ValidationError con los mensajes"""
+    desconocidos = set(data) - set(CAMPOS_IMPORTABLES) - set(CAMPOS_SOLO_EXPORTACION) - {'usuario'}
+    if desconocidos:
+        raise ValidationError(f"Campos no reconocidos: {', '.join(sorted(desconocidos))}")
+    for requerido in ('nombre_evento', 'fecha_evento', 'hora_evento'):
+        if not data.get(requerido):
+            raise ValidationError(f'El campo {requerido} es requerido')
+    try:
+        valores = {campo: data[campo] for campo in CAMPOS_IMPORTABLES if campo in data}
+        valores['fecha_evento'] = datetime.strptime(data['fecha_evento'], '%Y-%m-%d').date()
+        valores['hora_evento'] = datetime.strptime(data['hora_evento'], '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ValidationError('Formato de fecha u hora inválido')
+
+    evento = Evento(usuario=responsable, **valores)
+    # El responsable ya viene resuelto: excluirlo evita una consulta por fila.
+    # Sin Evento.clean(): su regla de fecha futura aplica a la captura, y una
+    # exportación con eventos pasados debe poder importarse de nuevo
+    evento.clean_fields(exclude=['usuario'])
+    evento.validar_datos()
+    return evento
+
+
+def _mensajes(error):
+    if hasattr(error, 'message_dict'):
+        return [f'{campo}: {msg}' for campo, msgs in error.message_dict.items() for msg in msgs]
+    return list(error.messages)
+
+
+def importar_ndjson(lineas, user, tamano_lote=TAMANO_LOTE, simular=False):
+    """
+    Importa eventos desde un iterable de líneas NDJSON.
+
+    Los administradores y managers pueden asignar el responsable con
+    `usuario` (email); el resto de usuarios solo crea eventos propios.
+    Devuelve {'creados', 'procesadas', 'errores': [{'linea', 'errores'}]}.
+    """
+    resultado = {'creados': 0, 'procesadas': 0, 'errores': []}
+    puede_asignar = user.user_level in ['ADMIN', 'MANAGER']
+    lineas_leidas = _leer_lineas(lineas)
+
+    while True:
+        lote = list(islice(lineas_leidas, tamano_lote))
+        if not lote:
+            return resultado
+        resultado['procesadas'] += len(lote)
+
+        # Resolver los responsables del lote en una sola consulta
+        emails = {
+            data['usuario'] for _, data in lote
+            if puede_asignar and isinstance(data, dict) and isinstance(data.get('usuario'), str)
+        }
+        responsables = {u.email: u for u in User.objects.filter(email__in=emails)}
+
+        validos = []
+        for numero, data in lote:
+            if isinstance(data, str):
+                resultado['errores'].append({'linea': numero, 'errores': [data]})
+                continue
+            responsable = user
+            if data.get('usuario') and data['usuario'] != user.email:
+                if not puede_asignar:
+                    resultado['errores'].append({'linea': numero, 'errores': ['No puedes asignar eventos a otros usuarios']})
+                    continue
+                responsable = responsables.get(data['usuario'])
+                if responsable is None:
+                    resultado['errores'].append({'linea': numero, 'errores': [f"Usuario no encontrado: {data['usuario']}"]})
+                    continue
+            try:
+                validos.append(_construir_evento(data, responsable))
+            except ValidationError as e:
+                resultado['errores'].append({'linea': numero, 'errores': _mensajes(e)})
+
+        if validos and not simular:
+            with transaction.atomic():
+                Evento.objects.bulk_create(validos, batch_size=tamano_lote)
+        resultado['creados'] += len(validos)
+
+
+def exportar_ndjson(eventos, chunk_size=TAMANO_LOTE):
+    """
+    Genera las líneas NDJSON de `eventos` leyendo con iterator(), sin
+    materializar el queryset. El formato es el mismo que acepta la importación.
+    """
+    tz = timezone.get_current_timezone()
+    columnas = ('id', 'usuario__email', 'fecha_hora_inicio') + CAMPOS_IMPORTABLES
+    filas = eventos.order_by('fecha_evento', 'hora_evento', 'id').values(*columnas)
+    for fila in filas.iterator(chunk_size=chunk_size):
+        fila['usuario'] = fila.pop('usuario__email')
+        fila['fecha_evento'] = fila['fecha_evento'].isoformat()
+        fila['hora_evento'] = fila['hora_evento'].strftime('%H:%M')
+        inicio = fila.pop('fecha_hora_inicio')
+        fila['fecha_inicio'] = inicio.astimezone(tz).isoformat() if inicio else None
+        if fila['duracion_personalizada'] is not None:
+            fila['duracion_personalizada'] = str(fila['duracion_personalizada'])
+        yield json.dumps(fila, ensure_ascii=False) + '\n'
@@ -0,0 +1,32 @@
+"""
+Rellena fecha_hora_inicio / fecha_hora_fin de los eventos existentes
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.eventos.models import Evento
+
+
+class Command(BaseCommand):
+    help = 'Calcula y guarda fecha_hora_inicio / fecha_hora_fin de los eventos en lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Eventos por lote (default: 1000)'
+        )
+        parser.add_argument(
+            '--solo-faltantes',
+            action='store_true',
+            help='Procesar solo eventos sin inicio/fin calculado'
+        )
+
+    def handle(self, *args, **options):
+        eventos = Evento.objects.all()
+        if options['solo_faltantes']:
+            eventos = eventos.filter(fecha_hora_inicio__isnull=True) | eventos.filter(fecha_hora_fin__isnull=True)
+
+        total = eventos.recalcular_rango_temporal(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'{total} eventos actualizados'))
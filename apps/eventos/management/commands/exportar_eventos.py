@@ -0,0 +1,31 @@
+"""
+Exporta eventos a NDJSON (una línea JSON por evento) en streaming
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.eventos.importacion import exportar_ndjson
+from apps.eventos.models import Evento
+
+
+class Command(BaseCommand):
+    help = 'Exporta todos los eventos a NDJSON sin cargarlos completos en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--salida',
+            default='-',
+            help="Ruta del archivo de salida ('-' para stdout, default)"
+        )
+
+    def handle(self, *args, **options):
+        if options['salida'] == '-':
+            for linea in exportar_ndjson(Evento.objects.all()):
+                self.stdout.write(linea, ending='')
+            return
+        total = 0
+        with open(options['salida'], 'w', encoding='utf-8') as fh:
+            for linea in exportar_ndjson(Evento.objects.all()):
+                fh.write(linea)
+                total += 1
+        self.stderr.write(self.style.SUCCESS(f'{total} eventos exportados a {options["salida"]}'))
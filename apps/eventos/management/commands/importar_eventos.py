@@ -0,0 +1,60 @@
+"""
+Importa eventos desde un archivo NDJSON (una línea JSON por evento)
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.authentication.models import User
+from apps.eventos.importacion import TAMANO_LOTE, importar_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Importa eventos desde NDJSON validando por lotes e insertando con bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo NDJSON ('-' para stdin)")
+        parser.add_argument(
+            '--usuario',
+            required=True,
+            help='Email del usuario que importa (responsable por defecto de los eventos)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Líneas por lote (default: {TAMANO_LOTE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo validar, sin insertar'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuario no encontrado: {options['usuario']}")
+
+        if options['archivo'] == '-':
+            resultado = self._importar(sys.stdin, user, options)
+        else:
+            with open(options['archivo'], encoding='utf-8') as fh:
+                resultado = self._importar(fh, user, options)
+
+        for error in resultado['errores']:
+            self.stderr.write(f"Línea {error['linea']}: {'; '.join(error['errores'])}")
+        accion = 'validados' if options['dry_run'] else 'creados'
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['creados']} eventos {accion} de {resultado['procesadas']} líneas "
+            f"({len(resultado['errores'])} con errores)"
+        ))
+
+    def _importar(self, lineas, user, options):
+        return importar_ndjson(
+            lineas, user,
+            tamano_lote=max(1, options['batch_size']),
+            simular=options['dry_run']
+        )
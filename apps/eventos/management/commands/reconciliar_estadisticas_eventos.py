@@ -0,0 +1,24 @@
+"""
+Reconstruye el resumen precalculado de eventos por usuario
+Pensado para ejecutarse periódicamente (cron) y tras cargas que omiten el ORM.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.eventos.estadisticas import TAMANO_LOTE, reconciliar_estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula EstadisticasEventosUsuario para todos los usuarios en lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Usuarios por lote (default: {TAMANO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        total = reconciliar_estadisticas(tamano_lote=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'{total} resúmenes de usuario recalculados'))
@@ -0,0 +1,39 @@
+"""
+Reconstruye o verifica la tabla de conteos mensuales de eventos
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.eventos.estadisticas import TAMANO_LOTE, diferencias_conteos_mensuales, reconstruir_conteos_mensuales
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye ConteoMensualEventos desde los eventos o verifica su consistencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Usuarios por lote (default: {TAMANO_LOTE})'
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo comparar con el agregado en vivo; falla si hay diferencias'
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            diferencias = diferencias_conteos_mensuales()
+            for anio, mes, usuario_id, prioridad, etapa, esperado, guardado in diferencias[:50]:
+                self.stdout.write(
+                    f'{anio}-{mes:02d} usuario={usuario_id} {prioridad}/{etapa}: esperado {esperado}, guardado {guardado}'
+                )
+            if diferencias:
+                raise CommandError(f'{len(diferencias)} conteos mensuales inconsistentes')
+            self.stdout.write(self.style.SUCCESS('Conteos mensuales consistentes'))
+            return
+
+        total = reconstruir_conteos_mensuales(tamano_lote=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'{total} conteos mensuales escritos'))
@@ -0,0 +1,18 @@
+"""
+Recalcula los resúmenes de eventos en los que algún evento terminó desde el
+último cálculo (los terminados dependen del reloj). Pensado para una tarea
+programada: la página de estadísticas solo lee los resúmenes.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.eventos.estadisticas import refrescar_vencidos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula EstadisticasEventosUsuario cuyo próximo fin ya pasó'
+
+    def handle(self, *args, **options):
+        total = refrescar_vencidos(timezone.now())
+        self.stdout.write(self.style.SUCCESS(f'{total} resúmenes de usuario refrescados'))
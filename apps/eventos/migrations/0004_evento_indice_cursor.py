@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0003_update_evento_fecha_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['fecha_evento', 'hora_evento', 'id'], name='eventos_eve_fecha_e_953ef4_idx'),
+        ),
+    ]
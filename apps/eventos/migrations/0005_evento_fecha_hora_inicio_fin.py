@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0004_evento_indice_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='fecha_hora_fin',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Fin'),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='fecha_hora_inicio',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Inicio'),
+        ),
+    ]
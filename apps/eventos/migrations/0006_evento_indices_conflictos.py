@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0005_evento_fecha_hora_inicio_fin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['usuario', 'fecha_hora_inicio'], name='eventos_eve_usuario_a8944f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['sede', 'fecha_hora_inicio'], name='eventos_eve_sede_15c772_idx'),
+        ),
+    ]
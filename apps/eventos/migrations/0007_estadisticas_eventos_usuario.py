@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('eventos', '0006_evento_indices_conflictos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticasEventosUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas_eventos', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total de eventos')),
+                ('urgentes', models.PositiveIntegerField(default=0, verbose_name='Eventos urgentes')),
+                ('terminados', models.PositiveIntegerField(default=0, verbose_name='Eventos terminados')),
+                ('proximo_fin', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Próximo fin')),
+                ('ultimo_fecha', models.DateField(blank=True, null=True, verbose_name='Fecha del último evento')),
+                ('ultimo_hora', models.TimeField(blank=True, null=True, verbose_name='Hora del último evento')),
+                ('ultimo_nombre', models.CharField(blank=True, max_length=200, verbose_name='Nombre del último evento')),
+                ('calculado_en', models.DateTimeField(verbose_name='Calculado en')),
+            ],
+            options={
+                'verbose_name': 'Estadísticas de eventos por usuario',
+                'verbose_name_plural': 'Estadísticas de eventos por usuario',
+            },
+        ),
+    ]
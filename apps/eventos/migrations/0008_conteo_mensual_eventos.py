@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0007_estadisticas_eventos_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoMensualEventos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField(verbose_name='Año')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mes')),
+                ('prioridad', models.CharField(max_length=20, verbose_name='Prioridad')),
+                ('etapa', models.CharField(max_length=20, verbose_name='Etapa')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total de eventos')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos_mensuales_eventos', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Conteo mensual de eventos',
+                'verbose_name_plural': 'Conteos mensuales de eventos',
+                'indexes': [models.Index(fields=['usuario', 'anio', 'mes'], name='eventos_con_usuario_faf6af_idx')],
+                'constraints': [models.UniqueConstraint(fields=('anio', 'mes', 'usuario', 'prioridad', 'etapa'), name='conteo_mensual_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0008_conteo_mensual_eventos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='total_participantes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de participantes'),
+        ),
+        migrations.CreateModel(
+            name='ParticipanteEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField(verbose_name='Orden')),
+                ('nombre', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participantes_evento', to='eventos.evento', verbose_name='Evento')),
+            ],
+            options={
+                'verbose_name': 'Participante de evento',
+                'verbose_name_plural': 'Participantes de eventos',
+                'ordering': ['evento', 'orden'],
+                'constraints': [models.UniqueConstraint(fields=('evento', 'orden'), name='participante_evento_orden_unico')],
+            },
+        ),
+    ]
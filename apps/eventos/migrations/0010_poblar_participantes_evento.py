@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+TAMANO_LOTE = 500
+
+
+def _parsear(texto):
+    # Copia de models.parsear_participantes al momento de la migración
+    if not texto:
+        return []
+    nombres = (p.strip() for p in texto.replace(',', '\n').split('\n'))
+    return [nombre[:255] for nombre in nombres if nombre]
+
+
+def poblar_participantes(apps, schema_editor):
+    Evento = apps.get_model('eventos', 'Evento')
+    ParticipanteEvento = apps.get_model('eventos', 'ParticipanteEvento')
+    eventos = Evento.objects.order_by('pk').only('pk', 'participantes')
+    ultimo_pk = 0
+    while True:
+        lote = list(eventos.filter(pk__gt=ultimo_pk)[:TAMANO_LOTE])
+        if not lote:
+            return
+        filas = []
+        for evento in lote:
+            nombres = _parsear(evento.participantes)
+            evento.total_participantes = len(nombres)
+            filas.extend(
+                ParticipanteEvento(evento_id=evento.pk, orden=orden, nombre=nombre)
+                for orden, nombre in enumerate(nombres)
+            )
+        ParticipanteEvento.objects.bulk_create(filas, batch_size=TAMANO_LOTE)
+        Evento.objects.bulk_update(lote, ['total_participantes'], batch_size=TAMANO_LOTE)
+        ultimo_pk = lote[-1].pk
+
+
+def vaciar_participantes(apps, schema_editor):
+    apps.get_model('eventos', 'ParticipanteEvento').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0009_participantes_evento'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_participantes, vaciar_participantes),
+    ]
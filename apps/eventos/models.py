@@ -7,6 +7,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from apps.authentication.models import User
+from .signals import eventos_modificados
 
 
 class CategoriaEvento(models.Model):
@@ -58,6 +59,173 @@ class CategoriaEvento(models.Model):
         return self.nombre
 
 
+# Campos a partir de los cuales se derivan fecha_hora_inicio / fecha_hora_fin
+CAMPOS_RANGO_TEMPORAL = {'fecha_evento', 'hora_evento', 'duracion', 'duracion_personalizada'}
+
+# Columnas que solo se derivan de otras (no alteran resúmenes)
+CAMPOS_DERIVADOS = {'fecha_hora_inicio', 'fecha_hora_fin', 'total_participantes'}
+
+# Valores de un evento que determinan los resúmenes precalculados; cada
+# escritura envía la huella anterior y la nueva para aplicarlas como deltas
+CAMPOS_HUELLA = (
+    'usuario_id', 'prioridad', 'etapa', 'fecha_evento', 'hora_evento', 'fecha_hora_fin', 'nombre_evento',
+)
+
+# Campos escribibles que alteran la huella
+CAMPOS_RESUMIDOS = {'usuario', 'usuario_id', 'prioridad', 'etapa', 'nombre_evento'} | CAMPOS_RANGO_TEMPORAL
+
+# Cota superior de duración: duracion_personalizada admite como máximo 99.99 h
+DURACION_MAXIMA_HORAS = 100
+
+LARGO_NOMBRE_PARTICIPANTE = 255
+
+
+def parsear_participantes(texto):
+    """Nombres de `texto` (uno por línea o separados por comas), sin vacíos"""
+    if not texto:
+        return []
+    nombres = (p.strip() for p in texto.replace(',', '\n').split('\n'))
+    return [nombre[:LARGO_NOMBRE_PARTICIPANTE] for nombre in nombres if nombre]
+
+
+class EventoQuerySet(models.QuerySet):
+    """
+    QuerySet de eventos que mantiene las columnas desnormalizadas
+    fecha_hora_inicio / fecha_hora_fin también en escrituras masivas
+    """
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.calcular_rango_temporal()
+            obj.total_participantes = len(parsear_participantes(obj.participantes))
+        creados = super().bulk_create(objs, *args, **kwargs)
+        ParticipanteEvento.objects.sincronizar([obj for obj in objs if obj.pk])
+        cambios = None
+        if not (kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts')) and all(obj.pk for obj in objs):
+            cambios = [(None, obj.huella()) for obj in objs]
+        self._notificar_cambios((obj.usuario_id for obj in objs), cambios)
+        return creados
+    
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        objs = list(objs)
+        if CAMPOS_RANGO_TEMPORAL & set(fields):
+            for obj in objs:
+                obj.calcular_rango_temporal()
+            fields += [f for f in ('fecha_hora_inicio', 'fecha_hora_fin') if f not in fields]
+        if 'participantes' in fields and 'total_participantes' not in fields:
+            # update() sincroniza las filas de participantes
+            for obj in objs:
+                obj.total_participantes = len(parsear_participantes(obj.participantes))
+            fields.append('total_participantes')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+    
+    def update(self, **kwargs):
+        if not set(kwargs) - CAMPOS_DERIVADOS:
+            return super().update(**kwargs)
+        # Igual que save(): updated_at refleja cualquier cambio de datos
+        # (la caché de reportes lo usa para invalidar)
+        from django.utils import timezone
+        kwargs.setdefault('updated_at', timezone.now())
+        if isinstance(kwargs.get('participantes'), str):
+            kwargs['total_participantes'] = len(parsear_participantes(kwargs['participantes']))
+        # Capturar las filas antes: el filtro puede dejar de coincidir tras el UPDATE
+        previas = {fila.pop('pk'): fila for fila in self.order_by().values('pk', *CAMPOS_HUELLA)}
+        filas = super().update(**kwargs)
+        pks = list(previas)
+        if CAMPOS_RANGO_TEMPORAL & set(kwargs):
+            self.model.objects.filter(pk__in=pks).recalcular_rango_temporal()
+        if 'participantes' in kwargs:
+            self.model.objects.filter(pk__in=pks).sincronizar_participantes()
+        cambios = []
+        if CAMPOS_RESUMIDOS & set(kwargs):
+            posteriores = self.model.objects.filter(pk__in=pks).values('pk', *CAMPOS_HUELLA)
+            cambios = [(previas[fila.pop('pk')], fila) for fila in posteriores]
+        usuario_ids = {fila['usuario_id'] for fila in previas.values()}
+        usuario_ids.update(despues['usuario_id'] for _, despues in cambios)
+        self._notificar_cambios(usuario_ids, cambios)
+        return filas
+    
+    def delete(self):
+        previas = list(self.order_by().values(*CAMPOS_HUELLA))
+        resultado = super().delete()
+        self._notificar_cambios((fila['usuario_id'] for fila in previas), [(fila, None) for fila in previas])
+        return resultado
+    
+    def _notificar_cambios(self, usuario_ids, cambios=None):
+        """
+        Avisa a los resúmenes precalculados qué responsables cambiaron y, si se
+        conocen, las huellas [(antes, despues)] de los eventos escritos
+        """
+        eventos_modificados.send(sender=self.model, usuario_ids=set(usuario_ids) - {None}, cambios=cambios)
+    
+    def recalcular_rango_temporal(self, batch_size=1000):
+        """Recalcula y persiste inicio/fin en lotes; devuelve filas actualizadas"""
+        total = 0
+        ultimo_pk = 0
+        qs = self.order_by('pk').only('pk', *CAMPOS_RANGO_TEMPORAL)
+        while True:
+            lote = list(qs.filter(pk__gt=ultimo_pk)[:batch_size])
+            if not lote:
+                return total
+            for evento in lote:
+                evento.calcular_rango_temporal()
+            self.model.objects.bulk_update(lote, ['fecha_hora_inicio', 'fecha_hora_fin'])
+            total += len(lote)
+            ultimo_pk = lote[-1].pk
+    
+    def sincronizar_participantes(self, batch_size=1000):
+        """
+        Rehace en lotes las filas de ParticipanteEvento y total_participantes
+        a partir del texto (p. ej. tras un update() con una expresión)
+        """
+        total = 0
+        ultimo_pk = 0
+        qs = self.order_by('pk').only('pk', 'participantes', 'total_participantes')
+        while True:
+            lote = list(qs.filter(pk__gt=ultimo_pk)[:batch_size])
+            if not lote:
+                return total
+            desactualizados = []
+            for evento in lote:
+                conteo = len(parsear_participantes(evento.participantes))
+                if evento.total_participantes != conteo:
+                    evento.total_participantes = conteo
+                    desactualizados.append(evento)
+            self.model.objects.bulk_update(desactualizados, ['total_participantes'])
+            total += ParticipanteEvento.objects.sincronizar(lote, batch_size)
+            ultimo_pk = lote[-1].pk
+    
+    def en_progreso(self, ahora=None):
+        """Eventos que están ocurriendo en `ahora`"""
+        from django.utils import timezone
+        ahora = ahora or timezone.now()
+        return self.filter(fecha_hora_inicio__lte=ahora, fecha_hora_fin__gte=ahora)
+    
+    def terminados(self, ahora=None):
+        """Eventos cuyo fin ya pasó"""
+        from django.utils import timezone
+        return self.filter(fecha_hora_fin__lt=ahora or timezone.now())
+    
+    def solapados(self, inicio, fin):
+        """
+        Eventos que se traslapan con el intervalo [inicio, fin).
+        La cota inferior por duración máxima acota el recorrido del índice de
+        fecha_hora_inicio a una ventana, sin importar el tamaño del histórico.
+        """
+        from datetime import timedelta
+        return self.filter(
+            fecha_hora_inicio__gt=inicio - timedelta(hours=DURACION_MAXIMA_HORAS),
+            fecha_hora_inicio__lt=fin,
+            fecha_hora_fin__gt=inicio,
+        )
+    
+    def sobre_aforo(self):
+        """Eventos con más participantes registrados que su aforo"""
+        return self.filter(total_participantes__gt=models.F('aforo'))
+
+
 class Evento(models.Model):
     """
     Modelo principal para los eventos del sistema
@@ -168,6 +336,14 @@ class Evento(models.Model):
         help_text=_('Lista de participantes esperados (uno por línea o separados por comas)')
     )
     
+    # Conteo de `participantes` (filas de ParticipanteEvento); se mantiene en
+    # save() y en escrituras masivas para compararlo con el aforo en SQL
+    total_participantes = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Total de participantes'),
+    )
+    
     # Usuario responsable
     usuario = models.ForeignKey(
         User,
@@ -227,6 +403,24 @@ class Evento(models.Model):
         help_text=_('Notas adicionales y observaciones sobre el evento')
     )
     
+    # Inicio y fin persistidos (derivados de fecha, hora y duración) para
+    # consultas por rango en SQL; se mantienen en save() y en escrituras masivas
+    fecha_hora_inicio = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('Inicio'),
+    )
+    
+    fecha_hora_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('Fin'),
+    )
+    
     # Metadatos
     marca_temporal = models.DateTimeField(
         auto_now_add=True,
@@ -239,6 +433,8 @@ class Evento(models.Model):
         verbose_name=_('Fecha de actualización')
     )
     
+    objects = EventoQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Evento')
         verbose_name_plural = _('Eventos')
@@ -248,6 +444,11 @@ class Evento(models.Model):
             models.Index(fields=['usuario']),
             models.Index(fields=['etapa']),
             models.Index(fields=['prioridad']),
+            # Clave de paginación por cursor de api_eventos
+            models.Index(fields=['fecha_evento', 'hora_evento', 'id']),
+            # Detección de conflictos por responsable y por sede
+            models.Index(fields=['usuario', 'fecha_hora_inicio']),
+            models.Index(fields=['sede', 'fecha_hora_inicio']),
         ]
     
     def __str__(self):
@@ -297,12 +498,8 @@ class Evento(models.Model):
     
     @property
     def participantes_count(self):
-        """Cuenta el número de participantes"""
-        if not self.participantes:
-            return 0
-        # Contar por líneas o por comas
-        participantes_list = self.participantes.replace(',', '\n').split('\n')
-        return len([p.strip() for p in participantes_list if p.strip()])
+        """Número de participantes (columna desnormalizada)"""
+        return self.total_participantes
     
     def puede_editar(self, user):
         """Verifica si un usuario puede editar este evento"""
@@ -327,6 +524,15 @@ class Evento(models.Model):
         if self.fecha_evento < timezone.now().date():
             raise ValidationError('La fecha del evento no puede ser en el pasado')
         
+        self.validar_datos()
+    
+    def validar_datos(self):
+        """
+        Reglas de consistencia de los datos del evento, sin la regla de fecha
+        futura (la importación acepta eventos históricos)
+        """
+        from django.core.exceptions import ValidationError
+        
         # Validar carpeta ejecutiva
         if self.carpeta_ejecutiva and not self.carpeta_ejecutiva_liga:
             raise ValidationError('Debe proporcionar la liga de la carpeta ejecutiva')
@@ -335,9 +541,220 @@ class Evento(models.Model):
         if self.duracion == 'otro' and not self.duracion_personalizada:
             raise ValidationError('Debe especificar la duración personalizada')
     
+    def calcular_rango_temporal(self):
+        """Asigna fecha_hora_inicio / fecha_hora_fin a partir de fecha, hora y duración"""
+        from datetime import datetime, timedelta
+        from django.utils import timezone
+        
+        # Normalizar valores que aún no pasaron por full_clean (p. ej. bulk_create)
+        for nombre in ('fecha_evento', 'hora_evento', 'duracion_personalizada'):
+            campo = self._meta.get_field(nombre)
+            setattr(self, nombre, campo.to_python(getattr(self, nombre)))
+        
+        inicio = timezone.make_aware(
+            datetime.combine(self.fecha_evento, self.hora_evento),
+            timezone.get_default_timezone()
+        )
+        self.fecha_hora_inicio = inicio
+        self.fecha_hora_fin = inicio + timedelta(hours=self.duracion_real)
+    
     def save(self, *args, **kwargs):
         """Sobrescribir save para validaciones adicionales"""
         self.full_clean()
+        self.calcular_rango_temporal()
+        self.total_participantes = len(parsear_participantes(self.participantes))
+        update_fields = kwargs.get('update_fields')
+        # Con pk asignada a mano save() puede actualizar una fila existente
+        nuevo = self._state.adding and self.pk is None
+        antes = None if self._state.adding else getattr(self, '_huella_cargada', None)
+        if update_fields is not None and CAMPOS_RANGO_TEMPORAL & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'fecha_hora_inicio', 'fecha_hora_fin'}
+        if update_fields is not None and 'participantes' in update_fields:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'total_participantes'}
         super().save(*args, **kwargs)
+        # Las filas de participantes solo se reescriben si se guardó el texto
+        # y cambió: con update_fields sin 'participantes' la fila conserva el anterior
+        escribe_participantes = update_fields is None or 'participantes' in update_fields
+        if escribe_participantes and self.participantes != getattr(self, '_participantes_cargados', ''):
+            ParticipanteEvento.objects.sincronizar([self])
+            self._participantes_cargados = self.participantes
+        # Si cambió el responsable, también se actualiza el resumen del anterior
+        usuario_ids = {self.usuario_id, getattr(self, '_usuario_id_cargado', None)}
+        self._usuario_id_cargado = self.usuario_id
+        if update_fields is None:
+            # Sin la huella cargada (instancia construida a mano) no hay delta
+            conocida = antes is not None or nuevo
+            cambios = [(antes, self.huella())] if conocida else None
+            self._huella_cargada = self.huella()
+        elif CAMPOS_RESUMIDOS & set(update_fields):
+            cambios = None
+            self._huella_cargada = None
+        else:
+            cambios = []
+        eventos_modificados.send(sender=Evento, usuario_ids=usuario_ids - {None}, cambios=cambios)
+    
+    def delete(self, *args, **kwargs):
+        usuario_id = self.usuario_id
+        antes = getattr(self, '_huella_cargada', None)
+        resultado = super().delete(*args, **kwargs)
+        cambios = [(antes, None)] if antes is not None else None
+        eventos_modificados.send(sender=Evento, usuario_ids={usuario_id}, cambios=cambios)
+        return resultado
+    
+    def huella(self):
+        """Valores de CAMPOS_HUELLA del evento en memoria"""
+        return {campo: getattr(self, campo) for campo in CAMPOS_HUELLA}
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Recuerda el responsable, los participantes y la huella cargados para
+        detectar reasignaciones y cambios de la lista y de los resúmenes en save()
+        """
+        instancia = super().from_db(db, field_names, values)
+        instancia._usuario_id_cargado = instancia.__dict__.get('usuario_id')
+        instancia._participantes_cargados = instancia.__dict__.get('participantes')
+        # Con campos diferidos no hay huella: las escrituras recalculan el resumen
+        if all(campo in instancia.__dict__ for campo in CAMPOS_HUELLA):
+            instancia._huella_cargada = instancia.huella()
+        return instancia
+
+
+class ParticipanteEventoQuerySet(models.QuerySet):
+    
+    def sincronizar(self, eventos, batch_size=1000):
+        """
+        Reemplaza las filas de `eventos` (instancias guardadas con
+        `participantes` cargado) por las que resultan de su texto
+        """
+        eventos = list(eventos)
+        if not eventos:
+            return 0
+        self.filter(evento_id__in=[evento.pk for evento in eventos]).delete()
+        filas = [
+            self.model(evento_id=evento.pk, orden=orden, nombre=nombre)
+            for evento in eventos
+            for orden, nombre in enumerate(parsear_participantes(evento.participantes))
+        ]
+        self.bulk_create(filas, batch_size=batch_size)
+        return len(filas)
+
+
+class ParticipanteEvento(models.Model):
+    """
+    Participante de un evento, normalizado a partir de Evento.participantes
+    El texto sigue siendo la entrada editable (formulario, API e importación);
+    estas filas se derivan de él en cada escritura y permiten paginar la
+    lista sin leer el texto completo.
+    """
+    evento = models.ForeignKey(
+        Evento,
+        on_delete=models.CASCADE,
+        related_name='participantes_evento',
+        verbose_name=_('Evento')
+    )
+    
+    # Posición en la lista original; es la clave de paginación
+    orden = models.PositiveIntegerField(verbose_name=_('Orden'))
+    
+    nombre = models.CharField(max_length=LARGO_NOMBRE_PARTICIPANTE, verbose_name=_('Nombre'))
+    
+    objects = ParticipanteEventoQuerySet.as_manager()
+    
+    class Meta:
+        verbose_name = _('Participante de evento')
+        verbose_name_plural = _('Participantes de eventos')
+        ordering = ['evento', 'orden']
+        constraints = [
+            models.UniqueConstraint(fields=['evento', 'orden'], name='participante_evento_orden_unico'),
+        ]
+    
+    def __str__(self):
+        return self.nombre
+
+
+class EstadisticasEventosUsuario(models.Model):
+    """
+    Resumen precalculado de los eventos de cada usuario
+    Cada escritura de eventos le aplica sus deltas (ver apps.eventos.estadisticas);
+    se reconcilia con `manage.py reconciliar_estadisticas_eventos`.
+    """
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estadisticas_eventos',
+        verbose_name=_('Usuario')
+    )
+    
+    total = models.PositiveIntegerField(default=0, verbose_name=_('Total de eventos'))
+    
+    urgentes = models.PositiveIntegerField(default=0, verbose_name=_('Eventos urgentes'))
+    
+    # Los terminados dependen del reloj: el conteo vale hasta `proximo_fin`,
+    # momento en que el siguiente evento termina y el resumen debe recalcularse
+    # (`manage.py refrescar_estadisticas_vencidas`)
+    terminados = models.PositiveIntegerField(default=0, verbose_name=_('Eventos terminados'))
+    
+    proximo_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name=_('Próximo fin'),
+    )
+    
+    ultimo_fecha = models.DateField(null=True, blank=True, verbose_name=_('Fecha del último evento'))
+    
+    ultimo_hora = models.TimeField(null=True, blank=True, verbose_name=_('Hora del último evento'))
+    
+    ultimo_nombre = models.CharField(max_length=200, blank=True, verbose_name=_('Nombre del último evento'))
+    
+    calculado_en = models.DateTimeField(verbose_name=_('Calculado en'))
+    
+    class Meta:
+        verbose_name = _('Estadísticas de eventos por usuario')
+        verbose_name_plural = _('Estadísticas de eventos por usuario')
+    
+    def __str__(self):
+        return f"{self.usuario} - {self.total} eventos"
 
 
+class ConteoMensualEventos(models.Model):
+    """
+    Conteo materializado de eventos por mes de fecha_evento, responsable,
+    prioridad y etapa para las gráficas por periodo. Se mantiene junto con
+    EstadisticasEventosUsuario y se reconstruye con
+    `manage.py reconstruir_conteos_mensuales`.
+    """
+    anio = models.PositiveSmallIntegerField(verbose_name=_('Año'))
+    
+    mes = models.PositiveSmallIntegerField(verbose_name=_('Mes'))
+    
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='conteos_mensuales_eventos',
+        verbose_name=_('Usuario')
+    )
+    
+    prioridad = models.CharField(max_length=20, verbose_name=_('Prioridad'))
+    
+    etapa = models.CharField(max_length=20, verbose_name=_('Etapa'))
+    
+    total = models.PositiveIntegerField(default=0, verbose_name=_('Total de eventos'))
+    
+    class Meta:
+        verbose_name = _('Conteo mensual de eventos')
+        verbose_name_plural = _('Conteos mensuales de eventos')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['anio', 'mes', 'usuario', 'prioridad', 'etapa'],
+                name='conteo_mensual_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['usuario', 'anio', 'mes']),
+        ]
+    
+    def __str__(self):
+        return f"{self.anio}-{self.mes:02d} {self.usuario_id} {self.prioridad}/{self.etapa}: {self.total}"
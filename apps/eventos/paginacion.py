@@ -0,0 +1,96 @@
+"""
+Paginación por cursor (keyset) para los listados de eventos
+Evita OFFSET: cada página continúa a partir de la última fila entregada
+"""
+
+import base64
+import json
+from datetime import date, time
+
+from django.db.models import Q
+
+
+# Tamaño de página por defecto y máximo permitido al paginar
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+class CursorInvalido(ValueError):
+    """El token de cursor recibido no se pudo decodificar"""
+
+
+def codificar_cursor(fila):
+    """
+    Genera el token opaco que apunta a la fila siguiente a `fila` (dict de values()).
+    La clave es (fecha_evento, hora_evento, id), el mismo orden del listado.
+    """
+    payload = [fila['fecha_evento'].isoformat(), fila['hora_evento'].isoformat(), fila['id']]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Devuelve la tupla (fecha, hora, id) contenida en el token"""
+    try:
+        padding = '=' * (-len(token) % 4)
+        fecha, hora, pk = json.loads(base64.urlsafe_b64decode(token + padding))
+        return date.fromisoformat(fecha), time.fromisoformat(hora), int(pk)
+    except Exception as exc:
+        raise CursorInvalido('Cursor inválido') from exc
+
+
+def aplicar_cursor(queryset, token):
+    """
+    Ordena el queryset de forma descendente por (fecha, hora, id) y, si hay
+    cursor, filtra las filas estrictamente posteriores a él en ese orden.
+    """
+    queryset = queryset.order_by('-fecha_evento', '-hora_evento', '-id')
+    if not token:
+        return queryset
+    fecha, hora, pk = decodificar_cursor(token)
+    return queryset.filter(
+        Q(fecha_evento__lt=fecha) |
+        Q(fecha_evento=fecha, hora_evento__lt=hora) |
+        Q(fecha_evento=fecha, hora_evento=hora, id__lt=pk)
+    )
+
+
+def parsear_limite(valor):
+    """Normaliza el parámetro `limit` al rango [1, LIMITE_MAXIMO]"""
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return LIMITE_DEFECTO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def paginar(queryset, token, limite):
+    """
+    Devuelve (filas, next_cursor) para una página del queryset.
+    Se pide una fila extra para saber si existe página siguiente.
+    """
+    filas = list(aplicar_cursor(queryset, token)[:limite + 1])
+    next_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        next_cursor = codificar_cursor(filas[-1])
+    return filas, next_cursor
+
+
+def paginar_participantes(queryset, token, limite):
+    """
+    Devuelve (filas, next_cursor) para una página de participantes de un
+    evento. El cursor es el `orden` de la última fila entregada.
+    """
+    queryset = queryset.order_by('orden')
+    if token:
+        try:
+            queryset = queryset.filter(orden__gt=int(token))
+        except ValueError as exc:
+            raise CursorInvalido('Cursor inválido') from exc
+    filas = list(queryset[:limite + 1])
+    next_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        next_cursor = str(filas[-1]['orden'])
+    return filas, next_cursor
@@ -0,0 +1,237 @@
+"""
+Capa de proyección y serialización de eventos para las APIs JSON
+Las filas se obtienen con values() uniendo las columnas del usuario (una sola
+consulta) y los tiempos se calculan contra una única instantánea de `ahora`.
+"""
+
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import Evento
+
+
+# Columnas del usuario responsable que se traen en el mismo JOIN
+COLUMNAS_USUARIO = ('usuario_id', 'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__email')
+# Columnas necesarias para calcular inicio, fin y estado temporal (las
+# persistidas se usan si existen; el resto es respaldo para filas sin backfill)
+COLUMNAS_TIEMPO = (
+    'fecha_evento', 'hora_evento', 'duracion', 'duracion_personalizada', 'fecha_hora_inicio', 'fecha_hora_fin',
+)
+
+ETAPAS = dict(Evento.ETAPA_CHOICES)
+PRIORIDADES = dict(Evento.PRIORIDAD_CHOICES)
+
+# Campos que expone api_eventos (GET) y columnas que necesita cada uno
+CAMPOS_API = {
+    'id': (),
+    'titulo': ('nombre_evento',),
+    'descripcion': ('objetivo',),
+    'fecha_inicio': COLUMNAS_TIEMPO,
+    'fecha_fin': COLUMNAS_TIEMPO,
+    'ubicacion': ('sede',),
+    'prioridad': ('prioridad',),
+    'estado': ('etapa',),
+    'estado_display': ('etapa',),
+    'categoria_nombre': (),
+    'usuario': COLUMNAS_USUARIO,
+    'puede_editar': (),
+    'puede_ver': (),
+    'carpeta_ejecutiva': ('carpeta_ejecutiva',),
+    'carpeta_ejecutiva_liga': ('carpeta_ejecutiva', 'carpeta_ejecutiva_liga'),
+    'ha_terminado': COLUMNAS_TIEMPO,
+    'evidencias': ('evidencias',),
+    'aforo': ('aforo',),
+    'participantes': ('participantes',),
+    'total_participantes': ('total_participantes',),
+    'observaciones': ('observaciones',),
+    'link_maps': ('link_maps',),
+}
+
+# Sin ?fields= se omite el texto completo de participantes: la lista se pagina
+# en api_evento_participantes y el detalle lo incluye para edición
+CAMPOS_POR_DEFECTO = [campo for campo in CAMPOS_API if campo != 'participantes']
+
+COLUMNAS_CALENDARIO = (
+    'id', 'nombre_evento', 'objetivo', 'etapa', 'prioridad', 'sede', 'evidencias',
+) + COLUMNAS_TIEMPO + COLUMNAS_USUARIO
+
+
+def parsear_campos(valor):
+    """
+    Convierte ?fields=a,b,c en la lista de campos a serializar.
+    Sin parámetro devuelve CAMPOS_POR_DEFECTO; con algún campo desconocido
+    devuelve None.
+    """
+    if not valor.strip():
+        return list(CAMPOS_POR_DEFECTO)
+    campos = [c.strip() for c in valor.split(',') if c.strip()]
+    if any(c not in CAMPOS_API for c in campos):
+        return None
+    if 'id' not in campos:
+        campos.insert(0, 'id')
+    return campos
+
+
+def columnas_para(campos):
+    """Columnas de values() necesarias para serializar `campos`"""
+    columnas = {'id', 'fecha_evento', 'hora_evento', 'usuario_id'}
+    for campo in campos:
+        columnas.update(CAMPOS_API[campo])
+    return sorted(columnas)
+
+
+def fila_desde_instancia(evento):
+    """Adapta una instancia (con select_related('usuario')) al formato de fila"""
+    fila = {f.attname: getattr(evento, f.attname) for f in Evento._meta.concrete_fields}
+    fila.update({
+        'usuario__first_name': evento.usuario.first_name,
+        'usuario__last_name': evento.usuario.last_name,
+        'usuario__username': evento.usuario.username,
+        'usuario__email': evento.usuario.email,
+    })
+    return fila
+
+
+def nombre_completo(fila):
+    """Mismo criterio que User.get_full_name() usando las columnas unidas"""
+    if fila['usuario__first_name'] and fila['usuario__last_name']:
+        return f"{fila['usuario__first_name']} {fila['usuario__last_name']}"
+    return fila['usuario__username']
+
+
+def duracion_horas(fila):
+    """Equivalente a Evento.duracion_real sobre una fila"""
+    if fila['duracion'] == 'otro':
+        return float(fila['duracion_personalizada'] or 0)
+    return float(fila['duracion'])
+
+
+class Tiempos:
+    """Inicio, fin y estado temporal de una fila respecto a una instantánea"""
+
+    __slots__ = ('inicio', 'fin', 'en_progreso', 'terminado')
+
+    def __init__(self, fila, ahora, tz):
+        if fila.get('fecha_hora_inicio') and fila.get('fecha_hora_fin'):
+            self.inicio = fila['fecha_hora_inicio'].astimezone(tz)
+            self.fin = fila['fecha_hora_fin'].astimezone(tz)
+        else:
+            self.inicio = timezone.make_aware(datetime.combine(fila['fecha_evento'], fila['hora_evento']), tz)
+            self.fin = self.inicio + timedelta(hours=duracion_horas(fila))
+        self.en_progreso = self.inicio <= ahora <= self.fin
+        self.terminado = self.fin < ahora
+
+
+class Serializador:
+    """
+    Serializa filas de eventos para un usuario compartiendo `ahora` y la zona
+    horaria entre todas las filas de la respuesta.
+    """
+
+    def __init__(self, user, ahora=None):
+        self.user = user
+        self.ahora = ahora or timezone.now()
+        self.tz = timezone.get_current_timezone()
+        self.es_gestor = user.user_level in ['ADMIN', 'MANAGER']
+
+    def tiempos(self, fila):
+        return Tiempos(fila, self.ahora, self.tz)
+
+    def puede_editar(self, fila):
+        return fila['usuario_id'] == self.user.id or self.es_gestor
+
+    def api(self, fila, campos):
+        """Formato de api_eventos (GET) restringido a `campos`"""
+        t = self.tiempos(fila) if 'fecha_evento' in fila and 'duracion' in fila else None
+        valores = {
+            'id': lambda: fila['id'],
+            'titulo': lambda: fila['nombre_evento'],
+            'descripcion': lambda: fila['objetivo'],
+            'fecha_inicio': lambda: t.inicio.isoformat(),
+            'fecha_fin': lambda: t.fin.isoformat(),
+            'ubicacion': lambda: fila['sede'],
+            'prioridad': lambda: fila['prioridad'],
+            'estado': lambda: fila['etapa'],
+            'estado_display': lambda: str(ETAPAS.get(fila['etapa'], fila['etapa'])),
+            'categoria_nombre': lambda: 'Evento',  # Valor por defecto ya que no usamos categorías
+            'usuario': lambda: {
+                'id': fila['usuario_id'],
+                'nombre': nombre_completo(fila),
+                'email': fila['usuario__email'],
+            },
+            'puede_editar': lambda: self.puede_editar(fila),
+            'puede_ver': lambda: self.puede_editar(fila),
+            'carpeta_ejecutiva': lambda: fila['carpeta_ejecutiva'],
+            'carpeta_ejecutiva_liga': lambda: fila['carpeta_ejecutiva_liga'] if fila['carpeta_ejecutiva'] else None,
+            'ha_terminado': lambda: t.terminado,
+            'evidencias': lambda: fila['evidencias'],
+            'aforo': lambda: fila['aforo'],
+            'participantes': lambda: fila['participantes'],
+            'total_participantes': lambda: fila['total_participantes'],
+            'observaciones': lambda: fila['observaciones'],
+            'link_maps': lambda: fila['link_maps'],
+        }
+        return {campo: valores[campo]() for campo in campos}
+
+    def calendario(self, fila):
+        """Formato de api_eventos_usuario (FullCalendar)"""
+        t = self.tiempos(fila)
+        objetivo = fila['objetivo']
+        return {
+            'id': fila['id'],
+            'titulo': fila['nombre_evento'],
+            'descripcion': objetivo[:100] + '...' if len(objetivo) > 100 else objetivo,
+            'fecha_inicio': t.inicio.isoformat(),  # Formato ISO para FullCalendar
+            'fecha_fin': t.fin.isoformat(),
+            'estado': fila['etapa'],
+            'estado_display': str(ETAPAS.get(fila['etapa'], fila['etapa'])),
+            'prioridad': fila['prioridad'],
+            'prioridad_display': str(PRIORIDADES.get(fila['prioridad'], fila['prioridad'])),
+            'categoria': None,  # Ya no usamos categorías
+            'categoria_color': '#06A77D',  # Color por defecto
+            'ubicacion': fila['sede'],
+            'es_creador': fila['usuario_id'] == self.user.id,
+            'puede_editar': self.puede_editar(fila),
+            'duracion_horas': duracion_horas(fila),
+            'esta_activo': t.en_progreso,
+            'ha_terminado': t.terminado,
+            'evidencias': fila['evidencias'],
+            'usuario': {
+                'id': fila['usuario_id'],
+                'nombre': f"{fila['usuario__first_name']} {fila['usuario__last_name']}".strip() or fila['usuario__username'],
+                'username': fila['usuario__username'],
+            }
+        }
+
+    def detalle(self, fila):
+        """Formato de api_evento_detail (GET), incluye campos para edición"""
+        t = self.tiempos(fila)
+        return {
+            'id': fila['id'],
+            'titulo': fila['nombre_evento'],
+            'descripcion': fila['objetivo'],
+            'fecha_inicio': t.inicio.isoformat(),
+            'fecha_fin': t.fin.isoformat(),
+            'ubicacion': fila['sede'],
+            'prioridad': fila['prioridad'],
+            'estado': fila['etapa'],
+            'estado_display': str(ETAPAS.get(fila['etapa'], fila['etapa'])),
+            'usuario': {
+                'id': fila['usuario_id'],
+                'nombre': nombre_completo(fila),
+            },
+            'puede_editar': self.puede_editar(fila),
+            # Campos adicionales para la edición
+            'aforo': fila['aforo'],
+            'link_maps': fila['link_maps'],
+            'participantes': fila['participantes'],
+            'total_participantes': fila['total_participantes'],
+            'carpeta_ejecutiva': fila['carpeta_ejecutiva'],
+            'carpeta_ejecutiva_liga': fila['carpeta_ejecutiva_liga'],
+            'evidencias': fila['evidencias'],
+            'ha_terminado': t.terminado,
+            'observaciones': fila['observaciones'],
+            'duracion': fila['duracion'],
+            'duracion_personalizada': fila['duracion_personalizada'],
+        }
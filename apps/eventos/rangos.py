@@ -0,0 +1,101 @@
+"""
+Aritmética de rangos de fechas para la carga incremental del calendario
+Los rangos son semiabiertos [inicio, fin) como los que envía FullCalendar
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+class RangoInvalido(ValueError):
+    """Parámetro de rango de fechas mal formado"""
+
+
+def parsear_fecha(valor):
+    """
+    Acepta 'YYYY-MM-DD' o un ISO datetime ('2025-08-01T00:00:00-06:00');
+    solo se usa la porción de fecha.
+    """
+    try:
+        return date.fromisoformat(valor.strip()[:10])
+    except (AttributeError, ValueError) as exc:
+        raise RangoInvalido(f'Fecha inválida: {valor}') from exc
+
+
+def parsear_rango(inicio, fin):
+    """Construye un rango validando que fin sea posterior a inicio"""
+    rango = (parsear_fecha(inicio), parsear_fecha(fin))
+    if rango[1] <= rango[0]:
+        raise RangoInvalido('El fin del rango debe ser posterior al inicio')
+    return rango
+
+
+def parsear_rangos(texto):
+    """Lee 'inicio/fin,inicio/fin' (formato de `rangos_cargados`)"""
+    rangos = []
+    for parte in (texto or '').split(','):
+        if not parte.strip():
+            continue
+        try:
+            inicio, fin = parte.split('/')
+        except ValueError as exc:
+            raise RangoInvalido(f'Rango inválido: {parte}') from exc
+        rangos.append(parsear_rango(inicio, fin))
+    return rangos
+
+
+def fusionar_rangos(rangos):
+    """Une rangos solapados o contiguos y los devuelve ordenados"""
+    fusionados = []
+    for inicio, fin in sorted(rangos):
+        if fusionados and inicio <= fusionados[-1][1]:
+            fusionados[-1] = (fusionados[-1][0], max(fusionados[-1][1], fin))
+        else:
+            fusionados.append((inicio, fin))
+    return fusionados
+
+
+def restar_rangos(rango, cubiertos):
+    """Devuelve las partes de `rango` que no cubre ninguno de `cubiertos`"""
+    inicio, fin = rango
+    huecos = []
+    for c_inicio, c_fin in fusionar_rangos(cubiertos):
+        if c_fin <= inicio or c_inicio >= fin:
+            continue
+        if c_inicio > inicio:
+            huecos.append((inicio, c_inicio))
+        inicio = max(inicio, c_fin)
+        if inicio >= fin:
+            break
+    if inicio < fin:
+        huecos.append((inicio, fin))
+    return huecos
+
+
+def formatear_rangos(rangos):
+    """Serializa rangos como lista de {'start', 'end'} ISO"""
+    return [{'start': inicio.isoformat(), 'end': fin.isoformat()} for inicio, fin in rangos]
+
+
+def filtro_solapados(rangos, tz=None):
+    """
+    Q de los eventos que se traslapan con alguno de `rangos` (inicio < fin
+    del rango y fin > inicio del rango), no solo de los que empiezan dentro:
+    un evento que inicia antes y continúa en el rango también se muestra.
+    La cota inferior por duración máxima acota el recorrido del índice de
+    fecha_hora_inicio, igual que EventoQuerySet.solapados.
+    """
+    from .models import DURACION_MAXIMA_HORAS
+    tz = tz or timezone.get_current_timezone()
+    filtro = Q(pk__in=[])
+    for inicio, fin in rangos:
+        inicio = timezone.make_aware(datetime.combine(inicio, time.min), tz)
+        fin = timezone.make_aware(datetime.combine(fin, time.min), tz)
+        filtro |= Q(
+            fecha_hora_inicio__gt=inicio - timedelta(hours=DURACION_MAXIMA_HORAS),
+            fecha_hora_inicio__lt=fin,
+            fecha_hora_fin__gt=inicio,
+        )
+    return filtro
@@ -0,0 +1,10 @@
+"""
+Señales de la aplicación de eventos
+"""
+
+from django.dispatch import Signal
+
+
+# Se envía tras cualquier escritura de eventos (save, delete y operaciones
+# masivas del QuerySet) con `usuario_ids`: responsables cuyos eventos cambiaron
+eventos_modificados = Signal()
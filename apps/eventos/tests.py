@@ -4,7 +4,8 @@ from django.conf import settings
 from datetime import timedelta
 
 from apps.authentication.models import User
-from .models import Evento
+from core.pruebas import PresupuestoConsultasMixin
+from .models import ConteoMensualEventos, EstadisticasEventosUsuario, Evento, ParticipanteEvento
 
 
 class EventoFechaValidacionTests(TestCase):
@@ -89,3 +90,589 @@ class EventoFechaValidacionTests(TestCase):
 		self.assertEqual(resp.status_code, 200)
 		evento.refresh_from_db()
 		self.assertEqual(evento.fecha_evento.strftime('%Y-%m-%d'), manana)
+
+
+class ApiEventosCursorTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='paginador',
+			email='paginador@example.com',
+			password='pass1234'
+		)
+		self.client = Client()
+		self.client.login(email='paginador@example.com', password='pass1234')
+		hoy = timezone.now().date()
+		for i in range(5):
+			Evento.objects.create(
+				nombre_evento=f'Evento {i}',
+				fecha_evento=hoy + timedelta(days=i % 3),
+				hora_evento='10:00',
+				participantes='Ana, Luis',
+				usuario=self.user
+			)
+
+	def test_paginas_sin_duplicados_ni_huecos(self):
+		ids, cursor = [], None
+		while True:
+			params = {'limit': 2}
+			if cursor:
+				params['cursor'] = cursor
+			data = self.client.get('/eventos/api/eventos/', params).json()
+			self.assertLessEqual(len(data['eventos']), 2)
+			ids.extend(e['id'] for e in data['eventos'])
+			cursor = data['next_cursor']
+			if not cursor:
+				break
+		self.assertEqual(sorted(ids), sorted(Evento.objects.values_list('id', flat=True)))
+		self.assertEqual(len(ids), len(set(ids)))
+
+	def test_proyeccion_de_campos(self):
+		data = self.client.get('/eventos/api/eventos/', {'fields': 'titulo,fecha_inicio'}).json()
+		self.assertEqual(set(data['eventos'][0]), {'id', 'titulo', 'fecha_inicio'})
+		self.assertIsNone(data['next_cursor'])
+
+	def test_campo_o_cursor_invalido(self):
+		self.assertEqual(self.client.get('/eventos/api/eventos/', {'fields': 'password'}).status_code, 400)
+		self.assertEqual(self.client.get('/eventos/api/eventos/', {'cursor': '???'}).status_code, 400)
+
+
+class ApiEventosUsuarioVentanaTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='calendario',
+			email='calendario@example.com',
+			password='pass1234'
+		)
+		self.client = Client()
+		self.client.login(email='calendario@example.com', password='pass1234')
+		self.hoy = timezone.now().date()
+		for dias in (0, 10, 40):
+			Evento.objects.create(
+				nombre_evento=f'En {dias} dias',
+				fecha_evento=self.hoy + timedelta(days=dias),
+				usuario=self.user
+			)
+
+	def test_ventana_filtra_por_fecha(self):
+		data = self.client.get('/eventos/api/mis-eventos/', {
+			'start': self.hoy.isoformat(),
+			'end': (self.hoy + timedelta(days=30)).isoformat() + 'T00:00:00-06:00',
+		}).json()
+		self.assertEqual(sorted(e['titulo'] for e in data['eventos']), ['En 0 dias', 'En 10 dias'])
+		self.assertEqual(data['rangos_cargados'], [{
+			'start': self.hoy.isoformat(),
+			'end': (self.hoy + timedelta(days=30)).isoformat(),
+		}])
+
+	def test_solo_consulta_huecos_no_cargados(self):
+		d = lambda n: (self.hoy + timedelta(days=n)).isoformat()
+		data = self.client.get('/eventos/api/mis-eventos/', {
+			'start': d(0),
+			'end': d(60),
+			'cargados': f'{d(-5)}/{d(20)}',
+		}).json()
+		self.assertEqual([e['titulo'] for e in data['eventos']], ['En 40 dias'])
+		self.assertEqual(data['rangos_cargados'], [{'start': d(-5), 'end': d(60)}])
+
+	def test_incluye_eventos_que_empiezan_antes_de_la_ventana(self):
+		Evento.objects.create(
+			nombre_evento='Nocturno',
+			fecha_evento=self.hoy + timedelta(days=9),
+			hora_evento='23:00',
+			duracion='2',
+			usuario=self.user
+		)
+		data = self.client.get('/eventos/api/mis-eventos/', {
+			'start': (self.hoy + timedelta(days=10)).isoformat(),
+			'end': (self.hoy + timedelta(days=20)).isoformat(),
+		}).json()
+		self.assertEqual(sorted(e['titulo'] for e in data['eventos']), ['En 10 dias', 'Nocturno'])
+
+	def test_rango_invertido(self):
+		resp = self.client.get('/eventos/api/mis-eventos/', {
+			'start': self.hoy.isoformat(),
+			'end': self.hoy.isoformat(),
+		})
+		self.assertEqual(resp.status_code, 400)
+
+
+class ProyeccionEventosQueriesTests(PresupuestoConsultasMixin, TestCase):
+	def setUp(self):
+		self.admin = User.objects.create_user(
+			username='jefa',
+			email='jefa@example.com',
+			password='pass1234',
+			user_level='ADMIN'
+		)
+		self.client = Client()
+		self.client.login(email='jefa@example.com', password='pass1234')
+
+	def _crear_eventos(self, n):
+		hoy = timezone.now().date()
+		for i in range(n):
+			autor = User.objects.create_user(
+				username=f'autor{i}_{Evento.objects.count()}',
+				email=f'autor{i}_{Evento.objects.count()}@example.com',
+				password='pass1234'
+			)
+			Evento.objects.create(nombre_evento=f'E{i}', fecha_evento=hoy, usuario=autor)
+
+	def _contar_queries(self, url):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_queries_constantes_por_numero_de_eventos(self):
+		for url in ('/eventos/api/eventos/', '/eventos/api/mis-eventos/'):
+			self._crear_eventos(2)
+			pocas = self._contar_queries(url)
+			self._crear_eventos(6)
+			muchas = self._contar_queries(url)
+			self.assertEqual(pocas, muchas, url)
+
+	def test_dentro_del_presupuesto(self):
+		self._crear_eventos(10)
+		evento = Evento.objects.first()
+		for url in (
+			'/eventos/api/eventos/', '/eventos/api/mis-eventos/', '/eventos/perfil/', '/eventos/notificaciones/',
+			f'/eventos/api/eventos/{evento.id}/participantes/',
+		):
+			self.assertEqual(self.assertDentroDelPresupuesto(url).status_code, 200, url)
+
+	def test_detalle_mantiene_formato(self):
+		self._crear_eventos(1)
+		evento = Evento.objects.get()
+		data = self.client.get(f'/eventos/api/eventos/{evento.id}/').json()['evento']
+		self.assertEqual(data['usuario']['id'], evento.usuario_id)
+		self.assertEqual(data['estado_display'], evento.get_etapa_display())
+		self.assertEqual(data['fecha_inicio'], evento.fecha_hora_completa.isoformat())
+		self.assertEqual(data['ha_terminado'], evento.ha_terminado)
+		self.assertTrue(data['puede_editar'])
+
+
+class EventoRangoTemporalTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='rangos',
+			email='rangos@example.com',
+			password='pass1234'
+		)
+		self.manana = timezone.now().date() + timedelta(days=1)
+
+	def test_save_calcula_inicio_y_fin(self):
+		evento = Evento.objects.create(
+			nombre_evento='Taller', fecha_evento=self.manana, hora_evento='10:00',
+			duracion='otro', duracion_personalizada='1.5', usuario=self.user
+		)
+		evento.refresh_from_db()
+		self.assertEqual(evento.fecha_hora_inicio, evento.fecha_hora_completa)
+		self.assertEqual(evento.fecha_hora_fin - evento.fecha_hora_inicio, timedelta(hours=1.5))
+
+	def test_escrituras_masivas_mantienen_columnas(self):
+		Evento.objects.bulk_create([
+			Evento(nombre_evento='Masivo', fecha_evento=self.manana, hora_evento='08:00', usuario=self.user)
+		])
+		evento = Evento.objects.get(nombre_evento='Masivo')
+		self.assertEqual(evento.fecha_hora_fin - evento.fecha_hora_inicio, timedelta(hours=2))
+
+		Evento.objects.filter(pk=evento.pk).update(duracion='4')
+		evento.refresh_from_db()
+		self.assertEqual(evento.fecha_hora_fin - evento.fecha_hora_inicio, timedelta(hours=4))
+
+	def test_backfill_y_consultas_por_rango(self):
+		from django.core.management import call_command
+		from io import StringIO
+		evento = Evento.objects.create(nombre_evento='Viejo', fecha_evento=self.manana, usuario=self.user)
+		Evento.objects.filter(pk=evento.pk).update(fecha_hora_inicio=None, fecha_hora_fin=None)
+
+		call_command('backfill_fecha_hora_evento', '--solo-faltantes', '--batch-size', '1', stdout=StringIO())
+		evento.refresh_from_db()
+		self.assertIsNotNone(evento.fecha_hora_fin)
+
+		durante = evento.fecha_hora_inicio + timedelta(minutes=30)
+		self.assertTrue(Evento.objects.en_progreso(durante).filter(pk=evento.pk).exists())
+		self.assertTrue(Evento.objects.terminados(evento.fecha_hora_fin + timedelta(seconds=1)).exists())
+		self.assertFalse(Evento.objects.solapados(evento.fecha_hora_fin, evento.fecha_hora_fin + timedelta(hours=1)).exists())
+
+
+class ConflictosEventosTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='agenda',
+			email='agenda@example.com',
+			password='pass1234'
+		)
+		self.otro = User.objects.create_user(
+			username='otro',
+			email='otro@example.com',
+			password='pass1234'
+		)
+		self.client = Client()
+		self.client.login(email='agenda@example.com', password='pass1234')
+		self.manana = timezone.now().date() + timedelta(days=1)
+		self.base = Evento.objects.create(
+			nombre_evento='Base', fecha_evento=self.manana, hora_evento='10:00',
+			duracion='2', sede='Auditorio', usuario=self.user
+		)
+
+	def _payload(self, **extra):
+		data = {
+			'nombre_evento': 'Nuevo',
+			'fecha_evento': self.manana.strftime('%Y-%m-%d'),
+			'hora_evento': '11:00',
+			'duracion': '1',
+			'sede': 'Sala B',
+		}
+		data.update(extra)
+		return data
+
+	def test_crear_reporta_conflicto_del_responsable(self):
+		resp = self.client.post('/eventos/api/eventos/', data=self._payload(), content_type='application/json')
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([c['id'] for c in resp.json()['conflictos']], [self.base.id])
+
+	def test_crear_sin_traslape(self):
+		resp = self.client.post('/eventos/api/eventos/', data=self._payload(hora_evento='12:00'), content_type='application/json')
+		self.assertEqual(resp.json()['conflictos'], [])
+
+	def test_rechazar_conflictos(self):
+		resp = self.client.post('/eventos/api/eventos/', data=self._payload(rechazar_conflictos=True), content_type='application/json')
+		self.assertEqual(resp.status_code, 409)
+		self.assertFalse(Evento.objects.filter(nombre_evento='Nuevo').exists())
+
+	def test_pares_por_sede(self):
+		Evento.objects.create(
+			nombre_evento='Misma sede', fecha_evento=self.manana, hora_evento='11:30',
+			sede='Auditorio', usuario=self.otro
+		)
+		Evento.objects.create(
+			nombre_evento='Otra sede', fecha_evento=self.manana, hora_evento='10:30',
+			sede='Patio', usuario=self.otro
+		)
+		self.user.user_level = 'MANAGER'
+		self.user.save()
+		data = self.client.get('/eventos/api/conflictos/', {
+			'start': self.manana.isoformat(),
+			'end': (self.manana + timedelta(days=1)).isoformat(),
+			'sede': 'Auditorio',
+		}).json()
+		self.assertEqual(data['total'], 1)
+		par = data['pares'][0]
+		self.assertEqual({par['evento_a']['titulo'], par['evento_b']['titulo']}, {'Base', 'Misma sede'})
+
+	def test_barrido_traslapes(self):
+		from apps.eventos.conflictos import barrido_traslapes
+		intervalos = [(0, 10, 'a'), (2, 4, 'b'), (3, 5, 'c'), (10, 12, 'd')]
+		pares = {(a, b) for a, b, _, _ in barrido_traslapes(intervalos)}
+		self.assertEqual(pares, {('a', 'b'), ('a', 'c'), ('b', 'c')})
+
+
+class EventosBulkNdjsonTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='importador',
+			email='importador@example.com',
+			password='pass1234'
+		)
+		self.client = Client()
+		self.client.login(email='importador@example.com', password='pass1234')
+		self.manana = (timezone.now().date() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+	def _linea(self, **data):
+		import json
+		return json.dumps(data)
+
+	def test_importa_en_lotes_y_reporta_errores(self):
+		cuerpo = '\n'.join([
+			self._linea(nombre_evento='Uno', fecha_evento=self.manana, hora_evento='09:00'),
+			'{no es json',
+			self._linea(nombre_evento='Dos', fecha_evento=self.manana, hora_evento='25:00'),
+			'',
+			self._linea(nombre_evento='Tres', fecha_evento=self.manana, hora_evento='10:00', prioridad='urgente'),
+			self._linea(nombre_evento='Ajeno', fecha_evento=self.manana, hora_evento='10:00', usuario='otro@example.com'),
+		])
+		resp = self.client.post('/eventos/api/eventos/bulk/', data=cuerpo, content_type='application/x-ndjson')
+		data = resp.json()
+		self.assertEqual(data['creados'], 2)
+		self.assertEqual([e['linea'] for e in data['errores']], [2, 3, 6])
+		self.assertEqual(
+			sorted(Evento.objects.values_list('nombre_evento', flat=True)), ['Tres', 'Uno']
+		)
+		self.assertTrue(all(e.fecha_hora_fin for e in Evento.objects.all()))
+
+	def test_usuario_que_no_es_texto_es_error_de_linea(self):
+		self.user.user_level = 'ADMIN'
+		self.user.save()
+		cuerpo = '\n'.join([
+			self._linea(nombre_evento='Lista', fecha_evento=self.manana, hora_evento='09:00', usuario=['a']),
+			self._linea(nombre_evento='Objeto', fecha_evento=self.manana, hora_evento='09:00', usuario={'email': 'a'}),
+			self._linea(nombre_evento='Propio', fecha_evento=self.manana, hora_evento='10:00'),
+		])
+		data = self.client.post('/eventos/api/eventos/bulk/', data=cuerpo, content_type='application/x-ndjson').json()
+		self.assertEqual(data['creados'], 1)
+		self.assertEqual([e['linea'] for e in data['errores']], [1, 2])
+		self.assertIn('usuario', data['errores'][0]['errores'][0])
+
+	def test_dry_run_no_inserta(self):
+		cuerpo = self._linea(nombre_evento='Uno', fecha_evento=self.manana, hora_evento='09:00')
+		resp = self.client.post('/eventos/api/eventos/bulk/?dry_run=1', data=cuerpo, content_type='application/x-ndjson')
+		self.assertEqual(resp.json()['creados'], 1)
+		self.assertFalse(Evento.objects.exists())
+
+	def test_exportacion_streaming_reimportable(self):
+		import json
+		Evento.objects.create(nombre_evento='Exportado', fecha_evento=self.manana, usuario=self.user)
+		resp = self.client.get('/eventos/api/eventos/bulk/')
+		self.assertTrue(resp.streaming)
+		lineas = b''.join(resp.streaming_content).decode().splitlines()
+		self.assertEqual(json.loads(lineas[0])['nombre_evento'], 'Exportado')
+
+		resp = self.client.post('/eventos/api/eventos/bulk/', data='\n'.join(lineas), content_type='application/x-ndjson')
+		self.assertEqual(resp.json()['creados'], 1)
+		self.assertEqual(Evento.objects.filter(nombre_evento='Exportado').count(), 2)
+
+	def test_reimporta_eventos_historicos(self):
+		import json
+		pasado = timezone.now().date() - timedelta(days=30)
+		Evento.objects.bulk_create([Evento(nombre_evento='Histórico', fecha_evento=pasado, usuario=self.user)])
+		lineas = b''.join(self.client.get('/eventos/api/eventos/bulk/').streaming_content).decode().splitlines()
+		lineas.append(self._linea(
+			nombre_evento='Sin liga', fecha_evento=pasado.isoformat(), hora_evento='09:00', carpeta_ejecutiva=True
+		))
+		data = self.client.post('/eventos/api/eventos/bulk/', data='\n'.join(lineas), content_type='application/x-ndjson').json()
+		self.assertEqual(data['creados'], 1)
+		self.assertEqual([e['linea'] for e in data['errores']], [2])
+		self.assertEqual(Evento.objects.filter(nombre_evento='Histórico', fecha_evento=pasado).count(), 2)
+
+
+class EstadisticasEventosUsuarioTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='resumen',
+			email='resumen@example.com',
+			password='pass1234'
+		)
+		self.otro = User.objects.create_user(
+			username='resumen2',
+			email='resumen2@example.com',
+			password='pass1234'
+		)
+		self.manana = timezone.now().date() + timedelta(days=1)
+
+	def _resumen(self, user):
+		return EstadisticasEventosUsuario.objects.get(usuario=user)
+
+	def test_se_mantiene_en_cada_escritura(self):
+		evento = Evento.objects.create(
+			nombre_evento='Primero', fecha_evento=self.manana, prioridad='urgente', usuario=self.user
+		)
+		Evento.objects.bulk_create([
+			Evento(nombre_evento='Segundo', fecha_evento=self.manana + timedelta(days=1), usuario=self.user)
+		])
+		resumen = self._resumen(self.user)
+		self.assertEqual((resumen.total, resumen.urgentes), (2, 1))
+		self.assertEqual(resumen.ultimo_nombre, 'Segundo')
+
+		# Reasignar el evento actualiza el resumen de ambos responsables
+		evento = Evento.objects.get(pk=evento.pk)
+		evento.usuario = self.otro
+		evento.save()
+		self.assertEqual(self._resumen(self.user).total, 1)
+		self.assertEqual(self._resumen(self.otro).urgentes, 1)
+
+		Evento.objects.filter(usuario=self.user).update(prioridad='urgente')
+		self.assertEqual(self._resumen(self.user).urgentes, 1)
+
+		Evento.objects.filter(usuario=self.user).delete()
+		evento.delete()
+		self.assertFalse(EstadisticasEventosUsuario.objects.exists())
+
+	def test_terminados_se_refrescan_al_pasar_el_fin(self):
+		from django.core.management import call_command
+		from io import StringIO
+		from unittest import mock
+		from .estadisticas import filas_estadisticas
+		evento = Evento.objects.create(nombre_evento='Pronto', fecha_evento=self.manana, usuario=self.user)
+		self.assertEqual(self._resumen(self.user).terminados, 0)
+		self.assertEqual(self._resumen(self.user).proximo_fin, evento.fecha_hora_fin)
+
+		# La lectura no escribe: el refresco es una tarea programada
+		despues = evento.fecha_hora_fin + timedelta(minutes=1)
+		with self.assertNumQueries(1):
+			fila = next(filas_estadisticas(despues))
+		self.assertEqual(fila['_ended_sum'], 0)
+		with mock.patch('django.utils.timezone.now', return_value=despues):
+			call_command('refrescar_estadisticas_vencidas', stdout=StringIO())
+		self.assertEqual(next(filas_estadisticas(despues))['_ended_sum'], 1)
+		self.assertIsNone(self._resumen(self.user).proximo_fin)
+
+	def test_escrituras_aplican_deltas_sin_recalcular(self):
+		from unittest import mock
+		from django.db.models import Sum
+		from .estadisticas import CAMPOS_RESUMEN, filas_estadisticas, reconciliar_estadisticas
+		primero = Evento.objects.create(nombre_evento='Primero', fecha_evento=self.manana, usuario=self.user)
+		segundo = Evento.objects.create(
+			nombre_evento='Segundo', fecha_evento=self.manana + timedelta(days=2), prioridad='urgente', usuario=self.user
+		)
+		# El agregado completo no vuelve a ejecutarse en cada escritura
+		with mock.patch('apps.eventos.estadisticas.recalcular_estadisticas') as recalcular:
+			primero = Evento.objects.get(pk=primero.pk)
+			primero.prioridad = 'urgente'
+			primero.save()
+			Evento.objects.filter(pk=segundo.pk).update(nombre_evento='Segundo (editado)')
+			Evento.objects.get(pk=segundo.pk).delete()
+		recalcular.assert_not_called()
+
+		resumen = self._resumen(self.user)
+		self.assertEqual((resumen.total, resumen.urgentes, resumen.ultimo_nombre), (1, 1, 'Primero'))
+		self.assertEqual(resumen.proximo_fin, primero.fecha_hora_fin)
+		self.assertEqual(ConteoMensualEventos.objects.filter(usuario=self.user).aggregate(t=Sum('total'))['t'], 1)
+		self.assertEqual(next(filas_estadisticas(primero.fecha_hora_inicio))['mes_actual'], 1)
+
+		# Coincide con el recálculo desde la tabla
+		antes = EstadisticasEventosUsuario.objects.filter(usuario=self.user).values(*CAMPOS_RESUMEN).get()
+		reconciliar_estadisticas(ahora=antes['calculado_en'])
+		self.assertEqual(EstadisticasEventosUsuario.objects.filter(usuario=self.user).values(*CAMPOS_RESUMEN).get(), antes)
+
+	def test_reconciliar_corrige_desviaciones(self):
+		from django.core.management import call_command
+		from io import StringIO
+		Evento.objects.create(nombre_evento='Real', fecha_evento=self.manana, usuario=self.user)
+		EstadisticasEventosUsuario.objects.filter(usuario=self.user).update(total=99)
+		EstadisticasEventosUsuario.objects.create(usuario=self.otro, total=5, calculado_en=timezone.now())
+
+		call_command('reconciliar_estadisticas_eventos', '--batch-size', '1', stdout=StringIO())
+		self.assertEqual(self._resumen(self.user).total, 1)
+		self.assertFalse(EstadisticasEventosUsuario.objects.filter(usuario=self.otro).exists())
+
+
+class ConteoMensualEventosTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='mensual',
+			email='mensual@example.com',
+			password='pass1234'
+		)
+		self.manana = timezone.now().date() + timedelta(days=1)
+		self.mes = (self.manana.year, self.manana.month)
+
+	def test_se_mantiene_en_escrituras(self):
+		from .estadisticas import serie_mensual
+		evento = Evento.objects.create(nombre_evento='Uno', fecha_evento=self.manana, prioridad='alta', usuario=self.user)
+		Evento.objects.bulk_create([
+			Evento(nombre_evento='Dos', fecha_evento=self.manana, prioridad='alta', usuario=self.user),
+			Evento(nombre_evento='Tres', fecha_evento=self.manana, prioridad='baja', usuario=self.user),
+		])
+		self.assertEqual(serie_mensual([self.mes]), [3])
+		self.assertEqual(serie_mensual([self.mes], prioridad='alta'), [2])
+		self.assertEqual(
+			ConteoMensualEventos.objects.get(usuario=self.user, prioridad='alta', etapa='planificacion').total, 2
+		)
+
+		Evento.objects.filter(prioridad='baja').update(etapa='confirmado')
+		evento.delete()
+		self.assertEqual(serie_mensual([self.mes], usuario_id=self.user.id), [2])
+		self.assertEqual(serie_mensual([self.mes], usuario_id=self.user.id + 1), [0])
+
+	def test_rebuild_y_verificacion(self):
+		from django.core.management import call_command
+		from django.core.management.base import CommandError
+		from io import StringIO
+		Evento.objects.create(nombre_evento='Uno', fecha_evento=self.manana, usuario=self.user)
+		call_command('reconstruir_conteos_mensuales', '--verificar', stdout=StringIO())
+
+		ConteoMensualEventos.objects.update(total=7)
+		with self.assertRaises(CommandError):
+			call_command('reconstruir_conteos_mensuales', '--verificar', stdout=StringIO())
+
+		call_command('reconstruir_conteos_mensuales', stdout=StringIO())
+		call_command('reconstruir_conteos_mensuales', '--verificar', stdout=StringIO())
+
+	def test_recalculo_hace_upsert_sobre_filas_existentes(self):
+		from .estadisticas import diferencias_conteos_mensuales, recalcular_conteos_mensuales
+		Evento.objects.create(nombre_evento='Uno', fecha_evento=self.manana, prioridad='alta', usuario=self.user)
+		ConteoMensualEventos.objects.update(total=7)
+		ConteoMensualEventos.objects.create(
+			anio=self.mes[0], mes=self.mes[1], usuario=self.user, prioridad='baja', etapa='cancelado', total=3
+		)
+		# Las filas existentes se actualizan en lugar de insertarse de nuevo
+		recalcular_conteos_mensuales([self.user.id])
+		recalcular_conteos_mensuales([self.user.id])
+		self.assertEqual(diferencias_conteos_mensuales(), [])
+		self.assertEqual(ConteoMensualEventos.objects.get(prioridad='alta').total, 1)
+		self.assertEqual(ConteoMensualEventos.objects.get(prioridad='baja').total, 0)
+
+
+class ParticipantesEventoTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			username='anfitriona',
+			email='anfitriona@example.com',
+			password='pass1234'
+		)
+		self.client = Client()
+		self.client.login(email='anfitriona@example.com', password='pass1234')
+		self.manana = timezone.now().date() + timedelta(days=1)
+
+	def _nombres(self, evento):
+		return list(ParticipanteEvento.objects.filter(evento=evento).values_list('nombre', flat=True))
+
+	def test_filas_y_conteo_en_cada_escritura(self):
+		evento = Evento.objects.create(
+			nombre_evento='Uno', fecha_evento=self.manana, participantes='Ana, Luis\nEva', aforo=2, usuario=self.user
+		)
+		self.assertEqual(self._nombres(evento), ['Ana', 'Luis', 'Eva'])
+		self.assertEqual(evento.participantes_count, 3)
+		self.assertEqual(list(Evento.objects.sobre_aforo()), [evento])
+
+		evento.participantes = 'Ana'
+		evento.save(update_fields=['participantes'])
+		evento.refresh_from_db()
+		self.assertEqual((evento.total_participantes, self._nombres(evento)), (1, ['Ana']))
+
+		# Un texto sin guardar no se sincroniza con update_fields que lo omite
+		evento.participantes = 'Otro'
+		evento.save(update_fields=['nombre_evento'])
+		self.assertEqual(self._nombres(evento), ['Ana'])
+		evento.refresh_from_db()
+		self.assertEqual((evento.participantes, evento.total_participantes), ('Ana', 1))
+
+		Evento.objects.filter(pk=evento.pk).update(participantes='Rosa,,Iván')
+		self.assertEqual(Evento.objects.get(pk=evento.pk).total_participantes, 2)
+		self.assertEqual(self._nombres(evento), ['Rosa', 'Iván'])
+
+		otro = Evento(nombre_evento='Dos', fecha_evento=self.manana, participantes='Leo', usuario=self.user)
+		Evento.objects.bulk_create([otro])
+		otro.participantes = 'Leo, Sol'
+		Evento.objects.bulk_update([otro], ['participantes'])
+		self.assertEqual(Evento.objects.get(pk=otro.pk).total_participantes, 2)
+		self.assertEqual(self._nombres(otro), ['Leo', 'Sol'])
+		self.assertFalse(Evento.objects.sobre_aforo().exists())
+
+	def test_listado_omite_texto_y_api_pagina(self):
+		evento = Evento.objects.create(
+			nombre_evento='Uno', fecha_evento=self.manana,
+			participantes=', '.join(f'P{i}' for i in range(5)), usuario=self.user
+		)
+		fila = self.client.get('/eventos/api/eventos/').json()['eventos'][0]
+		self.assertNotIn('participantes', fila)
+		self.assertEqual(fila['total_participantes'], 5)
+
+		url = f'/eventos/api/eventos/{evento.id}/participantes/'
+		nombres, cursor = [], ''
+		while True:
+			data = self.client.get(url, {'limit': 2, 'cursor': cursor}).json()
+			self.assertEqual(data['total'], 5)
+			nombres.extend(data['participantes'])
+			cursor = data['next_cursor']
+			if not cursor:
+				break
+		self.assertEqual(nombres, [f'P{i}' for i in range(5)])
+		self.assertEqual(self.client.get(url, {'cursor': 'x'}).status_code, 400)
+
+		otra = User.objects.create_user(username='ajena', email='ajena@example.com', password='pass1234')
+		self.client.force_login(otra)
+		self.assertEqual(self.client.get(url).status_code, 403)
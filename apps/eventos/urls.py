@@ -19,6 +19,9 @@ urlpatterns = [
     
     # APIs nuevas para el frontend
     path('api/eventos/', views.api_eventos, name='api_eventos'),
+    path('api/eventos/bulk/', views.api_eventos_bulk, name='api_eventos_bulk'),
     path('api/eventos/<int:evento_id>/', views.api_evento_detail, name='api_evento_detail'),
+    path('api/eventos/<int:evento_id>/participantes/', views.api_evento_participantes, name='api_evento_participantes'),
     path('api/categorias/', views.api_categorias, name='api_categorias'),
+    path('api/conflictos/', views.api_conflictos, name='api_conflictos'),
 ]
@@ -6,19 +6,29 @@ Sistema de gestión de eventos para usuarios de Mindara
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.views.generic import View
-from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
+from datetime import datetime, time
 import json
 
-from .models import Evento, CategoriaEvento
-from apps.notificaciones.models import Notificacion, NotificacionLeida
+from .models import Evento, CategoriaEvento, ParticipanteEvento
+from .conflictos import buscar_conflictos, pares_en_conflicto
+from .importacion import exportar_ndjson, importar_ndjson
+from .paginacion import CursorInvalido, aplicar_cursor, paginar, paginar_participantes, parsear_limite
+from .proyecciones import (
+    CAMPOS_API, COLUMNAS_CALENDARIO, Serializador, columnas_para, fila_desde_instancia, parsear_campos
+)
+from .rangos import (
+    RangoInvalido, filtro_solapados, formatear_rangos, fusionar_rangos, parsear_rango, parsear_rangos, restar_rangos
+)
+from apps.busqueda.consultas import aplicar_busqueda
+from apps.notificaciones.models import Notificacion
+from core.consultas import presupuesto_consultas
 
 
 @method_decorator(login_required, name='dispatch')
@@ -43,6 +53,7 @@ class PerfilView(View):
     """
     Vista para el perfil del usuario
     """
+    presupuesto_consultas = 10
     
     def get(self, request):
         """
@@ -50,31 +61,19 @@ class PerfilView(View):
         """
         user = request.user
         
-        # Obtener notificaciones del usuario
-        notificaciones_queryset = Notificacion.objects.get_for_user(user).order_by('-fecha_creacion')
-        
-        # Filtrar por fecha de expiración
-        notificaciones_queryset = [
-            n for n in notificaciones_queryset 
-            if not n.fecha_expiracion or n.fecha_expiracion > timezone.now()
-        ]
+        # Notificaciones vigentes del usuario (activas y no expiradas)
+        notificaciones_queryset = Notificacion.objects.visibles_para(user).order_by('-fecha_creacion')
         
         # Tomar solo las últimas 10 para el perfil
-        notificaciones_recientes = notificaciones_queryset[:10]
-        
-        # Marcar notificaciones como leídas cuando se ven
-        for notificacion in notificaciones_recientes:
-            NotificacionLeida.objects.get_or_create(
-                notificacion=notificacion,
-                usuario=user
-            )
+        # (la página las marca como leídas al cargar, ver notificaciones:marcar_vistas)
+        notificaciones_recientes = list(notificaciones_queryset[:10])
         
         context = {
             'title': 'Mi Perfil',
             'current_section': 'perfil',
             'user': user,
             'notificaciones_recientes': notificaciones_recientes,
-            'total_notificaciones': len(notificaciones_queryset),
+            'total_notificaciones': notificaciones_queryset.count(),
         }
         return render(request, 'eventos/perfil.html', context)
     
@@ -103,34 +102,26 @@ class PerfilView(View):
 
 
 @login_required
+@presupuesto_consultas(10)
 def notificaciones_usuario(request):
     """Vista para ver todas las notificaciones del usuario"""
     user = request.user
     
-    # Obtener todas las notificaciones del usuario
-    notificaciones_queryset = Notificacion.objects.get_for_user(user).order_by('-fecha_creacion')
-    
-    # Filtrar por fecha de expiración
-    notificaciones_list = [
-        n for n in notificaciones_queryset 
-        if not n.fecha_expiracion or n.fecha_expiracion > timezone.now()
-    ]
+    # Notificaciones vigentes del usuario; la página se lee con LIMIT/OFFSET
+    notificaciones_queryset = (Notificacion.objects
+                               .visibles_para(user)
+                               .select_related('creado_por')
+                               .order_by('-fecha_creacion', '-id'))
     
     # Paginación
-    paginator = Paginator(notificaciones_list, 20)
+    paginator = Paginator(notificaciones_queryset, 20)
     page_number = request.GET.get('page')
+    # La página marca como leídas las notificaciones mostradas al cargar
     notificaciones = paginator.get_page(page_number)
     
-    # Marcar como leídas las notificaciones de la página actual
-    for notificacion in notificaciones:
-        NotificacionLeida.objects.get_or_create(
-            notificacion=notificacion,
-            usuario=user
-        )
-    
     context = {
         'notificaciones': notificaciones,
-        'total_notificaciones': len(notificaciones_list),
+        'total_notificaciones': paginator.count,
         'title': 'Mis Notificaciones',
         'current_section': 'notificaciones',
     }
@@ -139,6 +130,7 @@ def notificaciones_usuario(request):
 
 
 @login_required
+@presupuesto_consultas(10)
 def api_eventos_usuario(request):
     """
     API para obtener los eventos del usuario actual
@@ -158,43 +150,40 @@ def api_eventos_usuario(request):
                 # Los usuarios básicos solo ven sus eventos
                 eventos = Evento.objects.filter(usuario=user)
             
-            # Serializar los eventos
-            eventos_data = []
-            for evento in eventos.order_by('-fecha_evento', '-hora_evento'):  # Todos los eventos para el calendario
-                fecha_hora_inicio = evento.fecha_hora_completa
-                fecha_hora_fin = fecha_hora_inicio + timedelta(hours=evento.duracion_real)
+            # Modo ventana: ?start=&end= (rango visible de FullCalendar, fin exclusivo).
+            # ?cargados=inicio/fin,... indica lo que el cliente ya tiene; solo se
+            # consultan los huecos y se responde con la unión de rangos cargados.
+            rangos_cargados = None
+            if request.GET.get('start') or request.GET.get('end'):
+                try:
+                    ventana = parsear_rango(request.GET.get('start', ''), request.GET.get('end', ''))
+                    cargados = parsear_rangos(request.GET.get('cargados', ''))
+                except RangoInvalido as e:
+                    return JsonResponse({
+                        'success': False,
+                        'message': str(e)
+                    }, status=400)
                 
-                eventos_data.append({
-                    'id': evento.id,
-                    'titulo': evento.nombre_evento,
-                    'descripcion': evento.objetivo[:100] + '...' if len(evento.objetivo) > 100 else evento.objetivo,
-                    'fecha_inicio': fecha_hora_inicio.isoformat(),  # Formato ISO para FullCalendar
-                    'fecha_fin': fecha_hora_fin.isoformat(),
-                    'estado': evento.etapa,
-                    'estado_display': evento.get_etapa_display(),
-                    'prioridad': evento.prioridad,
-                    'prioridad_display': evento.get_prioridad_display(),
-                    'categoria': None,  # Ya no usamos categorías
-                    'categoria_color': '#06A77D',  # Color por defecto
-                    'ubicacion': evento.sede,
-                    'es_creador': evento.usuario == user,
-                    'puede_editar': evento.puede_editar(user),
-                    'duracion_horas': evento.duracion_real,
-                    'esta_activo': evento.esta_en_progreso,
-                    'ha_terminado': evento.ha_terminado,
-                    'evidencias': evento.evidencias,
-                    'usuario': {
-                        'id': evento.usuario.id,
-                        'nombre': f"{evento.usuario.first_name} {evento.usuario.last_name}".strip() or evento.usuario.username,
-                        'username': evento.usuario.username,
-                    }
-                })
+                # Un evento que cruza el borde de un rango ya cargado puede
+                # entregarse de nuevo; el calendario lo identifica por id
+                eventos = eventos.filter(filtro_solapados(restar_rangos(ventana, cargados)))
+                rangos_cargados = formatear_rangos(fusionar_rangos(cargados + [ventana]))
+            
+            # Serializar los eventos (una consulta con el usuario unido)
+            serializador = Serializador(user)
+            eventos_data = [
+                serializador.calendario(fila)
+                for fila in eventos.order_by('-fecha_evento', '-hora_evento').values(*COLUMNAS_CALENDARIO)
+            ]
             
-            return JsonResponse({
+            respuesta = {
                 'success': True,
                 'eventos': eventos_data,
-                'total': eventos.count()
-            })
+                'total': len(eventos_data) if rangos_cargados is not None else eventos.count()
+            }
+            if rangos_cargados is not None:
+                respuesta['rangos_cargados'] = rangos_cargados
+            return JsonResponse(respuesta)
             
         except Exception as e:
             return JsonResponse({
@@ -273,6 +262,7 @@ def api_perfil_stats(request):
 
 @login_required
 @csrf_exempt
+@presupuesto_consultas(25)
 def api_eventos(request):
     """
     API para gestionar eventos (GET, POST)
@@ -294,10 +284,8 @@ def api_eventos(request):
             status = request.GET.get('status', '')
             
             if search:
-                eventos = eventos.filter(
-                    Q(nombre_evento__icontains=search) |
-                    Q(objetivo__icontains=search)
-                )
+                # Índice de texto completo; se conserva el orden del cursor
+                eventos = aplicar_busqueda(eventos, search, ordenar=False)
             
             if status:
                 # Mapear estados del frontend a etapas del modelo
@@ -309,42 +297,38 @@ def api_eventos(request):
                 if status in status_map:
                     eventos = eventos.filter(etapa__in=status_map[status])
             
+            # Proyección de campos (?fields=id,titulo,...) para omitir columnas pesadas
+            campos = parsear_campos(request.GET.get('fields', ''))
+            if campos is None:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Campos no válidos. Disponibles: ' + ', '.join(CAMPOS_API)
+                }, status=400)
+            eventos = eventos.values(*columnas_para(campos))
+            
+            # Paginación por cursor solo si el cliente la solicita (?limit= / ?cursor=)
+            cursor = request.GET.get('cursor', '')
+            next_cursor = None
+            if cursor or 'limit' in request.GET:
+                try:
+                    filas, next_cursor = paginar(eventos, cursor, parsear_limite(request.GET.get('limit')))
+                except CursorInvalido as e:
+                    return JsonResponse({
+                        'success': False,
+                        'message': str(e)
+                    }, status=400)
+            else:
+                filas = aplicar_cursor(eventos, None)
+            
             # Serializar los eventos
-            eventos_data = []
-            for evento in eventos.order_by('-fecha_evento', '-hora_evento'):
-                eventos_data.append({
-                    'id': evento.id,
-                    'titulo': evento.nombre_evento,
-                    'descripcion': evento.objetivo,
-                    'fecha_inicio': evento.fecha_hora_completa.isoformat(),
-                    'fecha_fin': (evento.fecha_hora_completa + timedelta(hours=evento.duracion_real)).isoformat(),
-                    'ubicacion': evento.sede,
-                    'prioridad': evento.prioridad,
-                    'estado': evento.etapa,
-                    'estado_display': evento.get_etapa_display(),
-                    'categoria_nombre': 'Evento',  # Valor por defecto ya que no usamos categorías
-                    'usuario': {
-                        'id': evento.usuario.id,
-                        'nombre': evento.usuario.get_full_name() or evento.usuario.username,
-                        'email': evento.usuario.email,
-                    },
-                    'puede_editar': evento.puede_editar(user),
-                    'puede_ver': evento.puede_ver(user),
-                    'carpeta_ejecutiva': evento.carpeta_ejecutiva,
-                    'carpeta_ejecutiva_liga': evento.carpeta_ejecutiva_liga if evento.carpeta_ejecutiva else None,
-                    'ha_terminado': evento.ha_terminado,
-                    'evidencias': evento.evidencias,
-                    # Campos adicionales útiles
-                    'aforo': evento.aforo,
-                    'participantes': evento.participantes,
-                    'observaciones': evento.observaciones,
-                    'link_maps': evento.link_maps,
-                })
+            serializador = Serializador(user)
+            eventos_data = [serializador.api(fila, campos) for fila in filas]
             
             return JsonResponse({
                 'success': True,
                 'eventos': eventos_data,
-                'total': len(eventos_data)
+                'total': len(eventos_data),
+                'next_cursor': next_cursor,
             })
             
         except Exception as e:
@@ -436,13 +420,24 @@ def api_eventos(request):
                         'message': 'La duración personalizada debe ser un número válido'
                     }, status=400)
             
-            # Crear el evento
-            evento = Evento.objects.create(**evento_data)
+            # Crear el evento (avisando de traslapes con el responsable o la sede)
+            evento = Evento(**evento_data)
+            evento.calcular_rango_temporal()
+            conflictos = buscar_conflictos(evento)
+            if conflictos and data.get('rechazar_conflictos'):
+                return JsonResponse({
+                    'success': False,
+                    'code': 'event_conflict',
+                    'message': 'El evento se traslapa con otros eventos',
+                    'conflictos': conflictos
+                }, status=409)
+            evento.save()
             
             return JsonResponse({
                 'success': True,
                 'message': 'Evento creado correctamente',
-                'evento_id': evento.id
+                'evento_id': evento.id,
+                'conflictos': conflictos
             })
             
         except Exception as e:
@@ -464,7 +459,7 @@ def api_evento_detail(request, evento_id):
     API para gestionar un evento específico (GET, PUT, DELETE)
     """
     try:
-        evento = get_object_or_404(Evento, id=evento_id)
+        evento = get_object_or_404(Evento.objects.select_related('usuario'), id=evento_id)
         user = request.user
         
         # Verificar permisos de visualización
@@ -590,12 +585,24 @@ def api_evento_detail(request, evento_id):
                             'message': 'La duración personalizada debe ser un número válido'
                         }, status=400)
                 
+                # Verificar traslapes con el nuevo horario antes de guardar
+                evento.calcular_rango_temporal()
+                conflictos = buscar_conflictos(evento)
+                if conflictos and data.get('rechazar_conflictos'):
+                    return JsonResponse({
+                        'success': False,
+                        'code': 'event_conflict',
+                        'message': 'El evento se traslapa con otros eventos',
+                        'conflictos': conflictos
+                    }, status=409)
+                
                 # Guardar cambios
                 evento.save()
                 
                 return JsonResponse({
                     'success': True,
-                    'message': 'Evento actualizado correctamente'
+                    'message': 'Evento actualizado correctamente',
+                    'conflictos': conflictos
                 })
                 
             except json.JSONDecodeError:
@@ -607,33 +614,7 @@ def api_evento_detail(request, evento_id):
         elif request.method == 'GET':
             return JsonResponse({
                 'success': True,
-                'evento': {
-                    'id': evento.id,
-                    'titulo': evento.nombre_evento,
-                    'descripcion': evento.objetivo,
-                    'fecha_inicio': evento.fecha_hora_completa.isoformat(),
-                    'fecha_fin': (evento.fecha_hora_completa + timedelta(hours=evento.duracion_real)).isoformat(),
-                    'ubicacion': evento.sede,
-                    'prioridad': evento.prioridad,
-                    'estado': evento.etapa,
-                    'estado_display': evento.get_etapa_display(),
-                    'usuario': {
-                        'id': evento.usuario.id,
-                        'nombre': evento.usuario.get_full_name() or evento.usuario.username,
-                    },
-                    'puede_editar': evento.puede_editar(user),
-                    # Campos adicionales para la edición
-                    'aforo': evento.aforo,
-                    'link_maps': evento.link_maps,
-                    'participantes': evento.participantes,
-                    'carpeta_ejecutiva': evento.carpeta_ejecutiva,
-                    'carpeta_ejecutiva_liga': evento.carpeta_ejecutiva_liga,
-                    'evidencias': evento.evidencias,
-                    'ha_terminado': evento.ha_terminado,
-                    'observaciones': evento.observaciones,
-                    'duracion': evento.duracion,
-                    'duracion_personalizada': evento.duracion_personalizada,
-                }
+                'evento': Serializador(user).detalle(fila_desde_instancia(evento))
             })
             
     except Exception as e:
@@ -648,6 +629,156 @@ def api_evento_detail(request, evento_id):
     }, status=405)
 
 
+@login_required
+@presupuesto_consultas(8)
+def api_evento_participantes(request, evento_id):
+    """
+    API de participantes de un evento paginada por cursor (?limit= / ?cursor=)
+    """
+    if request.method == 'GET':
+        try:
+            evento = get_object_or_404(Evento.objects.select_related('usuario'), id=evento_id)
+            user = request.user
+            if not evento.puede_ver(user):
+                return JsonResponse({
+                    'success': False,
+                    'message': 'No tienes permisos para ver este evento'
+                }, status=403)
+            
+            participantes = ParticipanteEvento.objects.filter(evento_id=evento.pk).values('orden', 'nombre')
+            try:
+                filas, next_cursor = paginar_participantes(
+                    participantes, request.GET.get('cursor', ''), parsear_limite(request.GET.get('limit'))
+                )
+            except CursorInvalido as e:
+                return JsonResponse({
+                    'success': False,
+                    'message': str(e)
+                }, status=400)
+            
+            return JsonResponse({
+                'success': True,
+                'participantes': [fila['nombre'] for fila in filas],
+                'total': evento.total_participantes,
+                'next_cursor': next_cursor,
+            })
+            
+        except Http404:
+            raise
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'message': f'Error al obtener participantes: {str(e)}'
+            }, status=500)
+    
+    return JsonResponse({
+        'success': False,
+        'message': 'Método no permitido'
+    }, status=405)
+
+
+@login_required
+@csrf_exempt
+def api_eventos_bulk(request):
+    """
+    API masiva en NDJSON (una línea JSON por evento)
+    GET: exporta en streaming los eventos visibles
+    POST: importa líneas validando por lotes (?dry_run=1 solo valida)
+    """
+    user = request.user
+    if request.method == 'GET':
+        if user.is_admin() or user.is_manager():
+            eventos = Evento.objects.all()
+        else:
+            eventos = Evento.objects.filter(usuario=user)
+        response = StreamingHttpResponse(exportar_ndjson(eventos), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="eventos.ndjson"'
+        return response
+    
+    elif request.method == 'POST':
+        try:
+            # Iterar el request lee el cuerpo línea a línea sin cargarlo completo
+            resultado = importar_ndjson(request, user, simular=request.GET.get('dry_run') == '1')
+            return JsonResponse({
+                'success': not resultado['errores'],
+                **resultado
+            })
+        except UnicodeDecodeError:
+            return JsonResponse({
+                'success': False,
+                'message': 'El archivo debe estar codificado en UTF-8'
+            }, status=400)
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'message': f'Error al importar eventos: {str(e)}'
+            }, status=500)
+    
+    return JsonResponse({
+        'success': False,
+        'message': 'Método no permitido'
+    }, status=405)
+
+
+@login_required
+def api_conflictos(request):
+    """
+    API de traslapes: pares de eventos que se cruzan en una ventana
+    (?start=&end=) para un responsable (?usuario=) o una sede (?sede=)
+    """
+    if request.method == 'GET':
+        try:
+            user = request.user
+            try:
+                inicio, fin = parsear_rango(request.GET.get('start', ''), request.GET.get('end', ''))
+            except RangoInvalido as e:
+                return JsonResponse({
+                    'success': False,
+                    'message': str(e)
+                }, status=400)
+            if (fin - inicio).days > 366:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'La ventana no puede exceder un año'
+                }, status=400)
+            
+            usuario_id = request.GET.get('usuario', '').strip()
+            sede = request.GET.get('sede', '').strip() or None
+            if not (user.is_admin() or user.is_manager()):
+                # Los usuarios básicos solo consultan sus propios eventos
+                usuario_id = user.id
+            elif usuario_id.isdigit():
+                usuario_id = int(usuario_id)
+            elif sede is None:
+                usuario_id = user.id
+            else:
+                usuario_id = None
+            
+            tz = timezone.get_current_timezone()
+            pares = pares_en_conflicto(
+                timezone.make_aware(datetime.combine(inicio, time.min), tz),
+                timezone.make_aware(datetime.combine(fin, time.min), tz),
+                usuario_id=usuario_id,
+                sede=sede,
+            )
+            return JsonResponse({
+                'success': True,
+                'pares': pares,
+                'total': len(pares)
+            })
+            
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'message': f'Error al buscar conflictos: {str(e)}'
+            }, status=500)
+    
+    return JsonResponse({
+        'success': False,
+        'message': 'Método no permitido'
+    }, status=405)
+
+
 @login_required
 def api_categorias(request):
     """
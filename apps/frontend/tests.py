@@ -1,3 +1,78 @@
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 
-# Create your tests here.
+from apps.authentication.models import User
+from apps.eventos.models import Evento
+
+
+class EventosUsuariosStatsViewTests(TestCase):
+	@classmethod
+	def setUpTestData(cls):
+		cls.admin = User.objects.create_user(
+			username='stats',
+			email='stats@example.com',
+			password='pass1234',
+			user_level='ADMIN'
+		)
+		hoy = timezone.now().date()
+		for dias, prioridad in ((1, 'urgente'), (2, 'media')):
+			Evento.objects.create(
+				nombre_evento=f'Evento {dias}',
+				fecha_evento=hoy + timedelta(days=dias),
+				prioridad=prioridad,
+				usuario=cls.admin
+			)
+		# Evento ya concluido (se omite la validación de fecha pasada)
+		Evento.objects.bulk_create([Evento(
+			nombre_evento='Concluido',
+			fecha_evento=hoy - timedelta(days=3),
+			usuario=cls.admin
+		)])
+
+	def setUp(self):
+		self.client.force_login(self.admin)
+
+	def test_agregados_por_usuario(self):
+		resp = self.client.get(reverse('frontend:eventos_usuarios_stats'))
+		self.assertEqual(resp.status_code, 200)
+		fila = resp.context['filas'][0]
+		self.assertEqual(fila['total'], 3)
+		self.assertEqual(fila['urgentes'], 1)
+		self.assertEqual(fila['completados'], 1)
+		self.assertEqual(fila['activos'], 2)
+
+	def test_usa_resumen_sin_filtros_y_agregado_con_filtros(self):
+		from unittest import mock
+		from apps.frontend.views import EventosUsuariosStatsView
+		url = reverse('frontend:eventos_usuarios_stats')
+		with mock.patch.object(EventosUsuariosStatsView, '_agregado_en_vivo') as en_vivo:
+			resp = self.client.get(url, {'usuario': self.admin.id})
+		en_vivo.assert_not_called()
+		self.assertEqual(resp.context['filas'][0]['total'], 3)
+
+		resp = self.client.get(url, {'prioridad': 'urgente'})
+		fila = resp.context['filas'][0]
+		self.assertEqual(fila['total'], 1)
+		self.assertEqual(fila['urgentes'], 1)
+
+	def test_grafica_por_periodo_desde_conteos_mensuales(self):
+		resp = self.client.get(reverse('frontend:eventos_usuarios_stats'), {'chart': '12m'})
+		self.assertEqual(len(resp.context['chart_debug']['counts']), 12)
+		self.assertEqual(resp.context['chart_debug']['counts'][-1], Evento.objects.filter(
+			fecha_evento__year=timezone.localdate().year, fecha_evento__month=timezone.localdate().month
+		).count())
+
+	def test_exportar_csv_en_streaming(self):
+		resp = self.client.get(reverse('frontend:eventos_usuarios_stats'), {'export': 'csv'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(resp.streaming)
+		self.assertNotIn('chart_debug', resp.context or {})
+		lineas = b''.join(resp.streaming_content).decode().splitlines()
+		self.assertTrue(lineas[0].startswith('Usuario,Email,Total'))
+		self.assertTrue(lineas[1].startswith('stats,stats@example.com,3,2,1,1'))
+		self.assertEqual(lineas[-1], 'TOTAL EVENTOS,3')
+
+		resp = self.client.get(reverse('frontend:eventos_usuarios_stats'), {'export': 'csv', 'prioridad': 'urgente'})
+		self.assertEqual(b''.join(resp.streaming_content).decode().splitlines()[-1], 'TOTAL EVENTOS,1')
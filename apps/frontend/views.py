@@ -17,10 +17,17 @@ from django.views.generic import TemplateView, View
 from django.core.paginator import Paginator
 from django.db.models import Q
 from apps.authentication.models import User
+from apps.busqueda.consultas import aplicar_busqueda
 from .forms import AdminUserCreateForm, AdminUserEditForm, UserSearchForm
 import json
 from django.utils import timezone
 
+class _Eco:
+    """Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla"""
+    def write(self, value):
+        return value
+
+
 class EventosUsuariosStatsView(TemplateView):
     template_name = 'frontend/eventos_usuarios_stats.html'
 
@@ -30,8 +37,14 @@ class EventosUsuariosStatsView(TemplateView):
             return redirect('frontend:dashboard')
         return super().dispatch(request, *args, **kwargs)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('export') == 'csv':
+            # La exportación no necesita gráfica ni paginación: filas en streaming
+            return self._export_csv()
+        return super().get(request, *args, **kwargs)
+
+    def _filtros(self):
+        """Queryset filtrado, filtros aplicados y rango de fechas parseado"""
         from apps.eventos.models import Evento
         req = self.request
 
@@ -44,7 +57,7 @@ class EventosUsuariosStatsView(TemplateView):
 
         qs = Evento.objects.select_related('usuario').all()
         if q:
-            qs = qs.filter(nombre_evento__icontains=q)
+            qs = aplicar_busqueda(qs, q, ordenar=False)
         if prioridad in {'baja','media','alta','urgente'}:
             qs = qs.filter(prioridad=prioridad)
         if usuario_filter.isdigit():
@@ -73,70 +86,69 @@ class EventosUsuariosStatsView(TemplateView):
             'hasta': fecha_hasta_raw,
             'usuario': usuario_filter,
         }
+        return qs, filtros_aplicados, d_desde, d_hasta
+
+    def _agregados(self, qs, filtros_aplicados, d_desde, d_hasta, ahora, chunk_size=2000):
+        """Filas agregadas por usuario (mayor total primero) leídas con iterator()"""
+        usuario_filter = filtros_aplicados['usuario']
+        if filtros_aplicados['q'] or filtros_aplicados['prioridad'] in {'baja','media','alta','urgente'} or d_desde or d_hasta:
+            # Los filtros cambian el conjunto de eventos: agregado en vivo
+            today = timezone.localdate(ahora)
+            agregados_qs = self._agregado_en_vivo(qs, ahora, today.year, today.month)
+            return agregados_qs.order_by('-total', 'usuario_id').iterator(chunk_size=chunk_size)
+        # Sin filtros (o solo por usuario) se lee el resumen precalculado
+        from apps.eventos.estadisticas import filas_estadisticas
+        return filas_estadisticas(ahora, int(usuario_filter) if usuario_filter.isdigit() else None, chunk_size)
+
+    @staticmethod
+    def _fila(row):
+        """Fila de la tabla (y del CSV) a partir de un agregado por usuario"""
+        full_name = (row['usuario__first_name'] + ' ' + row['usuario__last_name']).strip()
+        if not full_name:
+            full_name = row['usuario__username']
+        last_display = '—'
+        last_nombre = '—'
+        if row['last_fecha'] and row['last_hora']:
+            from datetime import datetime as _dt
+            dt_combined = _dt.combine(row['last_fecha'], row['last_hora'])
+            if timezone.is_naive(dt_combined):
+                dt_combined = timezone.make_aware(dt_combined, timezone.get_current_timezone())
+            last_display = dt_combined.strftime('%d/%m/%Y %H:%M')
+            last_nombre = row['last_nombre'] or '—'
+        completados = row.get('_ended_sum') or 0
+        return {
+            'usuario': full_name,
+            'email': row['usuario__email'],
+            'total': row['total'],
+            'activos': row['total'] - completados,
+            'completados': completados,
+            'urgentes': row['urgentes'],
+            'ultimo': last_display,
+            'ultimo_nombre': last_nombre,
+            'mes_actual': row['mes_actual'],
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        req = self.request
+        qs, filtros_aplicados, d_desde, d_hasta = self._filtros()
+        q = filtros_aplicados['q']
+        prioridad = filtros_aplicados['prioridad']
+        usuario_filter = filtros_aplicados['usuario']
 
         # Agregaciones ORM
-        from django.db.models import Count, Q as _Q, Subquery, OuterRef, F, Sum
-        from django.db.models.expressions import RawSQL
-        from datetime import timedelta
+        from django.db.models import Count
         ahora = timezone.now()
         today = timezone.localdate()
         current_year, current_month = today.year, today.month
 
-        # Subquery para último evento (fecha, hora, nombre)
-        last_events = (Evento.objects
-                        .filter(usuario_id=OuterRef('usuario_id'))
-                        .order_by('-fecha_evento', '-hora_evento'))
-
-        # Flag de finalización calculado en SQL (PostgreSQL): 1 si el evento terminó (fin < NOW())
-        ended_raw = RawSQL(
-            "CASE WHEN (fecha_evento + hora_evento + ((CASE WHEN duracion = 'otro' THEN COALESCE(duracion_personalizada,0)::text ELSE duracion END)||' hours')::interval) < NOW() THEN 1 ELSE 0 END",
-            []
-        )
-
-        agregados_qs = (qs
-            .values('usuario_id', 'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__email')
-            .annotate(
-                total=Count('id'),
-                urgentes=Count('id', filter=_Q(prioridad='urgente')),
-                mes_actual=Count('id', filter=_Q(fecha_evento__year=current_year, fecha_evento__month=current_month)),
-                last_fecha=Subquery(last_events.values('fecha_evento')[:1]),
-                last_hora=Subquery(last_events.values('hora_evento')[:1]),
-                last_nombre=Subquery(last_events.values('nombre_evento')[:1]),
-                _ended_sum=Sum(ended_raw),
-            ))
-
         filas = []
         current_month_counts = {}
-        for row in agregados_qs:
-            full_name = (row['usuario__first_name'] + ' ' + row['usuario__last_name']).strip()
-            if not full_name:
-                full_name = row['usuario__username']
-            email = row['usuario__email']
-            uid = row['usuario_id']
-            last_display = '—'
-            last_nombre = '—'
-            if row['last_fecha'] and row['last_hora']:
-                from datetime import datetime as _dt
-                dt_combined = _dt.combine(row['last_fecha'], row['last_hora'])
-                if timezone.is_naive(dt_combined):
-                    dt_combined = timezone.make_aware(dt_combined, timezone.get_current_timezone())
-                last_display = dt_combined.strftime('%d/%m/%Y %H:%M')
-                last_nombre = row['last_nombre'] or '—'
-            completados = row.get('_ended_sum') or 0
-            activos = row['total'] - completados
-            filas.append({
-                'usuario': full_name,
-                'email': email,
-                'total': row['total'],
-                'activos': activos,
-                'completados': completados,
-                'urgentes': row['urgentes'],
-                'ultimo': last_display,
-                'ultimo_nombre': last_nombre,
-                'mes_actual': row['mes_actual'],
-            })
+        for row in self._agregados(qs, filtros_aplicados, d_desde, d_hasta, ahora):
+            fila = self._fila(row)
+            filas.append(fila)
             if row['mes_actual']:
-                current_month_counts[uid] = {'usuario': full_name, 'count': row['mes_actual']}
+                current_month_counts[row['usuario_id']] = {'usuario': fila['usuario'], 'count': row['mes_actual']}
 
         filas.sort(key=lambda x: x['total'], reverse=True)
         total_eventos_sum = sum(f['total'] for f in filas)
@@ -172,18 +184,28 @@ class EventosUsuariosStatsView(TemplateView):
                     m = 12
                     y -= 1
             pares.reverse()  # cronológico
-            base_counts = {f"{yy}-{mm:02d}": 0 for (yy, mm) in pares}
-            # Contar eventos por mes usando ORM
-            from django.db.models.functions import ExtractYear, ExtractMonth
-            mensual = (qs
-                       .values(anio=ExtractYear('fecha_evento'), mes=ExtractMonth('fecha_evento'))
-                       .annotate(c=Count('id')))
-            for item in mensual:
-                key = f"{item['anio']}-{item['mes']:02d}"
-                if key in base_counts:
-                    base_counts[key] = item['c']
+            if q or d_desde or d_hasta:
+                # Filtros por texto o fechas: contar sobre el queryset filtrado
+                base_counts = {f"{yy}-{mm:02d}": 0 for (yy, mm) in pares}
+                # Contar eventos por mes usando ORM
+                from django.db.models.functions import ExtractYear, ExtractMonth
+                mensual = (qs
+                           .values(anio=ExtractYear('fecha_evento'), mes=ExtractMonth('fecha_evento'))
+                           .annotate(c=Count('id')))
+                for item in mensual:
+                    key = f"{item['anio']}-{item['mes']:02d}"
+                    if key in base_counts:
+                        base_counts[key] = item['c']
+                counts = [base_counts[f"{yy}-{mm:02d}"] for (yy, mm) in pares]
+            else:
+                # Lectura indexada de la ventana en la tabla de conteos mensuales
+                from apps.eventos.estadisticas import serie_mensual
+                counts = serie_mensual(
+                    pares,
+                    usuario_id=int(usuario_filter) if usuario_filter.isdigit() else None,
+                    prioridad=prioridad if prioridad in {'baja','media','alta','urgente'} else None,
+                )
             labels = [f"{meses_es_corto[mm-1]} {str(yy)[2:]}" for (yy, mm) in pares]
-            counts = [base_counts[f"{yy}-{mm:02d}"] for (yy, mm) in pares]
             chart_payload.update({
                 'labels': labels,
                 'counts': counts,
@@ -192,10 +214,6 @@ class EventosUsuariosStatsView(TemplateView):
 
         chart_json = _json.dumps(chart_payload)
 
-        # Export CSV
-        if req.GET.get('export') == 'csv':
-            return self._export_csv(filas, total_eventos_sum)
-
         # Paginación
         from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
         try:
@@ -241,19 +259,47 @@ class EventosUsuariosStatsView(TemplateView):
         })
         return context
 
-    def _export_csv(self, filas, total_eventos_sum):
+    def _agregado_en_vivo(self, qs, ahora, current_year, current_month):
+        from apps.eventos.models import Evento
+        from django.db.models import Count, Q as _Q, Subquery, OuterRef
+        # Subquery para último evento (fecha, hora, nombre)
+        last_events = (Evento.objects
+                        .filter(usuario_id=OuterRef('usuario_id'))
+                        .order_by('-fecha_evento', '-hora_evento'))
+
+        return (qs
+            .values('usuario_id', 'usuario__first_name', 'usuario__last_name', 'usuario__username', 'usuario__email')
+            .annotate(
+                total=Count('id'),
+                urgentes=Count('id', filter=_Q(prioridad='urgente')),
+                mes_actual=Count('id', filter=_Q(fecha_evento__year=current_year, fecha_evento__month=current_month)),
+                last_fecha=Subquery(last_events.values('fecha_evento')[:1]),
+                last_hora=Subquery(last_events.values('hora_evento')[:1]),
+                last_nombre=Subquery(last_events.values('nombre_evento')[:1]),
+                # Fin persistido en fecha_hora_fin: comparación indexada en cualquier backend
+                _ended_sum=Count('id', filter=_Q(fecha_hora_fin__lt=ahora)),
+            ))
+
+    def _export_csv(self):
         import csv
-        from io import StringIO
-        buffer = StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(['Usuario','Email','Total','Activos','Completados','Urgentes','Ultimo Evento','Titulo Ultimo'])
-        for f in filas:
-            writer.writerow([
-                f['usuario'], f['email'], f['total'], f['activos'], f['completados'], f['urgentes'], f['ultimo'], f['ultimo_nombre']
-            ])
-        writer.writerow([])
-        writer.writerow(['TOTAL EVENTOS', total_eventos_sum])
-        resp = HttpResponse(buffer.getvalue(), content_type='text/csv; charset=utf-8')
+        from django.http import StreamingHttpResponse
+        qs, filtros_aplicados, d_desde, d_hasta = self._filtros()
+        agregados = self._agregados(qs, filtros_aplicados, d_desde, d_hasta, timezone.now())
+        writer = csv.writer(_Eco())
+
+        def generar():
+            yield writer.writerow(['Usuario','Email','Total','Activos','Completados','Urgentes','Ultimo Evento','Titulo Ultimo'])
+            total_eventos_sum = 0
+            for row in agregados:
+                f = self._fila(row)
+                total_eventos_sum += f['total']
+                yield writer.writerow([
+                    f['usuario'], f['email'], f['total'], f['activos'], f['completados'], f['urgentes'], f['ultimo'], f['ultimo_nombre']
+                ])
+            yield writer.writerow([])
+            yield writer.writerow(['TOTAL EVENTOS', total_eventos_sum])
+
+        resp = StreamingHttpResponse(generar(), content_type='text/csv; charset=utf-8')
         resp['Content-Disposition'] = 'attachment; filename="eventos_por_usuario.csv"'
         return resp
 
@@ -651,12 +697,8 @@ class UserManagementView(TemplateView):
             is_active = search_form.cleaned_data.get('is_active')
             
             if search:
-                users_queryset = users_queryset.filter(
-                    Q(username__icontains=search) |
-                    Q(email__icontains=search) |
-                    Q(first_name__icontains=search) |
-                    Q(last_name__icontains=search)
-                )
+                # Más relevantes primero
+                users_queryset = aplicar_busqueda(users_queryset, search)
             
             if user_level:
                 users_queryset = users_queryset.filter(user_level=user_level)
@@ -3,6 +3,7 @@ Configuración del panel de administración para notificaciones
 """
 
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -64,6 +65,12 @@ class NotificacionAdmin(admin.ModelAdmin):
     
     inlines = [NotificacionLeidaInline]
     
+    list_select_related = ['creado_por']
+    
+    def get_queryset(self, request):
+        # Conteo de lecturas en la misma consulta del listado
+        return super().get_queryset(request).annotate(total_lecturas=Count('lecturas'))
+    
     def get_creado_por(self, obj):
         """Muestra información del creador de la notificación"""
         if obj.creado_por:
@@ -90,7 +97,7 @@ class NotificacionAdmin(admin.ModelAdmin):
     
     def get_lecturas_count(self, obj):
         """Muestra el número de lecturas"""
-        count = obj.lecturas.count()
+        count = obj.total_lecturas
         if count > 0:
             url = reverse('admin:notificaciones_notificacionleida_changelist')
             return format_html(
@@ -99,6 +106,7 @@ class NotificacionAdmin(admin.ModelAdmin):
             )
         return "Sin lecturas"
     get_lecturas_count.short_description = "Lecturas"
+    get_lecturas_count.admin_order_field = 'total_lecturas'
     
     def save_model(self, request, obj, form, change):
         """Guardar el modelo asignando el usuario creador"""
@@ -5,3 +5,8 @@ class NotificacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.notificaciones'
     verbose_name = 'Notificaciones'
+
+    def ready(self):
+        # Registrar los receptores de la bandeja y los que invalidan el
+        # resumen de no leídas (resumen importa bandeja: esta se actualiza antes)
+        import apps.notificaciones.resumen  # noqa: F401
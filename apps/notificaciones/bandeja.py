@@ -0,0 +1,233 @@
+"""
+Bandeja de notificaciones por usuario (BandejaNotificacion)
+El targeting (usuarios específicos, nivel o general) se resuelve al escribir:
+crear, editar, activar/desactivar o cambiar los destinatarios de una
+notificación sincroniza sus entregas con `bulk_create` por lotes. Las lecturas
+quedan en una consulta indexada por usuario, sin el DISTINCT sobre el OR del
+targeting. NotificacionLeida sigue siendo la fuente de las lecturas; la
+bandeja copia su fecha.
+
+Las entregas de una notificación guardada se sincronizan al confirmar la
+transacción, cuando ya se guardaron sus destinatarios: crearla y asignarlos
+dentro de la misma transacción (las vistas y el admin lo hacen).
+
+Se mantiene solo con settings.NOTIFICACIONES_BANDEJA. Los cambios de nivel de
+un usuario se sincronizan al guardarlo; las escrituras que omiten el ORM se
+corrigen con `python manage.py reconciliar_bandejas_notificaciones`.
+"""
+
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BandejaNotificacion, Notificacion, NotificacionLeida
+
+
+TAMANO_LOTE = 1000
+
+
+def bandeja_activa():
+    return settings.NOTIFICACIONES_BANDEJA
+
+
+def _lotes(valores, tamano):
+    iterador = iter(valores)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def pendientes(usuario, ahora):
+    """Entregas no leídas ni expiradas de `usuario`"""
+    return BandejaNotificacion.objects.filter(
+        usuario=usuario,
+        leida_en__isnull=True,
+    ).filter(
+        Q(expira_en__isnull=True) | Q(expira_en__gt=ahora)
+    )
+
+
+def destinatarios(notificacion):
+    """Usuarios que deben recibir `notificacion` según su targeting actual"""
+    usuarios = get_user_model().objects.all()
+    if not notificacion.activa:
+        return usuarios.none()
+    especificos = notificacion.usuarios_objetivo.values('pk')
+    if notificacion.nivel_usuario_objetivo:
+        return usuarios.filter(Q(pk__in=especificos) | Q(user_level=notificacion.nivel_usuario_objetivo))
+    if notificacion.usuarios_objetivo.exists():
+        return usuarios.filter(pk__in=especificos)
+    return usuarios
+
+
+def _crear_entregas(notificacion_ids, usuario_ids, tamano_lote):
+    """
+    Crea las entregas de cada par (notificación, usuario) con la fecha de
+    lectura y de expiración vigentes. Devuelve las filas enviadas.
+    """
+    expiraciones = dict(Notificacion.objects.filter(pk__in=notificacion_ids).values_list('pk', 'fecha_expiracion'))
+    creadas = 0
+    for lote in _lotes(usuario_ids, tamano_lote):
+        lecturas = {
+            (notificacion_id, usuario_id): fecha
+            for notificacion_id, usuario_id, fecha in NotificacionLeida.objects.filter(
+                notificacion_id__in=notificacion_ids, usuario_id__in=lote
+            ).values_list('notificacion_id', 'usuario_id', 'fecha_lectura')
+        }
+        entregas = [
+            BandejaNotificacion(
+                usuario_id=usuario_id,
+                notificacion_id=notificacion_id,
+                leida_en=lecturas.get((notificacion_id, usuario_id)),
+                expira_en=expiraciones[notificacion_id],
+            )
+            for usuario_id in lote
+            for notificacion_id in notificacion_ids
+        ]
+        BandejaNotificacion.objects.bulk_create(entregas, batch_size=tamano_lote, ignore_conflicts=True)
+        creadas += len(entregas)
+    return creadas
+
+
+def distribuir_notificacion(notificacion, tamano_lote=TAMANO_LOTE):
+    """
+    Sincroniza las entregas de `notificacion` con sus destinatarios actuales.
+    Devuelve (creadas, eliminadas, afectados): los usuarios que la tenían o
+    la reciben, o None si la reciben todos.
+    """
+    entregas = BandejaNotificacion.objects.filter(notificacion=notificacion)
+    usuarios = destinatarios(notificacion).values('pk')
+    sobrantes = entregas.exclude(usuario_id__in=usuarios)
+    retirados = set(sobrantes.values_list('usuario_id', flat=True))
+    eliminadas, _ = sobrantes.delete()
+
+    fecha = notificacion.fecha_expiracion
+    if fecha is None:
+        entregas.filter(expira_en__isnull=False).update(expira_en=None)
+    else:
+        entregas.exclude(expira_en=fecha).update(expira_en=fecha)
+
+    faltantes = list(usuarios.exclude(pk__in=entregas.values('usuario_id')).values_list('pk', flat=True))
+    creadas = _crear_entregas([notificacion.pk], faltantes, tamano_lote) if faltantes else 0
+
+    general = (notificacion.activa and not notificacion.nivel_usuario_objetivo
+               and not notificacion.usuarios_objetivo.exists())
+    afectados = None if general else retirados | set(entregas.values_list('usuario_id', flat=True))
+    return creadas, eliminadas, afectados
+
+
+def actualizar_entregas(notificacion):
+    """
+    Distribuye `notificacion` e invalida el resumen (y avisa a las conexiones
+    SSE) solo de los usuarios que la tenían o la reciben
+    """
+    from .resumen import invalidar_resumenes  # resumen importa este módulo
+    _, _, afectados = distribuir_notificacion(notificacion)
+    invalidar_resumenes(afectados)
+
+
+def programar_entregas(notificacion_id):
+    """
+    Actualiza las entregas de la notificación al confirmar la transacción.
+    En post_save los destinatarios aún no se guardaron (el formulario y el
+    admin llaman a save_m2m después) y entre el remove y el add de un set()
+    la lista está vacía: distribuir en ese momento la trataría como general.
+    """
+    def entregar():
+        notificacion = Notificacion.objects.filter(pk=notificacion_id).first()
+        if notificacion is not None:
+            actualizar_entregas(notificacion)
+    transaction.on_commit(entregar)
+
+
+def sincronizar_usuario(usuario):
+    """
+    Sincroniza la bandeja de `usuario` con el targeting de las notificaciones
+    activas (por ejemplo, tras cambiar su nivel). Devuelve (creadas, eliminadas).
+    """
+    visibles = Notificacion.objects.filter(activa=True).filter(
+        Q(usuarios_objetivo=usuario) |
+        Q(nivel_usuario_objetivo=usuario.user_level) |
+        Q(usuarios_objetivo__isnull=True, nivel_usuario_objetivo__isnull=True)
+    ).values('pk')
+    entregas = BandejaNotificacion.objects.filter(usuario=usuario)
+    eliminadas, _ = entregas.exclude(notificacion_id__in=visibles).delete()
+    faltantes = list(
+        Notificacion.objects.filter(pk__in=visibles)
+        .exclude(pk__in=entregas.values('notificacion_id'))
+        .values_list('pk', flat=True)
+    )
+    creadas = _crear_entregas(faltantes, [usuario.pk], TAMANO_LOTE) if faltantes else 0
+    return creadas, eliminadas
+
+
+def reconciliar_bandejas(tamano_lote=TAMANO_LOTE):
+    """
+    Reconstruye la diferencia entre la bandeja y el targeting de todas las
+    notificaciones. Devuelve (creadas, eliminadas).
+    """
+    eliminadas, _ = BandejaNotificacion.objects.filter(notificacion__activa=False).delete()
+    creadas = 0
+    for notificacion in Notificacion.objects.filter(activa=True).iterator(chunk_size=tamano_lote):
+        c, e, _ = distribuir_notificacion(notificacion, tamano_lote)
+        creadas += c
+        eliminadas += e
+    # Lecturas registradas sin pasar por el ORM
+    copiar_lecturas(BandejaNotificacion.objects.all())
+    return creadas, eliminadas
+
+
+def copiar_lecturas(entregas):
+    """Copia a `entregas` no leídas la fecha de su NotificacionLeida, si existe"""
+    lecturas = NotificacionLeida.objects.filter(
+        notificacion_id=OuterRef('notificacion_id'), usuario_id=OuterRef('usuario_id')
+    ).values('fecha_lectura')[:1]
+    return entregas.filter(leida_en__isnull=True).filter(Exists(lecturas)).update(
+        leida_en=Subquery(lecturas)
+    )
+
+
+@receiver(post_save, sender=Notificacion)
+def _notificacion_guardada(sender, instance, **kwargs):
+    if bandeja_activa():
+        programar_entregas(instance.pk)
+
+
+@receiver(m2m_changed, sender=Notificacion.usuarios_objetivo.through)
+def _destinatarios_modificados(sender, instance, action, reverse, **kwargs):
+    if not bandeja_activa() or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Cambio desde el usuario (user.notificaciones_dirigidas)
+        sincronizar_usuario(instance)
+        from .resumen import invalidar_resumenes
+        invalidar_resumenes([instance.pk])
+    else:
+        programar_entregas(instance.pk)
+
+
+@receiver(post_save, sender=NotificacionLeida)
+def _lectura_guardada(sender, instance, **kwargs):
+    if bandeja_activa():
+        BandejaNotificacion.objects.filter(
+            usuario_id=instance.usuario_id, notificacion_id=instance.notificacion_id
+        ).update(leida_en=instance.fecha_lectura)
+
+
+@receiver(post_delete, sender=NotificacionLeida)
+def _lectura_eliminada(sender, instance, **kwargs):
+    if bandeja_activa():
+        BandejaNotificacion.objects.filter(
+            usuario_id=instance.usuario_id, notificacion_id=instance.notificacion_id
+        ).update(leida_en=None)
+
+
+@receiver(post_save, sender=get_user_model())
+def _usuario_guardado(sender, instance, created, update_fields=None, **kwargs):
+    # Un usuario nuevo recibe las notificaciones generales y las de su nivel
+    if bandeja_activa() and (created or update_fields is None or 'user_level' in update_fields):
+        sincronizar_usuario(instance)
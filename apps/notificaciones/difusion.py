@@ -0,0 +1,151 @@
+"""
+Difusión de cambios de notificaciones no leídas hacia las conexiones SSE
+Las escrituras que invalidan un resumen (ver apps.notificaciones.resumen)
+avisan qué usuarios cambiaron; cada conexión abierta de esos usuarios
+recalcula y envía su contador.
+
+El backend se elige con settings.NOTIFICACIONES_DIFUSION:
+- DifusionLocal: en memoria, solo alcanza las conexiones del mismo proceso
+  (desarrollo, pruebas o un único worker).
+- DifusionPostgres: LISTEN/NOTIFY de PostgreSQL, para varios workers.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class Suscripcion:
+    """Conexión SSE de un usuario; `evento` se activa cuando su contador cambia"""
+
+    def __init__(self, usuario_id, loop):
+        self.usuario_id = usuario_id
+        self.loop = loop
+        self.evento = asyncio.Event()
+
+
+class DifusionLocal:
+    """Pub/sub en memoria del proceso. Se puede publicar desde cualquier hilo."""
+
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+
+    def suscribir(self, usuario_id):
+        """Registra una conexión del usuario; llamar desde el event loop"""
+        suscripcion = Suscripcion(usuario_id, asyncio.get_running_loop())
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def publicar(self, usuario_ids):
+        """Avisa a los usuarios `usuario_ids` (None: a todos)"""
+        self._entregar(usuario_ids)
+
+    def _entregar(self, usuario_ids):
+        destinatarios = None if usuario_ids is None else set(usuario_ids)
+        with self._lock:
+            suscripciones = [
+                s for s in self._suscripciones
+                if destinatarios is None or s.usuario_id in destinatarios
+            ]
+        for suscripcion in suscripciones:
+            try:
+                # Varios avisos antes de que la conexión despierte se agrupan en uno
+                suscripcion.loop.call_soon_threadsafe(suscripcion.evento.set)
+            except RuntimeError:
+                self.cancelar(suscripcion)  # El loop de la conexión ya cerró
+
+
+class DifusionPostgres(DifusionLocal):
+    """
+    Publica con NOTIFY y recibe con un hilo que hace LISTEN en una conexión
+    propia, de modo que los avisos llegan a las conexiones de todos los
+    procesos. NOTIFY se entrega al confirmar la transacción.
+    """
+
+    CANAL = 'notificaciones_no_leidas'
+    # pg_notify admite hasta 8000 bytes; si no caben los ids se avisa a todos
+    TAMANO_MAXIMO = 7900
+    ESPERA_RECONEXION = 5
+
+    def __init__(self):
+        super().__init__()
+        self._escucha = None
+        self._lock_escucha = threading.Lock()
+
+    def suscribir(self, usuario_id):
+        self._iniciar_escucha()
+        return super().suscribir(usuario_id)
+
+    def publicar(self, usuario_ids):
+        payload = json.dumps(None if usuario_ids is None else sorted(set(usuario_ids)))
+        if len(payload) > self.TAMANO_MAXIMO:
+            payload = json.dumps(None)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.CANAL, payload])
+
+    def _iniciar_escucha(self):
+        with self._lock_escucha:
+            if self._escucha is None or not self._escucha.is_alive():
+                self._escucha = threading.Thread(target=self._escuchar, name='difusion-notificaciones', daemon=True)
+                self._escucha.start()
+
+    def _escuchar(self):
+        base = connections['default']
+        while True:
+            conexion = None
+            try:
+                conexion = base.get_new_connection(base.get_connection_params())
+                conexion.autocommit = True
+                with conexion.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.CANAL}')
+                while True:
+                    if select.select([conexion], [], [], 60) == ([], [], []):
+                        continue
+                    conexion.poll()
+                    while conexion.notifies:
+                        aviso = conexion.notifies.pop(0)
+                        self._entregar(json.loads(aviso.payload))
+            except Exception:
+                logger.exception('Se perdió la escucha de notificaciones; reintentando')
+                time.sleep(self.ESPERA_RECONEXION)
+            finally:
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except Exception:
+                        pass
+
+
+_difusion = None
+_lock_difusion = threading.Lock()
+
+
+def obtener_difusion():
+    """Backend de difusión configurado (uno por proceso)"""
+    global _difusion
+    with _lock_difusion:
+        if _difusion is None:
+            _difusion = import_string(settings.NOTIFICACIONES_DIFUSION)()
+        return _difusion
+
+
+def avisar_cambios(usuario_ids=None):
+    """Publica el cambio de contador de `usuario_ids` al confirmar la transacción"""
+    usuario_ids = None if usuario_ids is None else list(usuario_ids)
+    transaction.on_commit(lambda: obtener_difusion().publicar(usuario_ids))
@@ -0,0 +1,37 @@
+"""
+Registro de lecturas de notificaciones por lote
+Marcar N notificaciones cuesta una consulta de las ya leídas y un INSERT por
+lote (`bulk_create` con `ignore_conflicts` sobre el par único
+notificación/usuario), en lugar de un `get_or_create` (2 consultas) por cada
+una. `bulk_create` no emite señales: la bandeja y el resumen de no leídas se
+actualizan aquí.
+"""
+
+from .bandeja import TAMANO_LOTE, bandeja_activa, copiar_lecturas
+from .models import BandejaNotificacion, NotificacionLeida
+from .resumen import invalidar_resumenes
+
+
+def marcar_leidas(usuario, notificacion_ids):
+    """
+    Registra que `usuario` leyó `notificacion_ids`. Devuelve cuántas no
+    estaban leídas.
+    """
+    ids = set(notificacion_ids)
+    if not ids:
+        return 0
+    ids -= set(NotificacionLeida.objects.filter(
+        usuario=usuario, notificacion_id__in=ids
+    ).values_list('notificacion_id', flat=True))
+    if not ids:
+        return 0
+    # Con ignore_conflicts una lectura concurrente del mismo par no falla
+    NotificacionLeida.objects.bulk_create(
+        [NotificacionLeida(notificacion_id=i, usuario=usuario) for i in sorted(ids)],
+        batch_size=TAMANO_LOTE,
+        ignore_conflicts=True,
+    )
+    if bandeja_activa():
+        copiar_lecturas(BandejaNotificacion.objects.filter(usuario=usuario, notificacion_id__in=ids))
+    invalidar_resumenes([usuario.pk])
+    return len(ids)
@@ -0,0 +1,28 @@
+"""
+Reconcilia la bandeja de notificaciones con el targeting vigente
+Necesario al activar NOTIFICACIONES_BANDEJA sobre datos existentes y tras
+cambios que omiten el ORM (niveles de usuario, destinatarios o lecturas
+modificados con SQL o `update()`).
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.notificaciones.bandeja import TAMANO_LOTE, reconciliar_bandejas
+
+
+class Command(BaseCommand):
+    help = 'Crea las entregas faltantes y elimina las sobrantes de BandejaNotificacion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Entregas por lote de bulk_create (default: {TAMANO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        creadas, eliminadas = reconciliar_bandejas(tamano_lote=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Bandeja reconciliada: {creadas} entregas creadas, {eliminadas} eliminadas'
+        ))
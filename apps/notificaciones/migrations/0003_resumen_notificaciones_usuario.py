@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('notificaciones', '0002_alter_notificacionleida_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenNotificacionesUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('no_leidas', models.PositiveIntegerField(default=0, verbose_name='No leídas')),
+                ('ultimas', models.JSONField(default=list, verbose_name='Últimas no leídas')),
+                ('proxima_expiracion', models.DateTimeField(blank=True, null=True, verbose_name='Próxima expiración')),
+                ('etag', models.CharField(max_length=40, verbose_name='ETag')),
+                ('calculado_en', models.DateTimeField(verbose_name='Calculado en')),
+            ],
+            options={
+                'verbose_name': 'Resumen de notificaciones',
+                'verbose_name_plural': 'Resúmenes de notificaciones',
+            },
+        ),
+    ]
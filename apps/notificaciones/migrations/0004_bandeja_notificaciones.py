@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0003_resumen_notificaciones_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BandejaNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leida_en', models.DateTimeField(blank=True, null=True, verbose_name='Leída en')),
+                ('expira_en', models.DateTimeField(blank=True, null=True, verbose_name='Expira en')),
+                ('notificacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entregas', to='notificaciones.notificacion', verbose_name='Notificación')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bandeja_notificaciones', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Entrega de notificación',
+                'verbose_name_plural': 'Bandeja de notificaciones',
+                'indexes': [models.Index(fields=['usuario', 'leida_en'], name='notificacio_usuario_09efde_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'notificacion'), name='bandeja_entrega_unica')],
+            },
+        ),
+    ]
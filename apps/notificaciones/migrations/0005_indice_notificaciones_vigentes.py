@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0004_bandeja_notificaciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['activa', 'fecha_expiracion'], name='notificacion_vigente_idx'),
+        ),
+    ]
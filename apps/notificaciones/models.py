@@ -9,32 +9,60 @@ from django.conf import settings
 from django.utils import timezone
 
 
-class NotificacionManager(models.Manager):
-    """Manager personalizado para notificaciones"""
+# Campos que cambian las entregas de BandejaNotificacion
+CAMPOS_BANDEJA = {'activa', 'nivel_usuario_objetivo', 'fecha_expiracion'}
+
+
+class NotificacionQuerySet(models.QuerySet):
+    """
+    QuerySet de notificaciones componible (destinatario, vigencia) que
+    mantiene la bandeja de los destinatarios también en actualizaciones masivas
+    """
     
     def get_for_user(self, usuario):
         """Obtiene todas las notificaciones para un usuario específico"""
-        from django.db.models import Q
+        if settings.NOTIFICACIONES_BANDEJA:
+            # Una fila por destinatario: consulta indexada y sin DISTINCT
+            return self.filter(entregas__usuario=usuario, activa=True)
         
         # Notificaciones dirigidas específicamente al usuario
         # o a su nivel de usuario, o notificaciones generales
         return self.filter(
-            Q(usuarios_objetivo=usuario) | 
-            Q(nivel_usuario_objetivo=usuario.user_level) |
-            Q(usuarios_objetivo__isnull=True, nivel_usuario_objetivo__isnull=True)
+            models.Q(usuarios_objetivo=usuario) | 
+            models.Q(nivel_usuario_objetivo=usuario.user_level) |
+            models.Q(usuarios_objetivo__isnull=True, nivel_usuario_objetivo__isnull=True)
         ).filter(
             activa=True
         ).distinct()
 
-    def activas(self):
+    def activas(self, ahora=None):
         """Obtiene solo las notificaciones activas y no expiradas"""
         return self.filter(
             activa=True
         ).filter(
             models.Q(fecha_expiracion__isnull=True) |
-            models.Q(fecha_expiracion__gt=timezone.now())
+            models.Q(fecha_expiracion__gt=ahora or timezone.now())
         )
 
+    def visibles_para(self, usuario, ahora=None):
+        """Notificaciones activas y no expiradas dirigidas a `usuario`"""
+        return self.get_for_user(usuario).activas(ahora)
+    
+    def update(self, **kwargs):
+        if not settings.NOTIFICACIONES_BANDEJA or not CAMPOS_BANDEJA & set(kwargs):
+            return super().update(**kwargs)
+        from .bandeja import actualizar_entregas
+        # Capturar las filas antes: el filtro puede dejar de coincidir tras el UPDATE
+        pks = list(self.values_list('pk', flat=True))
+        filas = super().update(**kwargs)
+        for notificacion in self.model.objects.filter(pk__in=pks):
+            actualizar_entregas(notificacion)
+        return filas
+
+
+class NotificacionManager(models.Manager.from_queryset(NotificacionQuerySet)):
+    """Manager personalizado para notificaciones"""
+
 
 class Notificacion(models.Model):
     """
@@ -141,6 +169,14 @@ class Notificacion(models.Model):
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Predicado de NotificacionQuerySet.activas(): solo las activas
+            models.Index(
+                fields=['activa', 'fecha_expiracion'],
+                condition=models.Q(activa=True),
+                name='notificacion_vigente_idx',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.titulo} - {self.get_tipo_display()}"
@@ -215,3 +251,106 @@ class NotificacionLeida(models.Model):
         
     def __str__(self):
         return f"{self.usuario.username} leyó: {self.notificacion.titulo}"
+
+
+class ResumenNotificacionesUsuario(models.Model):
+    """
+    Contador de notificaciones no leídas y las 5 más recientes de cada usuario,
+    tal como las sirve la API de la barra de navegación. Se elimina al crear,
+    editar, activar/desactivar o leer notificaciones y se recalcula en la
+    siguiente consulta (ver apps.notificaciones.resumen).
+    """
+    
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen_notificaciones',
+        verbose_name='Usuario'
+    )
+    
+    no_leidas = models.PositiveIntegerField(
+        default=0,
+        verbose_name='No leídas'
+    )
+    
+    ultimas = models.JSONField(
+        default=list,
+        verbose_name='Últimas no leídas'
+    )
+    
+    # El conteo vale hasta que expire la primera notificación no leída
+    proxima_expiracion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Próxima expiración'
+    )
+    
+    etag = models.CharField(
+        max_length=40,
+        verbose_name='ETag'
+    )
+    
+    calculado_en = models.DateTimeField(
+        verbose_name='Calculado en'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumen de notificaciones'
+        verbose_name_plural = 'Resúmenes de notificaciones'
+        
+    def __str__(self):
+        return f"{self.usuario.username}: {self.no_leidas} no leídas"
+
+
+class BandejaNotificacion(models.Model):
+    """
+    Entrega de una notificación a un destinatario (fan-out al escribir).
+    Se crea al crear o redirigir una notificación activa, se elimina al
+    desactivarla o dejar de dirigirla al usuario, y refleja las lecturas de
+    NotificacionLeida (ver apps.notificaciones.bandeja).
+    """
+    
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='bandeja_notificaciones',
+        verbose_name='Usuario'
+    )
+    
+    notificacion = models.ForeignKey(
+        Notificacion,
+        on_delete=models.CASCADE,
+        related_name='entregas',
+        verbose_name='Notificación'
+    )
+    
+    leida_en = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Leída en'
+    )
+    
+    # Copia de Notificacion.fecha_expiracion para filtrar sin unir tablas
+    expira_en = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Expira en'
+    )
+    
+    class Meta:
+        verbose_name = 'Entrega de notificación'
+        verbose_name_plural = 'Bandeja de notificaciones'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'notificacion'],
+                name='bandeja_entrega_unica',
+            ),
+        ]
+        indexes = [
+            # No leídas de un usuario
+            models.Index(fields=['usuario', 'leida_en']),
+        ]
+        
+    def __str__(self):
+        return f"{self.usuario.username}: {self.notificacion.titulo}"
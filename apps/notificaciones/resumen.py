@@ -0,0 +1,153 @@
+"""
+Resumen de notificaciones no leídas por usuario (ResumenNotificacionesUsuario)
+La barra de navegación consulta el contador cada 30 segundos por pestaña; el
+resumen evita repetir la consulta de visibilidad (DISTINCT sobre el OR de
+targeting más la exclusión de leídas) en cada consulta. Cualquier escritura
+que cambie lo que ve un usuario elimina su resumen, que se recalcula en la
+siguiente consulta.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Min
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .bandeja import bandeja_activa, pendientes
+from .difusion import avisar_cambios
+from .models import Notificacion, NotificacionLeida, ResumenNotificacionesUsuario
+
+
+CANTIDAD_ULTIMAS = 5
+
+TAMANO_LOTE = 1000
+
+# Vida máxima de un resumen: acota el efecto de una invalidación concurrente
+# con un recálculo (el recálculo podría guardar datos leídos antes)
+VIGENCIA_RESUMEN = timedelta(minutes=5)
+
+
+def _lotes(valores, tamano):
+    iterador = iter(valores)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def _no_leidas(usuario, ahora):
+    if bandeja_activa():
+        return Notificacion.objects.filter(
+            activa=True,
+            pk__in=pendientes(usuario, ahora).values('notificacion_id'),
+        )
+    visibles = Notificacion.objects.visibles_para(usuario, ahora)
+    leidas_ids = NotificacionLeida.objects.filter(usuario=usuario).values_list('notificacion_id', flat=True)
+    return visibles.exclude(id__in=leidas_ids)
+
+
+def _datos_notificacion(notif):
+    return {
+        'id': notif.id,
+        'titulo': notif.titulo,
+        'mensaje': notif.mensaje[:100] + '...' if len(notif.mensaje) > 100 else notif.mensaje,
+        'tipo': notif.tipo,
+        'prioridad': notif.prioridad,
+        'fecha_creacion': notif.fecha_creacion.strftime('%d/%m/%Y %H:%M'),
+    }
+
+
+def recalcular_resumen(usuario, ahora=None):
+    """Calcula y guarda el resumen de `usuario`"""
+    ahora = ahora or timezone.now()
+    no_leidas = _no_leidas(usuario, ahora)
+    ultimas = [_datos_notificacion(n) for n in no_leidas.order_by('-fecha_creacion')[:CANTIDAD_ULTIMAS]]
+    # El conteo y la expiración más próxima salen de un solo agregado
+    totales = no_leidas.aggregate(n=Count('id'), proxima=Min('fecha_expiracion'))
+    resumen = ResumenNotificacionesUsuario(
+        usuario=usuario,
+        no_leidas=totales['n'],
+        ultimas=ultimas,
+        proxima_expiracion=totales['proxima'],
+        calculado_en=ahora,
+    )
+    contenido = json.dumps([resumen.no_leidas, resumen.ultimas], sort_keys=True)
+    resumen.etag = hashlib.sha1(contenido.encode()).hexdigest()
+    ResumenNotificacionesUsuario.objects.bulk_create(
+        [resumen],
+        update_conflicts=True,
+        unique_fields=['usuario'],
+        update_fields=['no_leidas', 'ultimas', 'proxima_expiracion', 'etag', 'calculado_en'],
+    )
+    return resumen
+
+
+def vencimiento(resumen):
+    """Momento en que `resumen` deja de valer sin que nada lo invalide"""
+    vence = resumen.calculado_en + VIGENCIA_RESUMEN
+    if resumen.proxima_expiracion:
+        vence = min(vence, resumen.proxima_expiracion)
+    return vence
+
+
+def obtener_resumen(usuario, ahora=None):
+    """
+    Resumen vigente de `usuario`: una lectura por clave primaria, o el
+    recálculo si no existe, expiró alguna notificación contada o es antiguo.
+    """
+    ahora = ahora or timezone.now()
+    resumen = ResumenNotificacionesUsuario.objects.filter(usuario=usuario).first()
+    if resumen is None or vencimiento(resumen) <= ahora:
+        resumen = recalcular_resumen(usuario, ahora)
+    return resumen
+
+
+def invalidar_resumenes(usuario_ids=None):
+    """
+    Elimina los resúmenes de `usuario_ids` (o todos si es None) y avisa a
+    sus conexiones SSE al confirmar la transacción.
+    """
+    if usuario_ids is None:
+        ResumenNotificacionesUsuario.objects.all().delete()
+    else:
+        for lote in _lotes(sorted(usuario_ids), TAMANO_LOTE):
+            ResumenNotificacionesUsuario.objects.filter(usuario_id__in=lote).delete()
+    avisar_cambios(usuario_ids)
+
+
+# Con la bandeja activa, sus receptores invalidan solo a los usuarios que
+# tenían o reciben la notificación (ver bandeja.actualizar_entregas)
+
+@receiver(post_save, sender=Notificacion)
+def _notificacion_guardada(sender, **kwargs):
+    if not bandeja_activa():
+        # El targeting puede alcanzar a cualquier usuario (por nivel o general)
+        invalidar_resumenes()
+
+
+@receiver(post_delete, sender=Notificacion)
+def _notificacion_eliminada(sender, **kwargs):
+    # Las entregas ya se eliminaron en cascada: no queda a quién acotar
+    invalidar_resumenes()
+
+
+@receiver(m2m_changed, sender=Notificacion.usuarios_objetivo.through)
+def _destinatarios_modificados(sender, action, **kwargs):
+    if not bandeja_activa() and action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_resumenes()
+
+
+@receiver(post_save, sender=NotificacionLeida)
+@receiver(post_delete, sender=NotificacionLeida)
+def _lectura_modificada(sender, instance, **kwargs):
+    invalidar_resumenes([instance.usuario_id])
+
+
+@receiver(post_save, sender=get_user_model())
+def _usuario_modificado(sender, instance, update_fields=None, **kwargs):
+    # El nivel del usuario cambia lo que ve; el login solo toca last_login
+    if update_fields is None or 'user_level' in update_fields:
+        invalidar_resumenes([instance.pk])
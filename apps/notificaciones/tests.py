@@ -1,3 +1,362 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.authentication.models import User
+from core.pruebas import PresupuestoConsultasMixin
+from .models import BandejaNotificacion, Notificacion, NotificacionLeida, ResumenNotificacionesUsuario
+from .resumen import obtener_resumen
+
+
+class ResumenNotificacionesTests(TestCase):
+	def setUp(self):
+		self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pass1234')
+		self.admin.user_level = 'ADMIN'
+		self.admin.save()
+		self.user = User.objects.create_user(username='usuario', email='usuario@example.com', password='pass1234')
+		with self.captureOnCommitCallbacks(execute=True):
+			self.general = Notificacion.objects.create(titulo='General', mensaje='Para todos', creado_por=self.admin)
+			self.por_nivel = Notificacion.objects.create(titulo='Admins', mensaje='Solo admins', nivel_usuario_objetivo='ADMIN')
+		self.client.force_login(self.user)
+		self.url = reverse('notificaciones:obtener_no_leidas')
+
+	def test_contador_con_etag_y_304(self):
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.json()['cantidad'], 1)
+		self.assertEqual(resp.json()['notificaciones'][0]['titulo'], 'General')
+		etag = resp['ETag']
+
+		with CaptureQueriesContext(connection) as consultas:
+			resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 304)
+		self.assertFalse([q for q in consultas if 'notificaciones_notificacion"' in q['sql']])
+
+	def test_se_invalida_al_crear_editar_y_leer(self):
+		etag = self.client.get(self.url)['ETag']
+
+		with self.captureOnCommitCallbacks(execute=True):
+			nueva = Notificacion.objects.create(titulo='Nueva', mensaje='Otra', creado_por=self.admin)
+		resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.json()['cantidad'], 2)
+		self.assertEqual(resp.json()['notificaciones'][0]['id'], nueva.id)
+
+		resp = self.client.post(reverse('notificaciones:marcar_como_leida'), {'notificacion_id': nueva.id})
+		self.assertTrue(resp.json()['success'])
+		self.assertEqual(self.client.get(self.url).json()['cantidad'], 1)
+
+		self.client.force_login(self.admin)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('notificaciones:toggle_estado', args=[self.general.id]))
+		self.client.force_login(self.user)
+		self.assertEqual(self.client.get(self.url).json()['cantidad'], 0)
+
+		# Los destinatarios específicos también invalidan
+		with self.captureOnCommitCallbacks(execute=True):
+			dirigida = Notificacion.objects.create(titulo='Dirigida', mensaje='A otro', nivel_usuario_objetivo='MANAGER')
+		self.assertEqual(self.client.get(self.url).json()['cantidad'], 0)
+		with self.captureOnCommitCallbacks(execute=True):
+			dirigida.usuarios_objetivo.add(self.user)
+		self.assertEqual(self.client.get(self.url).json()['cantidad'], 1)
+
+	def test_cambio_de_nivel_y_expiracion(self):
+		self.assertEqual(obtener_resumen(self.user).no_leidas, 1)
+		self.user.user_level = 'ADMIN'
+		self.user.save()
+		self.assertEqual(obtener_resumen(self.user).no_leidas, 2)
+
+		expira = timezone.now() + timedelta(hours=1)
+		Notificacion.objects.filter(pk=self.general.pk).update(fecha_expiracion=expira)
+		NotificacionLeida.objects.create(notificacion=self.por_nivel, usuario=self.user)
+		resumen = obtener_resumen(self.user)
+		self.assertEqual((resumen.no_leidas, resumen.proxima_expiracion), (1, expira))
+		self.assertEqual(obtener_resumen(self.user, ahora=expira + timedelta(minutes=1)).no_leidas, 0)
+		self.assertEqual(ResumenNotificacionesUsuario.objects.get(usuario=self.user).no_leidas, 0)
+
+
+@override_settings(NOTIFICACIONES_SSE_LATIDO=1)
+class StreamNotificacionesTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='usuario', email='usuario@example.com', password='pass1234')
+		with self.captureOnCommitCallbacks(execute=True):
+			Notificacion.objects.create(titulo='General', mensaje='Para todos')
+		self.url = reverse('notificaciones:stream')
+
+	def test_bajo_wsgi_responde_204(self):
+		self.client.force_login(self.user)
+		self.assertEqual(self.client.get(self.url).status_code, 204)
+
+	def _crear_notificacion(self):
+		# Los avisos se publican al confirmar la transacción
+		with self.captureOnCommitCallbacks(execute=True):
+			Notificacion.objects.create(titulo='Nueva', mensaje='Otra')
+
+	async def test_envia_el_contador_y_sus_cambios(self):
+		from unittest import mock
+		from . import views
+		await self.async_client.aforce_login(self.user)
+		resp = await self.async_client.get(self.url)
+		self.assertEqual(resp['Content-Type'], 'text/event-stream')
+		eventos = resp.streaming_content
+		try:
+			with mock.patch.object(views, 'obtener_resumen', wraps=views.obtener_resumen) as obtener:
+				self.assertEqual(await anext(eventos), b'retry: 5000\n\n')
+				self.assertIn(b'"cantidad": 1', await anext(eventos))
+				self.assertEqual(await anext(eventos), b': latido\n\n')
+				self.assertEqual(await anext(eventos), b': latido\n\n')
+			# Los latidos no vuelven a consultar el resumen
+			self.assertEqual(obtener.call_count, 1)
+
+			await sync_to_async(self._crear_notificacion)()
+			cambio = await asyncio.wait_for(anext(eventos), timeout=5)
+			self.assertTrue(cambio.startswith(b'event: no_leidas\n'))
+			self.assertIn(b'"cantidad": 2', cambio)
+		finally:
+			await eventos.aclose()
+
+
+class BandejaNotificacionesTests(TestCase):
+	def setUp(self):
+		self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='pass1234', user_level='ADMIN')
+		self.user = User.objects.create_user(username='usuario', email='usuario@example.com', password='pass1234')
+		self.otro = User.objects.create_user(username='otro', email='otro@example.com', password='pass1234')
+
+	def _destinatarios(self, notificacion):
+		return set(BandejaNotificacion.objects.filter(notificacion=notificacion).values_list('usuario__username', flat=True))
+
+	def test_entrega_segun_targeting_y_redireccion(self):
+		# La entrega se hace al confirmar la transacción
+		with self.captureOnCommitCallbacks(execute=True):
+			general = Notificacion.objects.create(titulo='General', mensaje='Para todos')
+		self.assertEqual(self._destinatarios(general), {'admin', 'usuario', 'otro'})
+
+		with self.captureOnCommitCallbacks(execute=True):
+			por_nivel = Notificacion.objects.create(titulo='Admins', mensaje='Solo admins', nivel_usuario_objetivo='ADMIN')
+		self.assertEqual(self._destinatarios(por_nivel), {'admin'})
+
+		with self.captureOnCommitCallbacks(execute=True):
+			dirigida = Notificacion.objects.create(titulo='Dirigida', mensaje='A uno')
+			dirigida.usuarios_objetivo.add(self.user)
+		self.assertEqual(self._destinatarios(dirigida), {'usuario'})
+		with self.captureOnCommitCallbacks(execute=True):
+			dirigida.usuarios_objetivo.set([self.otro])
+		self.assertEqual(self._destinatarios(dirigida), {'otro'})
+
+		with self.captureOnCommitCallbacks(execute=True):
+			dirigida.activa = False
+			dirigida.save()
+		self.assertEqual(self._destinatarios(dirigida), set())
+
+		# Un usuario nuevo recibe las generales; el cambio de nivel mueve las de nivel
+		nuevo = User.objects.create_user(username='nuevo', email='nuevo@example.com', password='pass1234')
+		self.assertIn('nuevo', self._destinatarios(general))
+		self.user.user_level = 'ADMIN'
+		self.user.save(update_fields=['user_level'])
+		self.assertEqual(self._destinatarios(por_nivel), {'admin', 'usuario'})
+		self.assertEqual(list(Notificacion.objects.get_for_user(self.otro)), [general])
+
+	def test_avisa_solo_a_los_destinatarios(self):
+		from unittest import mock
+		with mock.patch('apps.notificaciones.resumen.avisar_cambios') as avisar:
+			with self.captureOnCommitCallbacks(execute=True):
+				por_nivel = Notificacion.objects.create(titulo='Admins', mensaje='Solo admins', nivel_usuario_objetivo='ADMIN')
+			avisar.assert_called_once_with({self.admin.pk})
+
+			# Quien deja de recibirla también se entera
+			avisar.reset_mock()
+			with self.captureOnCommitCallbacks(execute=True):
+				por_nivel.usuarios_objetivo.add(self.user)
+			with self.captureOnCommitCallbacks(execute=True):
+				por_nivel.activa = False
+				por_nivel.save()
+			self.assertEqual(avisar.call_args_list[-1], mock.call({self.admin.pk, self.user.pk}))
+
+			avisar.reset_mock()
+			with self.captureOnCommitCallbacks(execute=True):
+				Notificacion.objects.create(titulo='General', mensaje='Para todos')
+			avisar.assert_called_once_with(None)
+
+	def test_destinatarios_en_la_misma_transaccion(self):
+		# Sin usuarios_objetivo guardados todavía la notificación no es general
+		with self.captureOnCommitCallbacks(execute=True):
+			dirigida = Notificacion.objects.create(titulo='Dirigida', mensaje='A uno')
+			self.assertFalse(BandejaNotificacion.objects.filter(notificacion=dirigida).exists())
+			dirigida.usuarios_objetivo.add(self.user)
+		self.assertEqual(self._destinatarios(dirigida), {'usuario'})
+
+		# El formulario guarda la notificación y sus destinatarios juntos
+		self.client.force_login(self.admin)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('notificaciones:crear'), {
+				'titulo': 'Desde el formulario', 'mensaje': 'A otro', 'tipo': 'general', 'prioridad': 'media',
+				'usuarios_objetivo': [self.otro.pk],
+			})
+		self.assertEqual(self._destinatarios(Notificacion.objects.get(titulo='Desde el formulario')), {'otro'})
+
+	def test_lecturas_y_consulta_sin_distinct(self):
+		expira = timezone.now() + timedelta(hours=1)
+		with self.captureOnCommitCallbacks(execute=True):
+			general = Notificacion.objects.create(titulo='General', mensaje='Para todos')
+			Notificacion.objects.create(titulo='Temporal', mensaje='Expira', fecha_expiracion=expira)
+
+		NotificacionLeida.objects.create(notificacion=general, usuario=self.user)
+		self.assertIsNotNone(BandejaNotificacion.objects.get(notificacion=general, usuario=self.user).leida_en)
+		self.assertEqual(obtener_resumen(self.user).no_leidas, 1)
+		self.assertEqual(obtener_resumen(self.user, ahora=expira + timedelta(minutes=1)).no_leidas, 0)
+
+		consulta = str(Notificacion.objects.get_for_user(self.user).query)
+		self.assertNotIn('DISTINCT', consulta)
+		self.assertEqual(Notificacion.objects.get_for_user(self.user).count(), 2)
+
+		self.client.force_login(self.otro)
+		resp = self.client.post(reverse('notificaciones:marcar_todas_como_leidas'))
+		self.assertEqual(resp.json()['marcadas'], 2)
+		self.assertFalse(BandejaNotificacion.objects.filter(usuario=self.otro, leida_en__isnull=True).exists())
+
+	def test_reconciliar_corrige_escrituras_sin_orm(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			general = Notificacion.objects.create(titulo='General', mensaje='Para todos')
+			por_nivel = Notificacion.objects.create(titulo='Admins', mensaje='Solo admins', nivel_usuario_objetivo='ADMIN')
+		BandejaNotificacion.objects.filter(usuario=self.user).delete()
+		BandejaNotificacion.objects.create(usuario=self.user, notificacion=por_nivel)
+		User.objects.filter(pk=self.otro.pk).update(user_level='ADMIN')
+
+		salida = StringIO()
+		call_command('reconciliar_bandejas_notificaciones', stdout=salida)
+		self.assertIn('2 entregas creadas, 1 eliminadas', salida.getvalue())
+		self.assertEqual(self._destinatarios(general), {'admin', 'usuario', 'otro'})
+		self.assertEqual(self._destinatarios(por_nivel), {'admin', 'otro'})
+
+		# QuerySet.update() de notificaciones mantiene la bandeja
+		Notificacion.objects.filter(pk=general.pk).update(activa=False)
+		self.assertEqual(self._destinatarios(general), set())
+
+
+class LecturasPorLoteTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='usuario', email='usuario@example.com', password='pass1234')
+		with self.captureOnCommitCallbacks(execute=True):
+			for i in range(30):
+				Notificacion.objects.create(titulo=f'N{i}', mensaje='Para todos')
+			self.ajena = Notificacion.objects.create(titulo='Admins', mensaje='Solo admins', nivel_usuario_objetivo='ADMIN')
+		self.client.force_login(self.user)
+
+	def test_get_no_marca_y_marcar_vistas_filtra_visibles(self):
+		self.client.get(reverse('eventos:perfil'))
+		self.client.get(reverse('eventos:notificaciones'))
+		self.assertFalse(NotificacionLeida.objects.exists())
+
+		ids = list(Notificacion.objects.filter(nivel_usuario_objetivo__isnull=True).values_list('pk', flat=True)[:10])
+		resp = self.client.post(reverse('notificaciones:marcar_vistas'), {'ids': ids + [self.ajena.pk]})
+		self.assertEqual(resp.json()['marcadas'], 10)
+		self.assertFalse(NotificacionLeida.objects.filter(notificacion=self.ajena).exists())
+		self.assertEqual(obtener_resumen(self.user).no_leidas, 20)
+		# Repetir no duplica
+		resp = self.client.post(reverse('notificaciones:marcar_vistas'), {'ids': ids})
+		self.assertEqual(resp.json()['marcadas'], 0)
+
+	def test_marcar_todas_con_consultas_constantes(self):
+		obtener_resumen(self.user)
+		with CaptureQueriesContext(connection) as consultas:
+			resp = self.client.post(reverse('notificaciones:marcar_todas_como_leidas'))
+		self.assertEqual(resp.json()['marcadas'], 30)
+		self.assertLess(len(consultas), 15)
+		self.assertEqual(NotificacionLeida.objects.filter(usuario=self.user).count(), 30)
+		self.assertFalse(BandejaNotificacion.objects.filter(usuario=self.user, leida_en__isnull=True).exists())
+		self.assertEqual(obtener_resumen(self.user).no_leidas, 0)
+
+
+class NotificacionesVigentesTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='usuario', email='usuario@example.com', password='pass1234')
+		with self.captureOnCommitCallbacks(execute=True):
+			for i in range(25):
+				Notificacion.objects.create(titulo=f'N{i}', mensaje='Para todos')
+			Notificacion.objects.create(titulo='Expirada', mensaje='Vieja', fecha_expiracion=timezone.now() - timedelta(days=1))
+			Notificacion.objects.create(titulo='Inactiva', mensaje='Oculta', activa=False)
+		self.client.force_login(self.user)
+
+	def test_visibles_para_compone_destinatario_y_vigencia(self):
+		visibles = Notificacion.objects.visibles_para(self.user)
+		self.assertEqual(visibles.count(), 25)
+		self.assertEqual(visibles.filter(titulo='N3').count(), 1)
+		ayer = timezone.now() - timedelta(days=2)
+		self.assertEqual(Notificacion.objects.visibles_para(self.user, ahora=ayer).count(), 26)
+
+	def test_paginacion_en_sql(self):
+		with CaptureQueriesContext(connection) as consultas:
+			resp = self.client.get(reverse('eventos:notificaciones'), {'page': 2})
+		self.assertEqual(resp.context['total_notificaciones'], 25)
+		self.assertEqual(len(resp.context['notificaciones']), 5)
+		self.assertTrue([q for q in consultas if 'notificaciones_notificacion"' in q['sql'] and 'LIMIT 5 OFFSET 20' in q['sql']])
+
+		resp = self.client.get(reverse('eventos:perfil'))
+		self.assertEqual(resp.context['total_notificaciones'], 25)
+		self.assertEqual(len(resp.context['notificaciones_recientes']), 10)
+
+
+class MisNotificacionesTests(PresupuestoConsultasMixin, TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='usuario', email='usuario@example.com', password='pass1234')
+		self.client.force_login(self.user)
+		self.url = reverse('notificaciones:mis_notificaciones')
+
+	def _crear(self, cantidad, leidas):
+		with self.captureOnCommitCallbacks(execute=True):
+			notificaciones = [Notificacion.objects.create(titulo=f'N{i}', mensaje='Para todos') for i in range(cantidad)]
+		for notificacion in notificaciones[:leidas]:
+			NotificacionLeida.objects.create(notificacion=notificacion, usuario=self.user)
+
+	def _consultas(self, **params):
+		with CaptureQueriesContext(connection) as consultas:
+			resp = self.client.get(self.url, params)
+		return resp, len(consultas)
+
+	def test_estado_de_lectura_y_totales(self):
+		self._crear(12, leidas=4)
+		resp, _ = self._consultas()
+		self.assertEqual(
+			(resp.context['total_notificaciones'], resp.context['no_leidas_count'], resp.context['leidas_count']),
+			(12, 8, 4),
+		)
+		leidas = [n for n in resp.context['notificaciones'] if n.leida]
+		self.assertTrue(all(n.fecha_lectura for n in leidas))
+
+		resp, _ = self._consultas(estado='leidas')
+		self.assertEqual((resp.context['total_notificaciones'], resp.context['leidas_count']), (4, 4))
+		resp, _ = self._consultas(estado='no_leidas', buscar='N1')
+		self.assertEqual(sorted(n.titulo for n in resp.context['notificaciones']), ['N10', 'N11'])
+
+		# Sin bandeja el targeting se resuelve en la consulta con el mismo resultado
+		with self.settings(NOTIFICACIONES_BANDEJA=False):
+			resp, _ = self._consultas()
+		self.assertEqual((resp.context['total_notificaciones'], resp.context['no_leidas_count']), (12, 8))
+
+	def test_consultas_constantes(self):
+		self._crear(3, leidas=1)
+		_, pocas = self._consultas()
+		self._crear(30, leidas=15)
+		_, muchas = self._consultas()
+		self.assertEqual(pocas, muchas)
+		self.assertDentroDelPresupuesto(self.url)
+		self.assertDentroDelPresupuesto(reverse('notificaciones:obtener_no_leidas'))
+
+	def test_admin_cuenta_lecturas_en_el_listado(self):
+		self.user.is_staff = self.user.is_superuser = True
+		self.user.save()
+		url = reverse('admin:notificaciones_notificacion_changelist')
+		self._crear(2, leidas=1)
+		with CaptureQueriesContext(connection) as pocas:
+			self.assertContains(self.client.get(url), '1 lecturas')
+		self._crear(10, leidas=10)
+		with CaptureQueriesContext(connection) as muchas:
+			self.client.get(url)
+		self.assertEqual(len(pocas), len(muchas))
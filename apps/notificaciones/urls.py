@@ -21,6 +21,8 @@ urlpatterns = [
     # APIs AJAX
     path('marcar-leida/', views.marcar_como_leida, name='marcar_como_leida'),
     path('marcar-todas-leidas/', views.marcar_todas_como_leidas, name='marcar_todas_como_leidas'),
+    path('marcar-vistas/', views.marcar_vistas, name='marcar_vistas'),
     path('api/no-leidas/', views.obtener_notificaciones_no_leidas, name='obtener_no_leidas'),
+    path('api/stream/', views.stream_notificaciones, name='stream'),
     path('toggle-estado/<int:notificacion_id>/', views.toggle_notificacion_estado, name='toggle_estado'),
 ]
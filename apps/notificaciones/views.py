@@ -2,20 +2,34 @@
 Vistas para el módulo de notificaciones
 """
 
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
 from django.core.paginator import Paginator
 
 from apps.authentication.permissions import AdminManagerPermissionMixin
+from apps.busqueda.consultas import aplicar_busqueda
+from core.consultas import presupuesto_consultas
 from .models import Notificacion, NotificacionLeida
 from .forms import NotificacionForm, NotificacionRapidaForm
+from .bandeja import bandeja_activa, pendientes
+from .difusion import obtener_difusion
+from .lecturas import marcar_leidas
+from .resumen import obtener_resumen, vencimiento
 
 
 class NotificacionListView(LoginRequiredMixin, ListView):
@@ -44,7 +58,10 @@ class NotificacionCreateView(AdminManagerPermissionMixin, CreateView):
     
     def form_valid(self, form):
         form.instance.creado_por = self.request.user
-        response = super().form_valid(form)
+        # Notificación y destinatarios en una transacción: la bandeja se
+        # distribuye al confirmarla, con los destinatarios ya guardados
+        with transaction.atomic():
+            response = super().form_valid(form)
         messages.success(self.request, 'Notificación creada exitosamente.')
         return response
 
@@ -83,7 +100,8 @@ class NotificacionUpdateView(AdminManagerPermissionMixin, UpdateView):
         else:
             form.instance.activa = False
             
-        response = super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
         messages.success(self.request, 'Notificación actualizada exitosamente.')
         return response
 
@@ -100,71 +118,53 @@ class NotificacionDeleteView(AdminManagerPermissionMixin, DeleteView):
 
 
 @login_required
+@presupuesto_consultas(10)
 def mis_notificaciones(request):
     """Vista para que los usuarios vean sus notificaciones"""
     user = request.user
     
-    # Obtener todas las notificaciones que el usuario puede ver
-    notificaciones_base = Notificacion.objects.filter(activa=True)
-    
-    # Filtrar notificaciones no expiradas
-    notificaciones_base = notificaciones_base.filter(
-        Q(fecha_expiracion__isnull=True) | Q(fecha_expiracion__gt=timezone.now())
+    # Notificaciones que el usuario puede ver (activas y no expiradas), con el
+    # estado de lectura anotado en la misma consulta
+    lecturas = NotificacionLeida.objects.filter(notificacion=OuterRef('pk'), usuario=user)
+    notificaciones_visibles = Notificacion.objects.visibles_para(user).annotate(
+        leida=Exists(lecturas),
+        fecha_lectura=Subquery(lecturas.values('fecha_lectura')[:1]),
     )
     
-    # Filtrar por targeting
-    notificaciones_visibles = notificaciones_base.filter(
-        Q(usuarios_objetivo=user) |  # Usuario específico
-        Q(nivel_usuario_objetivo=user.user_level) |  # Por nivel de usuario
-        Q(usuarios_objetivo__isnull=True, nivel_usuario_objetivo__isnull=True)  # Para todos
-    ).distinct()
-    
     # Aplicar filtros de búsqueda
     buscar = request.GET.get('buscar', '')
     tipo = request.GET.get('tipo', '')
     estado = request.GET.get('estado', '')
     
     if buscar:
-        notificaciones_visibles = notificaciones_visibles.filter(
-            Q(titulo__icontains=buscar) | Q(mensaje__icontains=buscar)
-        )
+        # Índice de texto completo, las más relevantes primero
+        notificaciones_visibles = aplicar_busqueda(notificaciones_visibles, buscar)
+    else:
+        notificaciones_visibles = notificaciones_visibles.order_by('-fecha_creacion', '-id')
     
     if tipo:
         notificaciones_visibles = notificaciones_visibles.filter(tipo=tipo)
     
-    # Crear lista con información de lectura
-    notificaciones_con_lectura = []
-    for notif in notificaciones_visibles.order_by('-fecha_creacion'):
-        try:
-            lectura = NotificacionLeida.objects.get(notificacion=notif, usuario=user)
-            notificaciones_con_lectura.append({
-                'notificacion': notif,
-                'leida': True,
-                'fecha_lectura': lectura.fecha_lectura
-            })
-        except NotificacionLeida.DoesNotExist:
-            notificaciones_con_lectura.append({
-                'notificacion': notif,
-                'leida': False,
-                'fecha_lectura': None
-            })
-    
     # Filtrar por estado de lectura si se especifica
     if estado == 'no_leidas':
-        notificaciones_con_lectura = [n for n in notificaciones_con_lectura if not n['leida']]
+        notificaciones_visibles = notificaciones_visibles.filter(leida=False)
     elif estado == 'leidas':
-        notificaciones_con_lectura = [n for n in notificaciones_con_lectura if n['leida']]
+        notificaciones_visibles = notificaciones_visibles.filter(leida=True)
+    
+    # Estadísticas en un solo agregado condicional
+    totales = notificaciones_visibles.aggregate(
+        total=Count('id'),
+        no_leidas=Count('id', filter=Q(leida=False)),
+    )
+    total_notificaciones = totales['total']
+    no_leidas_count = totales['no_leidas']
+    leidas_count = total_notificaciones - no_leidas_count
     
-    # Paginación
-    paginator = Paginator(notificaciones_con_lectura, 10)
+    # Paginación (LIMIT/OFFSET en SQL)
+    paginator = Paginator(notificaciones_visibles, 10)
     page_number = request.GET.get('page')
     notificaciones = paginator.get_page(page_number)
     
-    # Estadísticas
-    total_notificaciones = len(notificaciones_con_lectura)
-    no_leidas_count = len([n for n in notificaciones_con_lectura if not n['leida']])
-    leidas_count = total_notificaciones - no_leidas_count
-    
     context = {
         'notificaciones': notificaciones,
         'total_notificaciones': total_notificaciones,
@@ -214,31 +214,47 @@ def marcar_todas_como_leidas(request):
         try:
             user = request.user
             
-            # Obtener notificaciones visibles para el usuario
-            notificaciones_visibles = Notificacion.objects.filter(
-                activa=True
-            ).filter(
-                Q(fecha_expiracion__isnull=True) | Q(fecha_expiracion__gt=timezone.now())
-            ).filter(
-                Q(usuarios_objetivo=user) |
-                Q(nivel_usuario_objetivo=user.user_level) |
-                Q(usuarios_objetivo__isnull=True, nivel_usuario_objetivo__isnull=True)
-            ).distinct()
-            
-            # Obtener las que no ha leído
-            leidas_ids = NotificacionLeida.objects.filter(
-                usuario=user
-            ).values_list('notificacion_id', flat=True)
+            if bandeja_activa():
+                # Las pendientes salen de la bandeja del usuario
+                no_leidas = Notificacion.objects.filter(
+                    pk__in=pendientes(user, timezone.now()).values('notificacion_id')
+                )
+            else:
+                # Obtener notificaciones visibles para el usuario
+                notificaciones_visibles = Notificacion.objects.visibles_para(user)
+                
+                # Obtener las que no ha leído
+                leidas_ids = NotificacionLeida.objects.filter(
+                    usuario=user
+                ).values_list('notificacion_id', flat=True)
+                
+                no_leidas = notificaciones_visibles.exclude(id__in=leidas_ids)
+            marcadas = marcar_leidas(user, no_leidas.values_list('pk', flat=True))
             
-            no_leidas = notificaciones_visibles.exclude(id__in=leidas_ids)
-            marcadas = 0
+            return JsonResponse({
+                'success': True,
+                'marcadas': marcadas
+            })
             
-            for notificacion in no_leidas:
-                NotificacionLeida.objects.get_or_create(
-                    notificacion=notificacion,
-                    usuario=user
-                )
-                marcadas += 1
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+    
+    return JsonResponse({'success': False, 'error': 'Método no permitido'})
+
+
+@login_required
+def marcar_vistas(request):
+    """
+    AJAX: Marcar como leídas las notificaciones mostradas en una página
+    Las páginas de perfil y de notificaciones las envían al cargar, en lugar
+    de escribir durante el GET que las muestra.
+    """
+    if request.method == 'POST':
+        try:
+            ids = [int(i) for i in request.POST.getlist('ids') if i.isdigit()]
+            # Solo las que el usuario puede ver
+            visibles = Notificacion.objects.get_for_user(request.user).filter(pk__in=ids)
+            marcadas = marcar_leidas(request.user, visibles.values_list('pk', flat=True))
             
             return JsonResponse({
                 'success': True,
@@ -252,54 +268,80 @@ def marcar_todas_como_leidas(request):
 
 
 @login_required
+@presupuesto_consultas(12)
 def obtener_notificaciones_no_leidas(request):
-    """AJAX: Obtener contador de notificaciones no leídas"""
+    """
+    AJAX: Obtener contador de notificaciones no leídas
+    Se sirve desde el resumen precalculado; las pestañas que ya tienen la
+    versión vigente (If-None-Match) reciben 304 sin cuerpo.
+    """
     try:
-        user = request.user
-        
-        # Obtener notificaciones visibles para el usuario
-        notificaciones_visibles = Notificacion.objects.filter(
-            activa=True
-        ).filter(
-            Q(fecha_expiracion__isnull=True) | Q(fecha_expiracion__gt=timezone.now())
-        ).filter(
-            Q(usuarios_objetivo=user) |
-            Q(nivel_usuario_objetivo=user.user_level) |
-            Q(usuarios_objetivo__isnull=True, nivel_usuario_objetivo__isnull=True)
-        ).distinct()
-        
-        # Obtener IDs de notificaciones leídas
-        leidas_ids = NotificacionLeida.objects.filter(
-            usuario=user
-        ).values_list('notificacion_id', flat=True)
-        
-        # Contar no leídas
-        no_leidas_count = notificaciones_visibles.exclude(id__in=leidas_ids).count()
-        
-        # Obtener las últimas 5 notificaciones no leídas para el dropdown
-        ultimas_no_leidas = notificaciones_visibles.exclude(id__in=leidas_ids).order_by('-fecha_creacion')[:5]
-        
-        notificaciones_data = []
-        for notif in ultimas_no_leidas:
-            notificaciones_data.append({
-                'id': notif.id,
-                'titulo': notif.titulo,
-                'mensaje': notif.mensaje[:100] + '...' if len(notif.mensaje) > 100 else notif.mensaje,
-                'tipo': notif.tipo,
-                'prioridad': notif.prioridad,
-                'fecha_creacion': notif.fecha_creacion.strftime('%d/%m/%Y %H:%M'),
+        resumen = obtener_resumen(request.user)
+        etag = quote_etag(resumen.etag)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse({
+                'success': True,
+                'cantidad': resumen.no_leidas,
+                'notificaciones': resumen.ultimas
             })
-        
-        return JsonResponse({
-            'success': True,
-            'cantidad': no_leidas_count,
-            'notificaciones': notificaciones_data
-        })
+        response['ETag'] = etag
+        # El navegador debe revalidar siempre; la respuesta es por usuario
+        response['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+async def stream_notificaciones(request):
+    """
+    SSE: mantiene una conexión por pestaña y envía el contador de no leídas
+    (evento `no_leidas`) cada vez que cambia. Requiere servidor ASGI; bajo
+    WSGI responde 204 y el navegador vuelve a la consulta periódica.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Autenticación requerida'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    response = StreamingHttpResponse(_eventos_sse(user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Evitar el buffer de proxies nginx
+    return response
+
+
+async def _eventos_sse(user):
+    difusion = obtener_difusion()
+    suscripcion = difusion.suscribir(user.pk)
+    latido = settings.NOTIFICACIONES_SSE_LATIDO
+    try:
+        yield 'retry: 5000\n\n'
+        enviado = None
+        revisar = True
+        while True:
+            # Solo se consulta el resumen al recibir un aviso o cuando vence
+            # (expiró una notificación contada); el latido es un comentario
+            if revisar:
+                resumen = await sync_to_async(obtener_resumen)(user)
+                vence = vencimiento(resumen)
+                if resumen.etag != enviado:
+                    enviado = resumen.etag
+                    datos = json.dumps({'cantidad': resumen.no_leidas, 'notificaciones': resumen.ultimas})
+                    yield f'event: no_leidas\nid: {resumen.etag}\ndata: {datos}\n\n'
+            try:
+                await asyncio.wait_for(suscripcion.evento.wait(), timeout=latido)
+                suscripcion.evento.clear()
+                revisar = True
+            except asyncio.TimeoutError:
+                yield ': latido\n\n'
+                revisar = timezone.now() >= vence
+    finally:
+        difusion.cancelar(suscripcion)
+
+
 def puede_ver_notificacion(usuario, notificacion):
     """Función auxiliar para verificar si un usuario puede ver una notificación"""
     if not notificacion.activa:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ReporteGenerado
+from .models import EntradaCacheReporte, ReporteGenerado
 
 
 @admin.register(ReporteGenerado)
@@ -11,11 +11,13 @@ class ReporteGeneradoAdmin(admin.ModelAdmin):
         'generado_por', 
         'fecha_generacion', 
         'total_eventos',
+        'estado',
         'incluir_detalles'
     ]
     list_filter = [
         'tipo', 
         'formato', 
+        'estado',
         'fecha_generacion', 
         'incluir_detalles',
         'generado_por'
@@ -40,10 +42,16 @@ class ReporteGeneradoAdmin(admin.ModelAdmin):
             'fields': ('generado_por', 'fecha_generacion', 'total_eventos')
         }),
         ('Opciones', {
-            'fields': ('incluir_detalles',)
+            'fields': ('incluir_detalles', 'compacto')
+        }),
+        ('Filtros', {
+            'fields': ('fecha_inicio_filtro', 'fecha_fin_filtro', 'usuario_filtro', 'prioridad_filtro', 'etapa_filtro', 'solo_confirmados')
+        }),
+        ('Cola de generación', {
+            'fields': ('estado', 'intentos', 'fecha_inicio_proceso', 'fecha_finalizacion', 'mensaje_error')
         }),
         ('Archivo', {
-            'fields': ('nombre_archivo',),
+            'fields': ('nombre_archivo', 'archivo_generado'),
             'classes': ('collapse',)
         })
     )
@@ -55,3 +63,11 @@ class ReporteGeneradoAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Los reportes solo se generan desde las vistas, no desde el admin
         return False
+
+
+@admin.register(EntradaCacheReporte)
+class EntradaCacheReporteAdmin(admin.ModelAdmin):
+    list_display = ['clave', 'formato', 'tamano', 'total_eventos', 'aciertos', 'ultimo_acceso']
+    list_filter = ['formato']
+    readonly_fields = ['clave', 'ruta', 'formato', 'tamano', 'total_eventos', 'fecha_creacion', 'ultimo_acceso', 'aciertos']
+    ordering = ['-ultimo_acceso']
@@ -0,0 +1,118 @@
+"""
+Caché de reportes generados, direccionada por contenido
+La clave combina tipo, formato, opciones, alcance de visibilidad, rango de
+fechas y una huella de los datos del rango; cualquier escritura de eventos en
+el rango cambia la huella y con ella la clave. Las entradas se desalojan por
+LRU al superar el tope de tamaño o de número de entradas, junto con su
+archivo; el historial regenera al descargar los reportes cuyo archivo se
+desalojó.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from .models import EntradaCacheReporte
+
+
+# Cambiar al modificar el contenido de los archivos generados
+VERSION_FORMATO = 6
+
+CARPETA_CACHE = 'reportes/cache'
+
+
+def huella_datos(eventos):
+    """
+    Versión de los datos de `eventos`: cambia con cualquier alta, baja o
+    modificación (updated_at se actualiza en save() y en update()). El
+    primer elemento es el número de eventos.
+    """
+    datos = eventos.order_by().aggregate(n=Count('id'), suma=Sum('id'), ultimo=Max('updated_at'))
+    return [datos['n'], datos['suma'] or 0, datos['ultimo'].isoformat() if datos['ultimo'] else None]
+
+
+def clave_reporte(reporte, huella):
+    """Clave de caché (sha256) de un reporte dada la huella de sus eventos"""
+    user = reporte.generado_por
+    # Administradores y managers ven todos los eventos: comparten entradas
+    # (el archivo no incluye quién lo solicitó)
+    alcance = 'todos' if (user.is_admin() or user.is_manager()) else f'usuario:{user.pk}'
+    partes = [
+        VERSION_FORMATO,
+        reporte.tipo,
+        reporte.formato,
+        reporte.titulo,
+        reporte.incluir_detalles,
+        reporte.solo_confirmados,
+        reporte.compacto and reporte.formato == 'pdf',
+        alcance,
+        reporte.fecha_inicio_filtro.isoformat() if reporte.fecha_inicio_filtro else None,
+        reporte.fecha_fin_filtro.isoformat() if reporte.fecha_fin_filtro else None,
+        reporte.usuario_filtro_id,
+        reporte.prioridad_filtro,
+        reporte.etapa_filtro,
+        huella,
+    ]
+    return hashlib.sha256(json.dumps(partes).encode()).hexdigest()
+
+
+def obtener(clave):
+    """Entrada vigente para `clave` (registrando el acceso) o None"""
+    entrada = EntradaCacheReporte.objects.filter(clave=clave).first()
+    if entrada is None:
+        return None
+    if not default_storage.exists(entrada.ruta):
+        entrada.delete()
+        return None
+    EntradaCacheReporte.objects.filter(pk=entrada.pk).update(
+        ultimo_acceso=timezone.now(), aciertos=F('aciertos') + 1
+    )
+    return entrada
+
+
+def guardar(clave, formato, archivo, total_eventos):
+    """
+    Guarda `archivo` como entrada de `clave` y aplica el desalojo.
+    Si otro proceso guardó la misma clave antes, se conserva la existente.
+    """
+    ruta = default_storage.save(f'{CARPETA_CACHE}/{clave}.{formato}', File(archivo))
+    try:
+        entrada = EntradaCacheReporte.objects.create(
+            clave=clave,
+            ruta=ruta,
+            formato=formato,
+            tamano=default_storage.size(ruta),
+            total_eventos=total_eventos,
+        )
+    except IntegrityError:
+        default_storage.delete(ruta)
+        entrada = EntradaCacheReporte.objects.get(clave=clave)
+    desalojar()
+    return entrada
+
+
+def desalojar():
+    """Elimina las entradas menos usadas hasta cumplir los topes configurados"""
+    max_bytes = settings.REPORTES_CACHE_MAX_BYTES
+    max_entradas = settings.REPORTES_CACHE_MAX_ENTRADAS
+    totales = EntradaCacheReporte.objects.aggregate(n=Count('id'), bytes=Sum('tamano'))
+    n, ocupado = totales['n'], totales['bytes'] or 0
+    if n <= max_entradas and ocupado <= max_bytes:
+        return 0
+
+    eliminadas = 0
+    for entrada in EntradaCacheReporte.objects.order_by('ultimo_acceso', 'id').iterator():
+        if n <= max_entradas and ocupado <= max_bytes:
+            break
+        default_storage.delete(entrada.ruta)
+        entrada.delete()
+        n -= 1
+        ocupado -= entrada.tamano
+        eliminadas += 1
+    return eliminadas
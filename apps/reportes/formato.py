@@ -0,0 +1,60 @@
+"""
+Formato de fechas en español para los reportes
+Los nombres de los meses salen de una tabla fija, sin `locale.setlocale`
+(global al proceso y no seguro entre hilos) ni `strftime` + reemplazos por
+celda. Las zonas horarias se construyen una vez por proceso.
+"""
+
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+MESES = (
+    'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
+    'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre',
+)
+MESES_CAPITALIZADOS = tuple(mes.capitalize() for mes in MESES)
+
+
+@lru_cache(maxsize=None)
+def _zona_horaria(nombre):
+    return ZoneInfo(nombre)
+
+
+def zona_local():
+    """Zona horaria configurada (None si no existe)"""
+    try:
+        return _zona_horaria(settings.TIME_ZONE)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _fecha_espanol(dia, mes, anio):
+    return f'{dia:02d} de {MESES[mes - 1]} de {anio}'
+
+
+def formatear_fecha_espanol(fecha):
+    """Formatear fecha en español"""
+    # Las fechas de un reporte se repiten mucho: se memoriza el texto por día
+    return _fecha_espanol(fecha.day, fecha.month, fecha.year)
+
+
+def formatear_fecha_hora_espanol(fecha):
+    """Formatear fecha y hora en español con zona horaria local"""
+    # Convertir a zona horaria local si la fecha está en UTC
+    if timezone.is_aware(fecha):
+        local_tz = zona_local()
+        # Si la zona no existe, usar la fecha tal cual
+        if local_tz is not None:
+            fecha = fecha.astimezone(local_tz)
+
+    return f'{_fecha_espanol(fecha.day, fecha.month, fecha.year)} a las {fecha.hour:02d}:{fecha.minute:02d}'
+
+
+def formatear_mes_ano_espanol(fecha):
+    """Formatear mes y año en español"""
+    return f'{MESES_CAPITALIZADOS[fecha.month - 1]} {fecha.year}'
@@ -0,0 +1,579 @@
+"""
+Generación de los archivos de reportes (Excel y PDF)
+Los escritores reciben un archivo destino, de modo que la misma generación
+sirve para la descarga inmediata y para la cola de reportes en segundo plano.
+"""
+
+import csv
+import io
+import os
+import tempfile
+from functools import lru_cache
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as ExcelImage
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+from PIL import Image as PILImage
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, FrameBreak, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from django.conf import settings
+from django.utils import timezone
+
+from apps.eventos.models import Evento
+from . import cache
+from .formato import formatear_fecha_espanol, formatear_fecha_hora_espanol
+from .models import ReporteGenerado
+
+
+TIPOS_CONTENIDO = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+# Ancho máximo de columna en los reportes Excel
+ANCHO_MAXIMO_COLUMNA = 50
+# Eventos leídos por bloque al escribir reportes
+TAMANO_BLOQUE_REPORTE = 500
+# Fecha formateada más larga posible ("30 de septiembre de 2025")
+LONGITUD_FECHA_ESPANOL = len('30 de septiembre de 2025')
+# Logo de los reportes: 2 cm por lado, rasterizado a 300 ppp
+LADO_LOGO = 2*inch/2.54
+RESOLUCION_LOGO = 300
+
+
+@lru_cache(maxsize=1)
+def _logo_png():
+    """
+    Logo reducido a su tamaño impreso (PNG), preparado una vez por proceso
+    para Excel y PDF; None si no está disponible. El original de 1024 px se
+    decodificaba y recomprimía en cada reporte.
+    """
+    try:
+        logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'img', 'logo_reportes.png')
+        if not os.path.exists(logo_path):
+            return None
+        pixeles = round(LADO_LOGO / inch * RESOLUCION_LOGO)
+        with PILImage.open(logo_path) as imagen:
+            imagen.thumbnail((pixeles, pixeles), PILImage.LANCZOS)
+            salida = io.BytesIO()
+            imagen.save(salida, format='PNG', optimize=True)
+        return salida.getvalue()
+    except Exception:
+        return None  # Si no se puede cargar el logo, continuar sin él
+
+
+# Columnas que leen los escritores; el resto del evento no se transfiere
+CAMPOS_REPORTE = (
+    'nombre_evento', 'fecha_evento', 'hora_evento', 'sede', 'prioridad', 'etapa',
+    'usuario', 'usuario__username', 'usuario__first_name', 'usuario__last_name',
+)
+CAMPOS_DETALLE_REPORTE = ('objetivo', 'participantes', 'aforo', 'duracion', 'duracion_personalizada')
+
+
+class LecturaEventos:
+    """
+    Recorre los eventos de un reporte con una sola consulta (responsable
+    unido y solo las columnas usadas) leída por bloques. `total` cuenta las
+    filas entregadas, así que no hace falta un COUNT aparte.
+    """
+    
+    def __init__(self, eventos, incluir_detalles=True):
+        campos = CAMPOS_REPORTE + (CAMPOS_DETALLE_REPORTE if incluir_detalles else ())
+        self.eventos = eventos.select_related('usuario').only(*campos)
+        self.total = 0
+    
+    def __iter__(self):
+        for evento in self.eventos.iterator(chunk_size=TAMANO_BLOQUE_REPORTE):
+            self.total += 1
+            yield evento
+
+
+def _medidas_excel(eventos):
+    """
+    Longitudes máximas de los textos y total de eventos en un único agregado
+    de la base de datos: el modo write-only emite las dimensiones y el
+    encabezado antes que las filas.
+    """
+    from django.db.models import CharField, Count, Max
+    from django.db.models.functions import Cast, Greatest, Length
+
+    return eventos.order_by().aggregate(
+        total=Count('id'),
+        evento=Max(Length('nombre_evento')),
+        sede=Max(Length('sede')),
+        responsable=Max(Greatest(
+            Length('usuario__first_name') + Length('usuario__last_name') + 1,
+            Length('usuario__username'),
+        )),
+        objetivo=Max(Length('objetivo')),
+        participantes=Max(Length('participantes')),
+        aforo=Max(Length(Cast('aforo', CharField()))),
+    )
+
+
+def _anchos_columnas_excel(maximos, headers, textos_columna_a):
+    """Ancho de cada columna a partir de las longitudes de _medidas_excel"""
+    longitudes = {
+        'Evento': max([maximos['evento'] or 0] + [len(t) for t in textos_columna_a]),
+        'Fecha': LONGITUD_FECHA_ESPANOL,
+        'Hora': len('00:00'),
+        'Sede': maximos['sede'] or 0,
+        'Prioridad': max(len(str(etiqueta)) for _, etiqueta in Evento.PRIORIDAD_CHOICES),
+        'Estado': max(len(str(etiqueta)) for _, etiqueta in Evento.ETAPA_CHOICES),
+        'Responsable': maximos['responsable'] or 0,
+        'Objetivo': min(maximos['objetivo'] or 0, 100) + 3,
+        'Participantes': maximos['participantes'] or 0,
+        'Aforo': maximos['aforo'] or 0,
+        'Duración': len('99.99 hrs'),
+    }
+    return [min(max(len(header), longitudes[header]) + 2, ANCHO_MAXIMO_COLUMNA) for header in headers]
+
+
+def escribir_excel_eventos(eventos, reporte, destino, incluir_detalles=True):
+    """
+    Escribe en `destino` (archivo binario) un Excel con los eventos en modo
+    write-only: las filas se escriben conforme se leen, sin mantener el libro
+    en memoria. Devuelve el número de eventos escritos.
+    """
+    
+    # Crear el workbook y worksheet
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Eventos")
+    
+    # Estilos compartidos: un solo estilo con nombre para todas las celdas
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    estilo_encabezado = NamedStyle(
+        name='encabezado_reporte',
+        font=Font(bold=True, color="FFFFFF"),
+        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+        alignment=Alignment(horizontal="center", vertical="center"),
+        border=border,
+    )
+    estilo_celda = NamedStyle(name='celda_reporte', border=border)
+    wb.add_named_style(estilo_encabezado)
+    wb.add_named_style(estilo_celda)
+    
+    def celda(valor, estilo='celda_reporte'):
+        cell = WriteOnlyCell(ws, value=valor)
+        cell.style = estilo
+        return cell
+    
+    # Encabezados de las columnas
+    headers = ['Evento', 'Fecha', 'Hora', 'Sede', 'Prioridad', 'Estado', 'Responsable']
+    
+    if incluir_detalles:
+        headers.extend(['Objetivo', 'Participantes', 'Aforo', 'Duración'])
+    
+    # Información adicional
+    maximos = _medidas_excel(eventos)
+    # Sin el solicitante: el archivo se comparte en la caché entre quienes
+    # ven los mismos eventos
+    info = [
+        f"Fecha de generación: {formatear_fecha_hora_espanol(reporte.fecha_generacion)}",
+        f"Total de eventos: {maximos['total']}",
+    ]
+    
+    # Ajustar el ancho de las columnas (antes de escribir cualquier fila)
+    anchos = _anchos_columnas_excel(maximos, headers, [reporte.titulo] + info)
+    for col, ancho in enumerate(anchos, 1):
+        ws.column_dimensions[get_column_letter(col)].width = ancho
+    
+    # Título del reporte alineado con logo
+    titulo = WriteOnlyCell(ws, value=f"{reporte.titulo}")
+    titulo.font = Font(bold=True, size=16)
+    titulo.alignment = Alignment(horizontal="left", vertical="center")
+    ws.merged_cells.add('A1:G1')
+    
+    # Agregar logo en Excel al mismo nivel que el título
+    logo = _logo_png()
+    if logo:
+        img = ExcelImage(io.BytesIO(logo))
+        img.width = 75  # Aproximadamente 2 cm
+        img.height = 75  # Aproximadamente 2 cm
+        ws.add_image(img, 'H1')  # Colocar en columna H, misma fila que el título
+    
+    ws.append([titulo])
+    for linea in info:
+        ws.append([linea])
+    ws.append([])
+    ws.append([celda(header, 'encabezado_reporte') for header in headers])
+    
+    # Datos de los eventos
+    lectura = LecturaEventos(eventos, incluir_detalles)
+    for evento in lectura:
+        responsable = evento.usuario.get_full_name() or evento.usuario.username
+        fila = [
+            celda(evento.nombre_evento),
+            celda(formatear_fecha_espanol(evento.fecha_evento)),
+            celda(evento.hora_evento.strftime('%H:%M')),
+            celda(evento.sede),
+            celda(evento.get_prioridad_display()),
+            celda(evento.get_etapa_display()),
+            celda(responsable),
+        ]
+        
+        if incluir_detalles:
+            fila.extend([
+                celda(evento.objetivo[:100] + ('...' if len(evento.objetivo) > 100 else '')),
+                celda(evento.participantes),
+                celda(evento.aforo),
+                celda(f"{evento.duracion_real} hrs"),
+            ])
+        
+        ws.append(fila)
+    
+    wb.save(destino)
+    return lectura.total
+
+
+# Presentación de la tabla de eventos en PDF: (tamaño de letra, alto de fila)
+FORMATO_TABLA_PDF = {
+    False: {'fuente': 8, 'fuente_encabezado': 10, 'alto_fila': 16, 'alto_encabezado': 24},
+    True: {'fuente': 7, 'fuente_encabezado': 8, 'alto_fila': 11, 'alto_encabezado': 14},
+}
+ENCABEZADOS_PDF = ['Evento', 'Fecha', 'Hora', 'Sede', 'Prioridad', 'Estado', 'Responsable']
+# Relleno horizontal de cada celda (izquierdo + derecho)
+RELLENO_CELDA_PDF = 12
+
+
+@lru_cache(maxsize=None)
+def _estilos_pdf(compacto):
+    """Estilos del PDF, construidos una vez por proceso"""
+    styles = getSampleStyleSheet()
+    formato = FORMATO_TABLA_PDF[compacto]
+    return {
+        'titulo': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=14 if compacto else 18,
+            spaceAfter=10 if compacto else 30,
+            alignment=1  # Center
+        ),
+        'info': ParagraphStyle('InfoCompacta', parent=styles['Normal'], fontSize=8, leading=10)
+                if compacto else styles['Normal'],
+        'tabla': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),  # Color del header igual al Excel
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), formato['fuente_encabezado']),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),  # Fondo blanco para las celdas
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), formato['fuente']),
+            ('TOPPADDING', (0, 0), (-1, -1), 1 if compacto else 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1 if compacto else 3),
+            ('GRID', (0, 0), (-1, -1), 0.5 if compacto else 1, colors.black)
+        ]),
+    }
+
+
+@lru_cache(maxsize=1)
+def _logo_pdf():
+    """Logo decodificado una vez por proceso (None si no está disponible)"""
+    png = _logo_png()
+    return ImageReader(io.BytesIO(png)) if png else None
+
+
+class _LogoPDF(Flowable):
+    """Dibuja el logo ya decodificado; reportlab solo lo comprime por documento"""
+    
+    def __init__(self, imagen, ancho, alto):
+        super().__init__()
+        self.imagen = imagen
+        self.width = ancho
+        self.height = alto
+    
+    def draw(self):
+        self.canv.drawImage(self.imagen, 0, 0, self.width, self.height, mask='auto')
+
+
+def _recortar(texto, limite):
+    return texto[:limite] + ('...' if len(texto) > limite else '')
+
+
+def _filas_pdf(eventos):
+    """Filas de la tabla; acepta un queryset (leído por bloques) o una lista de eventos"""
+    if hasattr(eventos, 'iterator'):
+        eventos = LecturaEventos(eventos, incluir_detalles=False)
+    for evento in eventos:
+        responsable = evento.usuario.get_full_name() or evento.usuario.username
+        yield [
+            _recortar(evento.nombre_evento, 30),
+            formatear_fecha_espanol(evento.fecha_evento),
+            evento.hora_evento.strftime('%H:%M'),
+            _recortar(evento.sede, 20),
+            evento.get_prioridad_display(),
+            evento.get_etapa_display(),
+            _recortar(responsable, 20),
+        ]
+
+
+def _filas_que_caben(alto, formato):
+    """Filas de datos que caben en `alto` con el encabezado (deja una de margen)"""
+    return int((alto - formato['alto_encabezado']) // formato['alto_fila']) - 1
+
+
+def _medir_filas_pdf(eventos, formato, temporal):
+    """
+    Lee las filas una vez, las guarda como CSV en `temporal` y devuelve el
+    ancho máximo de cada columna y el número de filas: los anchos se conocen
+    antes de emitir la primera tabla sin conservar las filas en memoria.
+    """
+    anchos = [
+        stringWidth(texto, 'Helvetica-Bold', formato['fuente_encabezado'])
+        for texto in ENCABEZADOS_PDF
+    ]
+    escritor = csv.writer(temporal)
+    total = 0
+    for fila in _filas_pdf(eventos):
+        escritor.writerow(fila)
+        total += 1
+        for i, texto in enumerate(fila):
+            ancho = stringWidth(texto, 'Helvetica', formato['fuente'])
+            if ancho > anchos[i]:
+                anchos[i] = ancho
+    temporal.seek(0)
+    return [ancho + RELLENO_CELDA_PDF for ancho in anchos], total
+
+
+class _TablaPorBloques(Flowable):
+    """
+    Tabla de eventos que se construye una página a la vez. Declara más alto
+    que el disponible para que el marco la divida (split, la interfaz de
+    Flowable documentada por reportlab): cada división entrega la tabla con
+    las filas que caben en el espacio restante y, si quedan filas, la propia
+    tabla por bloques. En memoria solo queda la tabla de la página en curso.
+    """
+    
+    def __init__(self, filas, construir, formato):
+        super().__init__()
+        self.filas = iter(filas)
+        self.construir = construir
+        self.formato = formato
+        # Una fila de adelanto para saber si la tabla en curso es la última
+        self.siguiente = next(self.filas, None)
+    
+    def wrap(self, ancho, alto):
+        return ancho, alto + 1
+    
+    def split(self, ancho, alto):
+        cuantas = _filas_que_caben(alto, self.formato)
+        if cuantas < 1:
+            # Ni una fila cabe en lo que queda de la página
+            return [FrameBreak(), self]
+        bloque = []
+        while self.siguiente is not None and len(bloque) < cuantas:
+            bloque.append(self.siguiente)
+            self.siguiente = next(self.filas, None)
+        # Sin eventos se emite la tabla solo con el encabezado
+        tabla = self.construir(bloque)
+        return [tabla] if self.siguiente is None else [tabla, self]
+    
+    def draw(self):
+        pass
+
+
+def escribir_pdf_eventos(eventos, reporte, destino, incluir_detalles=True, compacto=False):
+    """
+    Escribe en `destino` (archivo binario) un PDF con los eventos y
+    devuelve cuántos escribió. La tabla se emite en bloques de una página con anchos de columna y
+    alto de fila fijos: reportlab no tiene que dividir una tabla enorme,
+    por lo que el tiempo de construcción crece linealmente con las filas.
+    Las filas pasan por un temporal en disco: en memoria solo queda la tabla
+    de la página en curso.
+    """
+    with tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as temporal:
+        return _escribir_pdf(eventos, reporte, destino, compacto, temporal)
+
+
+def _escribir_pdf(eventos, reporte, destino, compacto, temporal):
+    # Crear el documento
+    doc = SimpleDocTemplate(destino, pagesize=A4)
+    elements = []
+    estilos = _estilos_pdf(compacto)
+    formato = FORMATO_TABLA_PDF[compacto]
+    
+    # Filas al temporal, ancho máximo de cada columna y total en una lectura
+    anchos, total = _medir_filas_pdf(eventos, formato, temporal)
+    if sum(anchos) > doc.width:
+        escala = doc.width / sum(anchos)
+        anchos = [ancho * escala for ancho in anchos]
+    
+    # Crear encabezado con título y logo al mismo nivel
+    title_para = Paragraph(f"{reporte.titulo}", estilos['titulo'])
+    logo = None if compacto else _logo_pdf()
+    if logo:
+        logo_element = _LogoPDF(logo, LADO_LOGO, LADO_LOGO)  # 2 cm cuadrados
+        header_table = Table([[title_para, logo_element]], colWidths=[4.5*inch, 2*inch])
+        header_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),   # Título a la izquierda
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),  # Logo a la derecha
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),  # Centrar verticalmente
+        ]))
+        elements.append(header_table)
+    else:
+        elements.append(title_para)
+    
+    elements.append(Spacer(1, 8 if compacto else 20))
+    
+    # Información del reporte
+    # Sin el solicitante: el archivo se comparte en la caché
+    info_data = [
+        f"Fecha de generación: {formatear_fecha_hora_espanol(reporte.fecha_generacion)}",
+        f"Total de eventos: {total}"
+    ]
+    
+    for info in info_data:
+        elements.append(Paragraph(info, estilos['info']))
+    
+    elements.append(Spacer(1, 8 if compacto else 20))
+    
+    def tabla(bloque):
+        table = Table(
+            [ENCABEZADOS_PDF] + bloque,
+            colWidths=anchos,
+            rowHeights=[formato['alto_encabezado']] + [formato['alto_fila']] * len(bloque),
+            repeatRows=1,
+        )
+        table.setStyle(estilos['tabla'])
+        return table
+    
+    # Construir el PDF
+    elements.append(_TablaPorBloques(csv.reader(temporal), tabla, formato))
+    doc.build(elements)
+    return total
+
+
+def eventos_del_reporte(reporte):
+    """
+    Eventos de un reporte a partir de sus filtros guardados y del nivel de
+    quien lo solicitó; la vista y el worker obtienen el mismo conjunto.
+    """
+    user = reporte.generado_por
+    if user.is_admin() or user.is_manager():
+        eventos = Evento.objects.all()
+    else:
+        eventos = Evento.objects.filter(usuario=user)
+    
+    if reporte.fecha_inicio_filtro:
+        eventos = eventos.filter(fecha_evento__gte=reporte.fecha_inicio_filtro)
+    if reporte.fecha_fin_filtro:
+        eventos = eventos.filter(fecha_evento__lte=reporte.fecha_fin_filtro)
+    if reporte.usuario_filtro_id:
+        eventos = eventos.filter(usuario_id=reporte.usuario_filtro_id)
+    if reporte.prioridad_filtro:
+        eventos = eventos.filter(prioridad=reporte.prioridad_filtro)
+    if reporte.etapa_filtro:
+        eventos = eventos.filter(etapa=reporte.etapa_filtro)
+    if reporte.solo_confirmados:
+        eventos = eventos.filter(etapa='confirmado')
+    if reporte.tipo == 'carpeta_ejecutiva':
+        eventos = eventos.filter(carpeta_ejecutiva=True)
+    
+    # Los escritores leen por bloques con iterator(): el responsable viene
+    # en la misma consulta y la memoria no depende de la longitud del rango
+    return eventos.select_related('usuario').order_by('fecha_evento', 'hora_evento')
+
+
+def generar_archivo(reporte, eventos=None, clave=None):
+    """
+    Obtiene el archivo del reporte de la caché o lo genera y lo guarda en
+    ella; marca el reporte como completado con el total de eventos contado
+    al escribirlo. Devuelve la ruta del archivo.
+    """
+    if eventos is None:
+        eventos = eventos_del_reporte(reporte)
+    if clave is None:
+        clave = cache.clave_reporte(reporte, cache.huella_datos(eventos))
+    
+    entrada = cache.obtener(clave)
+    if entrada is None:
+        with tempfile.TemporaryFile() as archivo:
+            if reporte.formato == 'xlsx':
+                total = escribir_excel_eventos(eventos, reporte, archivo, reporte.incluir_detalles)
+            else:
+                total = escribir_pdf_eventos(eventos, reporte, archivo, reporte.incluir_detalles, reporte.compacto)
+            archivo.seek(0)
+            entrada = cache.guardar(clave, reporte.formato, archivo, total)
+    
+    reporte.archivo_generado = entrada.ruta
+    reporte.clave_cache = clave
+    reporte.total_eventos = entrada.total_eventos
+    reporte.estado = 'completado'
+    reporte.mensaje_error = ''
+    reporte.fecha_finalizacion = timezone.now()
+    reporte.save(update_fields=[
+        'archivo_generado', 'clave_cache', 'total_eventos', 'estado', 'mensaje_error', 'fecha_finalizacion',
+    ])
+    return entrada.ruta
+
+
+def reclamar_pendientes(limite):
+    """
+    Marca como 'procesando' hasta `limite` reportes pendientes y devuelve sus
+    ids. El UPDATE condicionado al estado evita que dos workers tomen el mismo.
+    """
+    from django.db.models import F
+    
+    reclamados = []
+    candidatos = (ReporteGenerado.objects
+                  .filter(estado='pendiente')
+                  .order_by('fecha_generacion')
+                  .values_list('pk', flat=True)[:limite])
+    for pk in list(candidatos):
+        tomado = ReporteGenerado.objects.filter(pk=pk, estado='pendiente').update(
+            estado='procesando',
+            fecha_inicio_proceso=timezone.now(),
+            intentos=F('intentos') + 1,
+        )
+        if tomado:
+            reclamados.append(pk)
+    return reclamados
+
+
+def recuperar_bloqueados(tiempo_maximo, max_intentos):
+    """
+    Devuelve a la cola los reportes que llevan más de `tiempo_maximo` en
+    'procesando' (worker caído) o los marca con error si agotaron los intentos.
+    """
+    limite = timezone.now() - tiempo_maximo
+    bloqueados = ReporteGenerado.objects.filter(estado='procesando', fecha_inicio_proceso__lt=limite)
+    fallidos = bloqueados.filter(intentos__gte=max_intentos).update(
+        estado='error',
+        mensaje_error='Se agotaron los intentos de generación',
+        fecha_finalizacion=timezone.now(),
+    )
+    reintentos = bloqueados.filter(intentos__lt=max_intentos).update(estado='pendiente')
+    return reintentos, fallidos
+
+
+def marcar_error(reporte, error):
+    """Registra en el reporte el fallo de su generación"""
+    reporte.estado = 'error'
+    reporte.mensaje_error = str(error)[:1000]
+    reporte.fecha_finalizacion = timezone.now()
+    reporte.save(update_fields=['estado', 'mensaje_error', 'fecha_finalizacion'])
+
+
+def procesar_reporte(reporte_id):
+    """Genera un reporte reclamado por el worker; devuelve si tuvo éxito"""
+    reporte = ReporteGenerado.objects.select_related('generado_por').get(pk=reporte_id)
+    try:
+        generar_archivo(reporte)
+    except Exception as e:
+        marcar_error(reporte, e)
+        return False
+    return True
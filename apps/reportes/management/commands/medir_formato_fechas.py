@@ -0,0 +1,121 @@
+"""
+Benchmark del formato de fechas de los reportes
+Compara el formateador actual con el anterior (strftime + 12 reemplazos y
+ZoneInfo por llamada) sobre N filas y verifica que el resultado sea el mismo
+al formatear desde varios hilos mientras otro hilo cambia el locale.
+"""
+
+import locale
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reportes.formato import formatear_fecha_espanol, formatear_fecha_hora_espanol
+
+
+MESES_INGLES = {
+    'January': 'enero', 'February': 'febrero', 'March': 'marzo',
+    'April': 'abril', 'May': 'mayo', 'June': 'junio',
+    'July': 'julio', 'August': 'agosto', 'September': 'septiembre',
+    'October': 'octubre', 'November': 'noviembre', 'December': 'diciembre'
+}
+
+
+def _fecha_anterior(fecha):
+    fecha_str = fecha.strftime('%d de %B de %Y')
+    for ingles, espanol in MESES_INGLES.items():
+        fecha_str = fecha_str.replace(ingles, espanol)
+    return fecha_str
+
+
+def _fecha_hora_anterior(fecha):
+    fecha = fecha.astimezone(ZoneInfo(settings.TIME_ZONE))
+    fecha_str = fecha.strftime('%d de %B de %Y a las %H:%M')
+    for ingles, espanol in MESES_INGLES.items():
+        fecha_str = fecha_str.replace(ingles, espanol)
+    return fecha_str
+
+
+def _medir(funcion, valores):
+    inicio = time.perf_counter()
+    for valor in valores:
+        funcion(valor)
+    return time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = 'Mide el formato de fechas de los reportes y verifica que sea seguro entre hilos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=100_000,
+            help='Filas a formatear (default: 100000)'
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=8,
+            help='Hilos para la verificación concurrente (default: 8)'
+        )
+
+    def handle(self, *args, **options):
+        filas = options['filas']
+        if filas < 1:
+            raise CommandError('--filas debe ser positivo')
+
+        # Una fecha por fila repartida en dos años, como en un reporte real
+        fechas = [date(2025, 1, 1) + timedelta(days=i % 730) for i in range(filas)]
+        base = datetime(2025, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        fechas_hora = [base + timedelta(minutes=37 * i) for i in range(filas)]
+
+        self.stdout.write(f"{'formato':<12} {'anterior (s)':>13} {'actual (s)':>11} {'aceleración':>12}")
+        for nombre, anterior, actual, valores in (
+            ('fecha', _fecha_anterior, formatear_fecha_espanol, fechas),
+            ('fecha_hora', _fecha_hora_anterior, formatear_fecha_hora_espanol, fechas_hora),
+        ):
+            t_anterior = _medir(anterior, valores)
+            t_actual = _medir(actual, valores)
+            self.stdout.write(
+                f'{nombre:<12} {t_anterior:>13.3f} {t_actual:>11.3f} {t_anterior / t_actual:>11.1f}x'
+            )
+
+        # Concurrencia: todos los hilos deben obtener el mismo texto aunque
+        # otro hilo cambie LC_TIME mientras tanto
+        esperado = [formatear_fecha_espanol(f) for f in fechas]
+        detener = threading.Event()
+        original = locale.setlocale(locale.LC_TIME)
+
+        def alternar_locale():
+            while not detener.is_set():
+                for nombre_locale in ('C', original):
+                    try:
+                        locale.setlocale(locale.LC_TIME, nombre_locale)
+                    except locale.Error:
+                        pass
+
+        alternador = threading.Thread(target=alternar_locale, daemon=True)
+        alternador.start()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, options['hilos'])) as pool:
+                resultados = list(pool.map(
+                    lambda _: [formatear_fecha_espanol(f) for f in fechas],
+                    range(max(1, options['hilos'])),
+                ))
+        finally:
+            detener.set()
+            alternador.join()
+            locale.setlocale(locale.LC_TIME, original)
+
+        distintos = sum(resultado != esperado for resultado in resultados)
+        if distintos:
+            raise CommandError(f'{distintos} hilos obtuvieron un resultado distinto')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(resultados)} hilos formatearon {filas} filas con resultados idénticos'
+        ))
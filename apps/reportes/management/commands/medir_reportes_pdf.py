@@ -0,0 +1,89 @@
+"""
+Benchmark del generador de PDF
+Construye reportes con eventos sintéticos (en memoria, sin tocar la base de
+datos) para distintos números de filas y muestra el tiempo por fila, que
+debe mantenerse aproximadamente constante.
+"""
+
+import io
+import time
+from datetime import date, time as hora, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.eventos.models import Evento
+from apps.reportes.generadores import escribir_pdf_eventos
+from apps.reportes.models import ReporteGenerado
+
+
+def eventos_sinteticos(cantidad):
+    """Eventos sin guardar con textos de longitud realista"""
+    responsable = User(username='benchmark', first_name='Responsable', last_name='De Prueba')
+    prioridades = [clave for clave, _ in Evento._meta.get_field('prioridad').choices]
+    etapas = [clave for clave, _ in Evento._meta.get_field('etapa').choices]
+    inicio = date.today()
+    return [
+        Evento(
+            nombre_evento=f'Reunión de seguimiento del proyecto número {i}',
+            fecha_evento=inicio + timedelta(days=i % 365),
+            hora_evento=hora(8 + i % 10, (i * 15) % 60),
+            sede=f'Sala de juntas {i % 12}',
+            prioridad=prioridades[i % len(prioridades)],
+            etapa=etapas[i % len(etapas)],
+            usuario=responsable,
+        )
+        for i in range(cantidad)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de construcción del PDF de eventos para varios tamaños'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            nargs='+',
+            default=[500, 1000, 2000, 4000, 8000],
+            help='Números de eventos a medir (default: 500 1000 2000 4000 8000)'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=3,
+            help='Construcciones por tamaño; se reporta la más rápida (default: 3)'
+        )
+        parser.add_argument(
+            '--compacto',
+            action='store_true',
+            help='Medir el modo compacto'
+        )
+
+    def handle(self, *args, **options):
+        if any(n < 1 for n in options['filas']):
+            raise CommandError('--filas debe contener números positivos')
+
+        self.stdout.write(f"{'filas':>8} {'segundos':>10} {'ms/fila':>9} {'KB':>8}")
+        for cantidad in options['filas']:
+            eventos = eventos_sinteticos(cantidad)
+            reporte = ReporteGenerado(
+                tipo='agenda',
+                formato='pdf',
+                titulo='Benchmark',
+                generado_por=eventos[0].usuario,
+                fecha_generacion=timezone.now(),
+                total_eventos=cantidad,
+            )
+            mejor, tamano = None, 0
+            for _ in range(max(1, options['repeticiones'])):
+                destino = io.BytesIO()
+                inicio = time.perf_counter()
+                escribir_pdf_eventos(eventos, reporte, destino, compacto=options['compacto'])
+                duracion = time.perf_counter() - inicio
+                mejor = duracion if mejor is None else min(mejor, duracion)
+                tamano = destino.tell()
+            self.stdout.write(
+                f'{cantidad:>8} {mejor:>10.3f} {mejor * 1000 / cantidad:>9.3f} {tamano / 1024:>8.0f}'
+            )
@@ -0,0 +1,99 @@
+"""
+Worker de la cola de reportes
+Toma los reportes pendientes y los genera en un pool de procesos, fuera de
+los workers web. Debe ejecutarse con acceso al mismo MEDIA_ROOT que la web.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+
+def _inicializar_proceso():
+    # Los procesos se crean con 'spawn': configurar Django en cada uno
+    import django
+    django.setup()
+
+
+def _procesar_en_proceso(reporte_id):
+    from apps.reportes.generadores import procesar_reporte
+    return reporte_id, procesar_reporte(reporte_id)
+
+
+class Command(BaseCommand):
+    help = 'Genera en segundo plano los reportes pendientes de la cola'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Procesos de generación; 0 genera en el proceso actual'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera cuando la cola está vacía (default: 5)'
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesar los pendientes actuales y terminar'
+        )
+        parser.add_argument(
+            '--max-intentos',
+            type=int,
+            default=3,
+            help='Intentos antes de marcar con error un reporte interrumpido (default: 3)'
+        )
+        parser.add_argument(
+            '--tiempo-maximo',
+            type=int,
+            default=30,
+            help='Minutos en "procesando" tras los que un reporte se considera interrumpido (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        from django.db import connections
+        from apps.reportes.generadores import procesar_reporte, reclamar_pendientes, recuperar_bloqueados
+
+        workers = max(0, options['workers'])
+        pool = None
+        if workers:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_proceso,
+            )
+
+        try:
+            while True:
+                reintentos, fallidos = recuperar_bloqueados(
+                    timedelta(minutes=options['tiempo_maximo']), options['max_intentos']
+                )
+                if reintentos or fallidos:
+                    self.stdout.write(f'{reintentos} reportes reencolados, {fallidos} marcados con error')
+
+                reclamados = reclamar_pendientes(max(1, workers) * 2)
+                if reclamados:
+                    if pool:
+                        resultados = pool.map(_procesar_en_proceso, reclamados)
+                    else:
+                        resultados = ((pk, procesar_reporte(pk)) for pk in reclamados)
+                    for pk, exito in resultados:
+                        estilo = self.style.SUCCESS if exito else self.style.ERROR
+                        self.stdout.write(estilo(f'Reporte {pk}: {"completado" if exito else "error"}'))
+                elif options['una_vez']:
+                    break
+                else:
+                    # No mantener conexiones abiertas mientras se espera
+                    connections.close_all()
+                    time.sleep(options['intervalo'])
+        finally:
+            if pool:
+                pool.shutdown()
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def marcar_existentes_completados(apps, schema_editor):
+    # Los reportes previos a la cola se generaron en línea (sin archivo guardado)
+    ReporteGenerado = apps.get_model('reportes', 'ReporteGenerado')
+    ReporteGenerado.objects.update(estado='completado')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20, verbose_name='Estado'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='fecha_finalizacion',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin de generación'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='fecha_inicio_proceso',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Inicio de generación'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Intentos de generación'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='mensaje_error',
+            field=models.TextField(blank=True, verbose_name='Mensaje de error'),
+        ),
+        migrations.AddIndex(
+            model_name='reportegenerado',
+            index=models.Index(fields=['estado', 'fecha_generacion'], name='reportes_re_estado_da68c0_idx'),
+        ),
+        migrations.RunPython(marcar_existentes_completados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_cola_reportes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntradaCacheReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('ruta', models.CharField(max_length=500, verbose_name='Ruta del Archivo')),
+                ('formato', models.CharField(choices=[('xlsx', 'Excel (XLSX)'), ('pdf', 'PDF')], max_length=10, verbose_name='Formato')),
+                ('tamano', models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('total_eventos', models.IntegerField(default=0, verbose_name='Total de Eventos')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('ultimo_acceso', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Último Acceso')),
+                ('aciertos', models.PositiveIntegerField(default=0, verbose_name='Aciertos')),
+            ],
+            options={
+                'verbose_name': 'Entrada de Caché de Reporte',
+                'verbose_name_plural': 'Caché de Reportes',
+                'ordering': ['-ultimo_acceso'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='clave_cache',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Clave de caché'),
+        ),
+    ]
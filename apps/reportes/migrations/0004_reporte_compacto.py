@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0003_cache_reportes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='compacto',
+            field=models.BooleanField(default=False, verbose_name='PDF Compacto'),
+        ),
+    ]
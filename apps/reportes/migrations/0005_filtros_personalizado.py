@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0004_reporte_compacto'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='etapa_filtro',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Etapa (Filtro)'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='prioridad_filtro',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Prioridad (Filtro)'),
+        ),
+        migrations.AddField(
+            model_name='reportegenerado',
+            name='usuario_filtro',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Responsable (Filtro)'),
+        ),
+    ]
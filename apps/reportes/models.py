@@ -25,6 +25,14 @@ class ReporteGenerado(models.Model):
         ('pdf', 'PDF'),
     ]
     
+    # Estados de la cola de generación
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    
     # Información básica del reporte
     tipo = models.CharField(
         max_length=20,
@@ -69,6 +77,28 @@ class ReporteGenerado(models.Model):
         verbose_name='Fecha Fin (Filtro)'
     )
     
+    # Filtros del reporte personalizado
+    usuario_filtro = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Responsable (Filtro)'
+    )
+    
+    prioridad_filtro = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Prioridad (Filtro)'
+    )
+    
+    etapa_filtro = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name='Etapa (Filtro)'
+    )
+    
     # Configuración del reporte
     incluir_detalles = models.BooleanField(
         default=True,
@@ -80,6 +110,11 @@ class ReporteGenerado(models.Model):
         verbose_name='Solo Eventos Confirmados'
     )
     
+    compacto = models.BooleanField(
+        default=False,
+        verbose_name='PDF Compacto'
+    )
+    
     # Metadatos
     total_eventos = models.IntegerField(
         default=0,
@@ -92,10 +127,50 @@ class ReporteGenerado(models.Model):
         verbose_name='Ruta del Archivo'
     )
     
+    # Cola de generación (ver `manage.py procesar_reportes`)
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS,
+        default='pendiente',
+        verbose_name='Estado'
+    )
+    
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Intentos de generación'
+    )
+    
+    mensaje_error = models.TextField(
+        blank=True,
+        verbose_name='Mensaje de error'
+    )
+    
+    fecha_inicio_proceso = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Inicio de generación'
+    )
+    
+    fecha_finalizacion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fin de generación'
+    )
+    
+    # Clave de la caché de reportes (también se usa como ETag)
+    clave_cache = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Clave de caché'
+    )
+    
     class Meta:
         verbose_name = 'Reporte Generado'
         verbose_name_plural = 'Reportes Generados'
         ordering = ['-fecha_generacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_generacion']),
+        ]
         
     def __str__(self):
         return f"{self.titulo} - {self.get_formato_display()} ({self.fecha_generacion.strftime('%d/%m/%Y %H:%M')})"
@@ -105,3 +180,65 @@ class ReporteGenerado(models.Model):
         """Genera el nombre del archivo basado en el tipo y fecha"""
         fecha_str = self.fecha_generacion.strftime('%Y%m%d_%H%M%S')
         return f"{self.tipo}_{fecha_str}.{self.formato}"
+    
+    @property
+    def disponible(self):
+        """Indica si el archivo generado puede descargarse"""
+        return self.estado == 'completado' and bool(self.archivo_generado)
+
+
+class EntradaCacheReporte(models.Model):
+    """
+    Archivo de reporte reutilizable, direccionado por contenido: la clave
+    resume tipo, formato, opciones, alcance y versión de los datos.
+    """
+    clave = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Clave'
+    )
+    
+    ruta = models.CharField(
+        max_length=500,
+        verbose_name='Ruta del Archivo'
+    )
+    
+    formato = models.CharField(
+        max_length=10,
+        choices=ReporteGenerado.FORMATOS,
+        verbose_name='Formato'
+    )
+    
+    tamano = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Tamaño (bytes)'
+    )
+    
+    total_eventos = models.IntegerField(
+        default=0,
+        verbose_name='Total de Eventos'
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de Creación'
+    )
+    
+    ultimo_acceso = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Último Acceso'
+    )
+    
+    aciertos = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Aciertos'
+    )
+    
+    class Meta:
+        verbose_name = 'Entrada de Caché de Reporte'
+        verbose_name_plural = 'Caché de Reportes'
+        ordering = ['-ultimo_acceso']
+    
+    def __str__(self):
+        return f"{self.clave[:12]}… ({self.get_formato_display()}, {self.aciertos} aciertos)"
@@ -1,13 +1,30 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta, date
 
 from apps.authentication.models import User
 from apps.eventos.models import Evento
+from core.pruebas import PresupuestoConsultasMixin
+from .models import EntradaCacheReporte, ReporteGenerado
+
 
+# Los reportes generados se guardan en un MEDIA_ROOT temporal
+MEDIA_PRUEBAS = tempfile.mkdtemp(prefix='reportes-tests-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS)
+class ReportesViewsTests(PresupuestoConsultasMixin, TestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.addClassCleanup(shutil.rmtree, MEDIA_PRUEBAS, ignore_errors=True)
 
-class ReportesViewsTests(TestCase):
 	@classmethod
 	def setUpTestData(cls):
 		# Crear usuario admin para tener acceso completo
@@ -88,6 +105,17 @@ class ReportesViewsTests(TestCase):
 		self.assertEqual(resp.status_code, 200)
 		self.assertEqual(resp["Content-Type"], "application/pdf")
 
+	def test_reportes_dentro_del_presupuesto(self):
+		manana = timezone.now().date() + timedelta(days=1)
+		for i in range(15):
+			autor = User.objects.create_user(username=f"autor{i}", email=f"autor{i}@example.com", password="x")
+			Evento.objects.create(nombre_evento=f"Extra {i}", fecha_evento=manana, usuario=autor, participantes="Ana, Luis")
+		for nombre in ("agenda", "semana", "mes", "carpeta_ejecutiva"):
+			for formato in ("xlsx", "pdf"):
+				url = reverse(f"reportes:{nombre}") + f"?formato={formato}"
+				self.assertEqual(self.assertDentroDelPresupuesto(url).status_code, 200, url)
+		self.assertDentroDelPresupuesto(reverse("reportes:historial"))
+
 	def test_generar_carpeta_xlsx(self):
 		url = reverse("reportes:carpeta_ejecutiva") + "?formato=xlsx"
 		resp = self.client.get(url)
@@ -97,3 +125,276 @@ class ReportesViewsTests(TestCase):
 			"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
 		)
 
+
+	def test_excel_write_only_con_anchos_y_estilo_compartido(self):
+		import openpyxl
+		from io import BytesIO
+		resp = self.client.get(reverse("reportes:agenda") + "?formato=xlsx")
+		self.assertTrue(resp.streaming)
+		wb = openpyxl.load_workbook(BytesIO(b"".join(resp.streaming_content)))
+		ws = wb["Eventos"]
+		self.assertEqual([c.value for c in ws[5]][:3], ["Evento", "Fecha", "Hora"])
+		nombres = [ws.cell(row=r, column=1).value for r in range(6, ws.max_row + 1)]
+		self.assertIn("Evento Agenda 1", nombres)
+		self.assertEqual(ws.cell(row=6, column=1).style, "celda_reporte")
+		self.assertEqual(ws["F5"].style, "encabezado_reporte")
+		self.assertLessEqual(ws.column_dimensions["A"].width, 50)
+		self.assertGreaterEqual(ws.column_dimensions["C"].width, len("Hora") + 2)
+		self.assertIn("A1:G1", [str(r) for r in ws.merged_cells.ranges])
+
+	def test_reporte_en_linea_queda_guardado(self):
+		resp = self.client.get(reverse("reportes:semana") + "?formato=pdf")
+		contenido = b"".join(resp.streaming_content)
+		reporte = ReporteGenerado.objects.get()
+		self.assertEqual(reporte.estado, "completado")
+		self.assertTrue(reporte.disponible)
+
+		resp = self.client.get(reverse("reportes:descargar", args=[reporte.id]))
+		self.assertEqual(resp["Content-Type"], "application/pdf")
+		self.assertEqual(b"".join(resp.streaming_content), contenido)
+
+	def test_sin_cola_se_genera_en_linea(self):
+		resp = self.client.get(reverse("reportes:agenda") + "?formato=xlsx&asincrono=true")
+		self.assertTrue(resp.streaming)
+		self.assertEqual(ReporteGenerado.objects.get().estado, "completado")
+		self.assertNotContains(self.client.get(reverse("reportes:index")), "generar-asincrono\"")
+
+	@override_settings(REPORTES_COLA=True)
+	def test_cola_asincrona_con_worker(self):
+		from django.core.management import call_command
+		from io import StringIO
+		resp = self.client.get(reverse("reportes:agenda") + "?formato=xlsx&asincrono=true")
+		self.assertRedirects(resp, reverse("reportes:historial"))
+		reporte = ReporteGenerado.objects.get()
+		self.assertEqual(reporte.estado, "pendiente")
+
+		resp = self.client.get(reverse("reportes:descargar", args=[reporte.id]))
+		self.assertRedirects(resp, reverse("reportes:historial"))
+
+		call_command("procesar_reportes", "--una-vez", "--workers", "0", stdout=StringIO())
+		reporte.refresh_from_db()
+		self.assertEqual(reporte.estado, "completado")
+		self.assertEqual(reporte.intentos, 1)
+		self.assertContains(self.client.get(reverse("reportes:historial")), reverse("reportes:descargar", args=[reporte.id]))
+
+		otro = User.objects.create_user(username="otro", email="otro@example.com", password="testpass123")
+		self.client.force_login(otro)
+		self.assertEqual(self.client.get(reverse("reportes:descargar", args=[reporte.id])).status_code, 404)
+
+	def test_reportes_interrumpidos_se_reencolan(self):
+		from .generadores import recuperar_bloqueados
+		reporte = ReporteGenerado.objects.create(
+			tipo="agenda", formato="pdf", titulo="Agenda", generado_por=self.user,
+			estado="procesando", intentos=1, fecha_inicio_proceso=timezone.now() - timedelta(hours=1),
+		)
+		self.assertEqual(recuperar_bloqueados(timedelta(minutes=30), max_intentos=3), (1, 0))
+		reporte.refresh_from_db()
+		self.assertEqual(reporte.estado, "pendiente")
+
+		ReporteGenerado.objects.filter(pk=reporte.pk).update(
+			estado="procesando", intentos=3, fecha_inicio_proceso=timezone.now() - timedelta(hours=1)
+		)
+		self.assertEqual(recuperar_bloqueados(timedelta(minutes=30), max_intentos=3), (0, 1))
+
+	def test_cache_reutiliza_archivo_hasta_que_cambian_los_datos(self):
+		url = reverse("reportes:semana") + "?formato=pdf"
+		primera = self.client.get(url)
+		contenido = b"".join(primera.streaming_content)
+		segunda = self.client.get(url)
+		self.assertEqual(b"".join(segunda.streaming_content), contenido)
+		self.assertEqual(primera["ETag"], segunda["ETag"])
+		entrada = EntradaCacheReporte.objects.get()
+		self.assertEqual(entrada.aciertos, 1)
+		self.assertEqual(set(ReporteGenerado.objects.values_list("archivo_generado", flat=True)), {entrada.ruta})
+
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=primera["ETag"])
+		self.assertEqual(resp.status_code, 304)
+		self.assertEqual(ReporteGenerado.objects.count(), 2)
+
+		# Cualquier escritura en el rango invalida la clave
+		Evento.objects.filter(nombre_evento="Evento Semana").update(sede="Sala 2")
+		tercera = self.client.get(url, HTTP_IF_NONE_MATCH=primera["ETag"])
+		self.assertEqual(tercera.status_code, 200)
+		self.assertNotEqual(tercera["ETag"], primera["ETag"])
+		self.assertEqual(EntradaCacheReporte.objects.count(), 2)
+
+	@override_settings(REPORTES_CACHE_MAX_ENTRADAS=1)
+	def test_cache_desaloja_la_entrada_menos_usada(self):
+		self.client.get(reverse("reportes:semana") + "?formato=pdf")
+		antigua = EntradaCacheReporte.objects.get()
+		self.client.get(reverse("reportes:semana") + "?formato=xlsx")
+		entrada = EntradaCacheReporte.objects.get()
+		self.assertEqual(entrada.formato, "xlsx")
+
+		self.assertFalse(default_storage.exists(antigua.ruta))
+
+		# El reporte del historial se regenera al descargarlo
+		reporte = ReporteGenerado.objects.get(formato="pdf")
+		resp = self.client.get(reverse("reportes:descargar", args=[reporte.id]))
+		self.assertEqual(resp["Content-Type"], "application/pdf")
+		self.assertTrue(b"".join(resp.streaming_content).startswith(b"%PDF"))
+		reporte.refresh_from_db()
+		self.assertEqual(EntradaCacheReporte.objects.get().ruta, reporte.archivo_generado)
+		self.assertFalse(default_storage.exists(entrada.ruta))
+
+	def test_cache_compartida_por_alcance_de_visibilidad(self):
+		import openpyxl
+		from io import BytesIO
+		otro = User.objects.create_user(
+			username="otroadmin", email="otroadmin@example.com", password="testpass123"
+		)
+		otro.user_level = "MANAGER"
+		otro.save()
+		url = reverse("reportes:agenda") + "?formato=xlsx"
+		primera = b"".join(self.client.get(url).streaming_content)
+		self.client.force_login(otro)
+		resp = self.client.get(url)
+		contenido = b"".join(resp.streaming_content)
+		self.assertEqual(contenido, primera)
+		self.assertEqual(EntradaCacheReporte.objects.get().aciertos, 1)
+		wb = openpyxl.load_workbook(BytesIO(contenido))
+		celdas = [c.value for fila in wb["Eventos"].iter_rows(max_row=5) for c in fila]
+		self.assertFalse([c for c in celdas if isinstance(c, str) and c.startswith("Generado por")])
+
+		# Quien solo ve sus eventos tiene su propia entrada
+		otro.user_level = "USER"
+		otro.save()
+		b"".join(self.client.get(url).streaming_content)
+		self.assertEqual(EntradaCacheReporte.objects.count(), 2)
+
+	def test_pdf_por_bloques_de_pagina_y_compacto(self):
+		import io
+		import re
+		from django.core.management import call_command
+		from .generadores import escribir_pdf_eventos
+		from .management.commands.medir_reportes_pdf import eventos_sinteticos
+
+		eventos = eventos_sinteticos(300)
+		reporte = ReporteGenerado(
+			tipo="agenda", formato="pdf", titulo="Bloques", generado_por=self.user,
+			fecha_generacion=timezone.now(), total_eventos=len(eventos),
+		)
+		paginas = {}
+		for compacto in (False, True):
+			destino = io.BytesIO()
+			escribir_pdf_eventos(eventos, reporte, destino, compacto=compacto)
+			paginas[compacto] = len(re.findall(rb"/Type /Page\b", destino.getvalue()))
+		# 300 filas de 16 pt no caben en una página; en modo compacto caben más por página
+		self.assertGreater(paginas[False], 1)
+		self.assertLess(paginas[True], paginas[False])
+
+		salida = io.StringIO()
+		call_command("medir_reportes_pdf", "--filas", "50", "100", "--repeticiones", "1", stdout=salida)
+		self.assertEqual(len(salida.getvalue().splitlines()), 3)
+
+	def test_pdf_por_bloques_conserva_todas_las_filas(self):
+		import base64
+		import re
+		import zlib
+		from unittest import mock
+		from .formato import formatear_fecha_espanol
+		from .generadores import Table, escribir_pdf_eventos
+		from .management.commands.medir_reportes_pdf import eventos_sinteticos
+
+		eventos = eventos_sinteticos(300)
+		reporte = ReporteGenerado(
+			tipo="agenda", formato="pdf", titulo="Bloques", generado_por=self.user,
+			fecha_generacion=timezone.now(), total_eventos=len(eventos),
+		)
+		destino = io.BytesIO()
+		with mock.patch("apps.reportes.generadores.Table", wraps=Table) as tablas:
+			escribir_pdf_eventos(eventos, reporte, destino, compacto=True)
+		pdf = destino.getvalue()
+		paginas = len(re.findall(rb"/Type /Page\b", pdf))
+
+		# Contenido de cada página (ASCII85 + Flate, en el orden del documento)
+		contenidos = [
+			zlib.decompress(base64.a85decode(flujo.strip().removesuffix(b"~>")))
+			for flujo in re.findall(rb"/Filter \[ /ASCII85Decode /FlateDecode \][^>]*>>\s*stream\r?\n(.*?)endstream", pdf, re.S)
+		]
+		contenidos = [c for c in contenidos if b" Tj" in c]
+		self.assertEqual(len(contenidos), paginas)
+		# Una tabla por página (el compacto no tiene logo) y cada fila una sola vez
+		self.assertGreater(paginas, 1)
+		self.assertEqual(tablas.call_count, paginas)
+		fechas = [formatear_fecha_espanol(evento.fecha_evento).encode() for evento in eventos]
+		self.assertEqual(sum(c.count(b"(" + fecha + b")") for c in contenidos for fecha in fechas), 300)
+		self.assertIn(b"(" + fechas[-1] + b")", contenidos[-1])
+		self.assertIn(b"(" + fechas[0] + b")", contenidos[0])
+
+	def test_reporte_personalizado_con_filtros(self):
+		import openpyxl
+		hoy = timezone.now().date()
+		url = reverse("reportes:personalizado")
+		resp = self.client.get(url, {
+			"formato": "xlsx",
+			"fecha_inicio": hoy.isoformat(),
+			"fecha_fin": (hoy + timedelta(days=400)).isoformat(),
+			"prioridad": "alta",
+			"usuario": self.user.id,
+		})
+		self.assertEqual(resp.status_code, 200)
+		reporte = ReporteGenerado.objects.get()
+		self.assertEqual(reporte.tipo, "personalizado")
+		self.assertEqual((reporte.prioridad_filtro, reporte.usuario_filtro), ("alta", self.user))
+		self.assertEqual(reporte.total_eventos, 1)
+		ws = openpyxl.load_workbook(io.BytesIO(b"".join(resp.streaming_content))).active
+		self.assertEqual(ws["A6"].value, "Evento Semana")
+		self.assertIsNone(ws["A7"].value)
+
+		# Un usuario normal no puede filtrar por otro responsable
+		otro = User.objects.create_user(username="normal", email="normal@example.com", password="testpass123")
+		self.client.force_login(otro)
+		self.client.get(url, {"formato": "pdf", "usuario": self.user.id})
+		self.assertIsNone(ReporteGenerado.objects.get(generado_por=otro).usuario_filtro)
+
+	def test_reporte_personalizado_rango_invalido(self):
+		url = reverse("reportes:personalizado")
+		for params in ({"fecha_inicio": "2025-02-01", "fecha_fin": "2025-01-01"}, {"fecha_inicio": "2025-13-01"}):
+			resp = self.client.get(url, {"formato": "pdf", **params})
+			self.assertRedirects(resp, reverse("reportes:index"))
+		self.assertFalse(ReporteGenerado.objects.exists())
+
+	def test_reporte_en_una_consulta_de_lectura(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		Evento.objects.create(
+			nombre_evento="Evento Otro Responsable", fecha_evento=timezone.now().date() + timedelta(days=1),
+			hora_evento="09:00", usuario=User.objects.create_user(username="resp2", email="resp2@example.com", password="x"),
+		)
+		for formato, esperadas in (("pdf", 2), ("xlsx", 3)):
+			with CaptureQueriesContext(connection) as consultas:
+				resp = self.client.get(reverse("reportes:agenda") + f"?formato={formato}")
+				b"".join(resp.streaming_content)
+			sobre_eventos = [q["sql"] for q in consultas if 'FROM "eventos_evento"' in q["sql"]]
+			# Huella (incluye el conteo), [medidas de Excel] y la lectura con el responsable unido
+			self.assertEqual(len(sobre_eventos), esperadas, sobre_eventos)
+			self.assertIn("JOIN", sobre_eventos[-1])
+			self.assertNotIn('"eventos_evento"."observaciones"', sobre_eventos[-1])
+		self.assertEqual(set(ReporteGenerado.objects.values_list("total_eventos", flat=True)), {4})
+
+
+class FormatoFechasTests(SimpleTestCase):
+	def test_formato_en_espanol_sin_depender_del_locale(self):
+		import locale
+		from .formato import formatear_fecha_espanol, formatear_fecha_hora_espanol, formatear_mes_ano_espanol
+		original = locale.setlocale(locale.LC_TIME)
+		locale.setlocale(locale.LC_TIME, "C")
+		self.addCleanup(locale.setlocale, locale.LC_TIME, original)
+
+		self.assertEqual(formatear_fecha_espanol(date(2025, 9, 5)), "05 de septiembre de 2025")
+		self.assertEqual(formatear_mes_ano_espanol(date(2025, 1, 31)), "Enero 2025")
+		with override_settings(TIME_ZONE="America/Mexico_City"):
+			instante = timezone.make_aware(timezone.datetime(2025, 3, 1, 2, 30), timezone.get_fixed_timezone(0))
+			self.assertEqual(formatear_fecha_hora_espanol(instante), "28 de febrero de 2025 a las 20:30")
+		self.assertEqual(
+			formatear_fecha_hora_espanol(timezone.datetime(2025, 12, 24, 9, 5)),
+			"24 de diciembre de 2025 a las 09:05",
+		)
+
+	def test_benchmark_concurrente(self):
+		from io import StringIO
+		from django.core.management import call_command
+		salida = StringIO()
+		call_command("medir_formato_fechas", "--filas", "2000", "--hilos", "4", stdout=salida)
+		self.assertIn("4 hilos formatearon 2000 filas con resultados idénticos", salida.getvalue())
@@ -13,5 +13,7 @@ urlpatterns = [
     path('semana/', views.generar_reporte_semana, name='semana'),
     path('mes/', views.generar_reporte_mes, name='mes'),
     path('carpeta-ejecutiva/', views.generar_reporte_carpeta_ejecutiva, name='carpeta_ejecutiva'),
+    path('personalizado/', views.generar_reporte_personalizado, name='personalizado'),
     path('historial/', views.historial_reportes, name='historial'),
+    path('historial/<int:reporte_id>/descargar/', views.descargar_reporte, name='descargar'),
 ]
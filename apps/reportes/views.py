@@ -3,103 +3,31 @@ Vistas para la aplicación de reportes
 Sistema de generación de reportes para eventos de Mindara
 """
 
-from django.shortcuts import render, redirect
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags, quote_etag
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 from django.utils import timezone
-from django.db.models import Q
-from datetime import datetime, timedelta
-import os
-import io
-import locale
-from zoneinfo import ZoneInfo
-
-# Configurar idioma español para fechas
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_TIME, 'es_ES')
-    except:
-        pass  # Si no se puede configurar español, usar por defecto
-
-# Imports para generar archivos
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from openpyxl.drawing.image import Image as ExcelImage
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.units import inch
-from django.conf import settings
+from datetime import timedelta
 
+from apps.authentication.models import User
 from apps.eventos.models import Evento
+from core.consultas import presupuesto_consultas
+from .cache import clave_reporte, huella_datos
+from .formato import formatear_fecha_espanol, formatear_mes_ano_espanol
+from .generadores import TIPOS_CONTENIDO, eventos_del_reporte, generar_archivo, marcar_error
 from .models import ReporteGenerado
 
 
-def formatear_fecha_espanol(fecha):
-    """Formatear fecha en español"""
-    meses = {
-        'January': 'enero', 'February': 'febrero', 'March': 'marzo',
-        'April': 'abril', 'May': 'mayo', 'June': 'junio',
-        'July': 'julio', 'August': 'agosto', 'September': 'septiembre',
-        'October': 'octubre', 'November': 'noviembre', 'December': 'diciembre'
-    }
-    
-    fecha_str = fecha.strftime('%d de %B de %Y')
-    for ingles, espanol in meses.items():
-        fecha_str = fecha_str.replace(ingles, espanol)
-    
-    return fecha_str
-
-
-def formatear_fecha_hora_espanol(fecha):
-    """Formatear fecha y hora en español con zona horaria local"""
-    # Convertir a zona horaria local si la fecha está en UTC
-    if timezone.is_aware(fecha):
-        # Obtener la zona horaria configurada en Django usando zoneinfo (sin pytz)
-        try:
-            local_tz = ZoneInfo(settings.TIME_ZONE)
-            fecha_local = fecha.astimezone(local_tz)
-        except Exception:
-            # Fallback silencioso si la zona no existe; usar fecha tal cual
-            fecha_local = fecha
-    else:
-        fecha_local = fecha
-    
-    meses = {
-        'January': 'enero', 'February': 'febrero', 'March': 'marzo',
-        'April': 'abril', 'May': 'mayo', 'June': 'junio',
-        'July': 'julio', 'August': 'agosto', 'September': 'septiembre',
-        'October': 'octubre', 'November': 'noviembre', 'December': 'diciembre'
-    }
-    
-    fecha_str = fecha_local.strftime('%d de %B de %Y a las %H:%M')
-    for ingles, espanol in meses.items():
-        fecha_str = fecha_str.replace(ingles, espanol)
-    
-    return fecha_str
-
-
-def formatear_mes_ano_espanol(fecha):
-    """Formatear mes y año en español"""
-    meses = {
-        'January': 'Enero', 'February': 'Febrero', 'March': 'Marzo',
-        'April': 'Abril', 'May': 'Mayo', 'June': 'Junio',
-        'July': 'Julio', 'August': 'Agosto', 'September': 'Septiembre',
-        'October': 'Octubre', 'November': 'Noviembre', 'December': 'Diciembre'
-    }
-    
-    fecha_str = fecha.strftime('%B %Y')
-    for ingles, espanol in meses.items():
-        fecha_str = fecha_str.replace(ingles, espanol)
-    
-    return fecha_str
+# Con la cola activa (REPORTES_COLA), los reportes con más eventos que este
+# límite se encolan aunque se pidan en línea, para no bloquear a los workers web
+LIMITE_REPORTE_SINCRONO = 2000
 
 
 @method_decorator(login_required, name='dispatch')
@@ -117,108 +45,80 @@ class ReportesView(View):
             generado_por=request.user
         ).order_by('-fecha_generacion')[:10]
         
+        # Opciones del reporte personalizado
+        usuarios = None
+        if request.user.is_admin() or request.user.is_manager():
+            usuarios = (User.objects
+                        .filter(is_active=True)
+                        .only('id', 'username', 'first_name', 'last_name')
+                        .order_by('first_name', 'last_name', 'username'))
+        
         context = {
             'title': 'Reportes',
             'current_section': 'reportes',
             'reportes_recientes': reportes_recientes,
+            'usuarios': usuarios,
+            'prioridades': Evento.PRIORIDAD_CHOICES,
+            'etapas': Evento.ETAPA_CHOICES,
+            'cola_reportes': settings.REPORTES_COLA,
         }
         return render(request, 'reportes/index.html', context)
 
 
 @login_required
+@presupuesto_consultas(15)
 def generar_reporte_agenda(request):
     """Generar reporte de eventos en agenda (próximos eventos)"""
     formato = request.GET.get('formato', 'xlsx')
     incluir_detalles = request.GET.get('incluir_detalles', 'true') == 'true'
     solo_confirmados = request.GET.get('solo_confirmados', 'false') == 'true'
     
-    # Obtener eventos según el nivel del usuario
-    user = request.user
-    if user.is_admin() or user.is_manager():
-        eventos = Evento.objects.all()
-    else:
-        eventos = Evento.objects.filter(usuario=user)
-    
-    # Filtrar eventos futuros
+    # Eventos futuros
     hoy = timezone.now().date()
-    eventos = eventos.filter(fecha_evento__gte=hoy)
-    
-    if solo_confirmados:
-        eventos = eventos.filter(etapa='confirmado')
     
-    eventos = eventos.order_by('fecha_evento', 'hora_evento')
-    
-    # Crear registro del reporte
-    reporte = ReporteGenerado.objects.create(
+    reporte = ReporteGenerado(
         tipo='agenda',
         formato=formato,
         titulo='Eventos en Agenda',
-        generado_por=user,
+        generado_por=request.user,
+        fecha_inicio_filtro=hoy,
         incluir_detalles=incluir_detalles,
         solo_confirmados=solo_confirmados,
-        total_eventos=eventos.count()
     )
-    
-    if formato == 'xlsx':
-        return _generar_excel_eventos(eventos, reporte, incluir_detalles)
-    else:
-        return _generar_pdf_eventos(eventos, reporte, incluir_detalles)
+    return _despachar_reporte(request, reporte)
 
 
 @login_required
+@presupuesto_consultas(15)
 def generar_reporte_semana(request):
     """Generar reporte de eventos de la semana"""
     formato = request.GET.get('formato', 'xlsx')
     incluir_detalles = request.GET.get('incluir_detalles', 'true') == 'true'
     
-    # Obtener eventos según el nivel del usuario
-    user = request.user
-    if user.is_admin() or user.is_manager():
-        eventos = Evento.objects.all()
-    else:
-        eventos = Evento.objects.filter(usuario=user)
-    
     # Filtrar eventos de esta semana
     hoy = timezone.now().date()
     inicio_semana = hoy - timedelta(days=hoy.weekday())
     fin_semana = inicio_semana + timedelta(days=6)
     
-    eventos = eventos.filter(
-        fecha_evento__gte=inicio_semana,
-        fecha_evento__lte=fin_semana
-    ).order_by('fecha_evento', 'hora_evento')
-    
-    # Crear registro del reporte
-    reporte = ReporteGenerado.objects.create(
+    reporte = ReporteGenerado(
         tipo='semana',
         formato=formato,
         titulo=f'Eventos de la Semana ({inicio_semana.strftime("%d/%m")} - {formatear_fecha_espanol(fin_semana)})',
-        generado_por=user,
+        generado_por=request.user,
         fecha_inicio_filtro=inicio_semana,
         fecha_fin_filtro=fin_semana,
         incluir_detalles=incluir_detalles,
-        total_eventos=eventos.count()
     )
-    
-    if formato == 'xlsx':
-        return _generar_excel_eventos(eventos, reporte, incluir_detalles)
-    else:
-        return _generar_pdf_eventos(eventos, reporte, incluir_detalles)
+    return _despachar_reporte(request, reporte)
 
 
 @login_required
+@presupuesto_consultas(15)
 def generar_reporte_mes(request):
     """Generar reporte de eventos del mes"""
     formato = request.GET.get('formato', 'xlsx')
     incluir_detalles = request.GET.get('incluir_detalles', 'true') == 'true'
     
-    # Obtener eventos según el nivel del usuario
-    user = request.user
-    if user.is_admin() or user.is_manager():
-        eventos = Evento.objects.all()
-    else:
-        eventos = Evento.objects.filter(usuario=user)
-    
     # Filtrar eventos de este mes
     hoy = timezone.now().date()
     inicio_mes = hoy.replace(day=1)
@@ -227,284 +127,204 @@ def generar_reporte_mes(request):
     else:
         fin_mes = hoy.replace(month=hoy.month + 1, day=1) - timedelta(days=1)
     
-    eventos = eventos.filter(
-        fecha_evento__gte=inicio_mes,
-        fecha_evento__lte=fin_mes
-    ).order_by('fecha_evento', 'hora_evento')
-    
-    # Crear registro del reporte
-    reporte = ReporteGenerado.objects.create(
+    reporte = ReporteGenerado(
         tipo='mes',
         formato=formato,
         titulo=f'Eventos del Mes ({formatear_mes_ano_espanol(inicio_mes)})',
-        generado_por=user,
+        generado_por=request.user,
         fecha_inicio_filtro=inicio_mes,
         fecha_fin_filtro=fin_mes,
         incluir_detalles=incluir_detalles,
-        total_eventos=eventos.count()
     )
-    
-    if formato == 'xlsx':
-        return _generar_excel_eventos(eventos, reporte, incluir_detalles)
-    else:
-        return _generar_pdf_eventos(eventos, reporte, incluir_detalles)
+    return _despachar_reporte(request, reporte)
 
 
 @login_required
+@presupuesto_consultas(15)
 def generar_reporte_carpeta_ejecutiva(request):
     """Generar reporte de eventos con carpeta ejecutiva"""
     formato = request.GET.get('formato', 'xlsx')
     incluir_detalles = request.GET.get('incluir_detalles', 'true') == 'true'
     
-    # Obtener eventos según el nivel del usuario
-    user = request.user
-    if user.is_admin() or user.is_manager():
-        eventos = Evento.objects.all()
-    else:
-        eventos = Evento.objects.filter(usuario=user)
-    
-    # Filtrar eventos con carpeta ejecutiva
-    eventos = eventos.filter(carpeta_ejecutiva=True).order_by('fecha_evento', 'hora_evento')
-    
-    # Crear registro del reporte
-    reporte = ReporteGenerado.objects.create(
+    reporte = ReporteGenerado(
         tipo='carpeta_ejecutiva',
         formato=formato,
         titulo='Eventos con Carpeta Ejecutiva',
-        generado_por=user,
+        generado_por=request.user,
         incluir_detalles=incluir_detalles,
-        total_eventos=eventos.count()
     )
-    
-    if formato == 'xlsx':
-        return _generar_excel_eventos(eventos, reporte, incluir_detalles)
-    else:
-        return _generar_pdf_eventos(eventos, reporte, incluir_detalles)
+    return _despachar_reporte(request, reporte)
 
 
-def _generar_excel_eventos(eventos, reporte, incluir_detalles=True):
-    """Genera un archivo Excel con los eventos"""
-    
-    # Crear el workbook y worksheet
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Eventos"
-    
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Título del reporte alineado con logo
-    ws.merge_cells('A1:G1')
-    ws['A1'] = f"{reporte.titulo}"
-    ws['A1'].font = Font(bold=True, size=16)
-    ws['A1'].alignment = Alignment(horizontal="left", vertical="center")
+@login_required
+@presupuesto_consultas(15)
+def generar_reporte_personalizado(request):
+    """
+    Generar reporte de un rango de fechas arbitrario, con filtros opcionales
+    de responsable, prioridad y etapa
+    """
+    formato = request.GET.get('formato', 'xlsx')
+    incluir_detalles = request.GET.get('incluir_detalles', 'true') == 'true'
+    solo_confirmados = request.GET.get('solo_confirmados', 'false') == 'true'
     
-    # Intentar agregar logo en Excel al mismo nivel que el título
     try:
-        logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'img', 'logo_reportes.png')
-        if os.path.exists(logo_path):
-            img = ExcelImage(logo_path)
-            img.width = 75  # Aproximadamente 2 cm
-            img.height = 75  # Aproximadamente 2 cm
-            ws.add_image(img, 'H1')  # Colocar en columna H, misma fila que el título
-    except:
-        pass  # Si no se puede cargar el logo, continuar sin él
-    
-    # Información adicional
-    ws['A2'] = f"Generado por: {reporte.generado_por.get_full_name() or reporte.generado_por.username}"
-    ws['A3'] = f"Fecha de generación: {formatear_fecha_hora_espanol(reporte.fecha_generacion)}"
-    ws['A4'] = f"Total de eventos: {reporte.total_eventos}"
-    
-    # Encabezados de las columnas
-    row = 6
-    headers = ['Evento', 'Fecha', 'Hora', 'Sede', 'Prioridad', 'Estado', 'Responsable']
-    
-    if incluir_detalles:
-        headers.extend(['Objetivo', 'Participantes', 'Aforo', 'Duración'])
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = border
-    
-    # Datos de los eventos
-    row += 1
-    for evento in eventos:
-        col = 1
-        ws.cell(row=row, column=col, value=evento.nombre_evento).border = border
-        col += 1
-        ws.cell(row=row, column=col, value=formatear_fecha_espanol(evento.fecha_evento)).border = border
-        col += 1
-        ws.cell(row=row, column=col, value=evento.hora_evento.strftime('%H:%M')).border = border
-        col += 1
-        ws.cell(row=row, column=col, value=evento.sede).border = border
-        col += 1
-        ws.cell(row=row, column=col, value=evento.get_prioridad_display()).border = border
-        col += 1
-        ws.cell(row=row, column=col, value=evento.get_etapa_display()).border = border
-        col += 1
-        responsable = evento.usuario.get_full_name() or evento.usuario.username
-        ws.cell(row=row, column=col, value=responsable).border = border
-        
-        if incluir_detalles:
-            col += 1
-            ws.cell(row=row, column=col, value=evento.objetivo[:100] + ('...' if len(evento.objetivo) > 100 else '')).border = border
-            col += 1
-            ws.cell(row=row, column=col, value=evento.participantes).border = border
-            col += 1
-            ws.cell(row=row, column=col, value=evento.aforo).border = border
-            col += 1
-            ws.cell(row=row, column=col, value=f"{evento.duracion_real} hrs").border = border
-        
-        row += 1
-    
-    # Ajustar el ancho de las columnas
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Guardar el archivo en memoria
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Crear la respuesta HTTP
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        fecha_inicio = _fecha_parametro(request, 'fecha_inicio')
+        fecha_fin = _fecha_parametro(request, 'fecha_fin')
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('reportes:index')
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        messages.error(request, 'La fecha de inicio no puede ser posterior a la fecha de fin.')
+        return redirect('reportes:index')
+    
+    prioridad = request.GET.get('prioridad', '')
+    etapa = request.GET.get('etapa', '')
+    if prioridad not in dict(Evento.PRIORIDAD_CHOICES):
+        prioridad = ''
+    if etapa not in dict(Evento.ETAPA_CHOICES):
+        etapa = ''
+    
+    # Solo administradores y managers pueden elegir otro responsable
+    responsable = None
+    usuario_id = request.GET.get('usuario', '')
+    if usuario_id.isdigit() and (request.user.is_admin() or request.user.is_manager()):
+        responsable = User.objects.filter(pk=usuario_id).first()
+    
+    if fecha_inicio and fecha_fin:
+        rango = f'del {formatear_fecha_espanol(fecha_inicio)} al {formatear_fecha_espanol(fecha_fin)}'
+    elif fecha_inicio:
+        rango = f'desde el {formatear_fecha_espanol(fecha_inicio)}'
+    elif fecha_fin:
+        rango = f'hasta el {formatear_fecha_espanol(fecha_fin)}'
+    else:
+        rango = 'sin rango de fechas'
+    detalles = [rango]
+    if responsable:
+        detalles.append(responsable.get_full_name() or responsable.username)
+    if prioridad:
+        detalles.append(f'prioridad {dict(Evento.PRIORIDAD_CHOICES)[prioridad]}')
+    if etapa:
+        detalles.append(f'etapa {dict(Evento.ETAPA_CHOICES)[etapa]}')
+    
+    reporte = ReporteGenerado(
+        tipo='personalizado',
+        formato=formato,
+        titulo=f'Eventos ({", ".join(detalles)})'[:200],
+        generado_por=request.user,
+        fecha_inicio_filtro=fecha_inicio,
+        fecha_fin_filtro=fecha_fin,
+        usuario_filtro=responsable,
+        prioridad_filtro=prioridad,
+        etapa_filtro=etapa,
+        incluir_detalles=incluir_detalles,
+        solo_confirmados=solo_confirmados,
     )
-    response['Content-Disposition'] = f'attachment; filename="{reporte.nombre_archivo}"'
+    return _despachar_reporte(request, reporte)
+
+
+def _fecha_parametro(request, nombre):
+    """Fecha AAAA-MM-DD de la querystring; None si viene vacía"""
+    valor = request.GET.get(nombre, '').strip()
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValueError(f'Fecha inválida: {valor}. Usa el formato AAAA-MM-DD.')
+    return fecha
+
+
+def _despachar_reporte(request, reporte):
+    """
+    Registra el reporte y lo genera en línea, o, si hay cola (REPORTES_COLA),
+    lo deja en ella cuando se pide en segundo plano (?asincrono=true) o supera
+    LIMITE_REPORTE_SINCRONO.
+    Si el cliente ya tiene la versión vigente (If-None-Match) responde 304.
+    """
+    if reporte.formato not in TIPOS_CONTENIDO:
+        reporte.formato = 'pdf'
+    reporte.compacto = request.GET.get('compacto', 'false') == 'true'
+    eventos = eventos_del_reporte(reporte)
+    cola = settings.REPORTES_COLA
+    asincrono = cola and request.GET.get('asincrono', 'false') == 'true'
+    
+    # La huella de los datos incluye el conteo: no hace falta un COUNT aparte.
+    # total_eventos se actualiza con lo escrito al generar el archivo.
+    huella = huella_datos(eventos)
+    reporte.total_eventos = huella[0]
+    clave = None
+    if not asincrono:
+        clave = clave_reporte(reporte, huella)
+        if _etag_vigente(request, clave):
+            return _no_modificado(clave)
+    
+    asincrono = asincrono or (cola and reporte.total_eventos > LIMITE_REPORTE_SINCRONO)
+    reporte.estado = 'pendiente' if asincrono else 'procesando'
+    if not asincrono:
+        reporte.fecha_inicio_proceso = timezone.now()
+        reporte.intentos = 1
+    reporte.save()
+    
+    if asincrono:
+        messages.info(
+            request,
+            f'"{reporte.titulo}" se está generando en segundo plano. '
+            'Podrás descargarlo desde el historial cuando esté listo.'
+        )
+        return redirect('reportes:historial')
     
+    try:
+        generar_archivo(reporte, eventos, clave)
+    except Exception as e:
+        marcar_error(reporte, e)
+        raise
+    return _respuesta_archivo(reporte)
+
+
+def _etag_vigente(request, clave):
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return bool(clave) and (quote_etag(clave) in etags or '*' in etags)
+
+
+def _no_modificado(clave):
+    response = HttpResponseNotModified()
+    response['ETag'] = quote_etag(clave)
     return response
 
 
-def _generar_pdf_eventos(eventos, reporte, incluir_detalles=True):
-    """Genera un archivo PDF con los eventos"""
-    
-    # Crear el buffer
-    buffer = io.BytesIO()
-    
-    # Crear el documento
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    
-    # Estilos
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        spaceAfter=30,
-        alignment=1  # Center
+def _respuesta_archivo(reporte):
+    """Envía por bloques el archivo guardado de un reporte"""
+    response = FileResponse(
+        default_storage.open(reporte.archivo_generado, 'rb'),
+        content_type=TIPOS_CONTENIDO[reporte.formato]
     )
-    
-    # Crear encabezado con título y logo al mismo nivel
-    header_data = []
-    
-    # Crear el título
-    title_text = f"{reporte.titulo}"
-    title_para = Paragraph(title_text, title_style)
-    
-    # Intentar agregar logo al mismo nivel
-    logo_element = None
-    try:
-        logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'img', 'logo_reportes.png')
-        if os.path.exists(logo_path):
-            logo_element = Image(logo_path, width=2*inch/2.54, height=2*inch/2.54)  # 2 cm cuadrados
-    except:
-        pass  # Si no se puede cargar el logo, continuar sin él
-    
-    # Crear tabla para alinear título y logo
-    if logo_element:
-        header_table = Table([[title_para, logo_element]], colWidths=[4.5*inch, 2*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),   # Título a la izquierda
-            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),  # Logo a la derecha
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),  # Centrar verticalmente
-        ]))
-        elements.append(header_table)
-    else:
-        elements.append(title_para)
-    
-    elements.append(Spacer(1, 20))
-    
-    # Información del reporte
-    info_style = styles['Normal']
-    info_data = [
-        f"Generado por: {reporte.generado_por.get_full_name() or reporte.generado_por.username}",
-        f"Fecha de generación: {formatear_fecha_hora_espanol(reporte.fecha_generacion)}",
-        f"Total de eventos: {reporte.total_eventos}"
-    ]
-    
-    for info in info_data:
-        elements.append(Paragraph(info, info_style))
-    
-    elements.append(Spacer(1, 20))
-    
-    # Crear la tabla
-    data = [['Evento', 'Fecha', 'Hora', 'Sede', 'Prioridad', 'Estado', 'Responsable']]
-    
-    for evento in eventos:
-        responsable = evento.usuario.get_full_name() or evento.usuario.username
-        row = [
-            evento.nombre_evento[:30] + ('...' if len(evento.nombre_evento) > 30 else ''),
-            formatear_fecha_espanol(evento.fecha_evento),
-            evento.hora_evento.strftime('%H:%M'),
-            evento.sede[:20] + ('...' if len(evento.sede) > 20 else ''),
-            evento.get_prioridad_display(),
-            evento.get_etapa_display(),
-            responsable[:20] + ('...' if len(responsable) > 20 else '')
-        ]
-        data.append(row)
-    
-    # Crear la tabla
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),  # Color del header igual al Excel
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),  # Fondo blanco para las celdas
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    
-    # Construir el PDF
-    doc.build(elements)
-    
-    # Crear la respuesta
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="{reporte.nombre_archivo}"'
-    
+    if reporte.clave_cache:
+        response['ETag'] = quote_etag(reporte.clave_cache)
     return response
 
 
 @login_required
+def descargar_reporte(request, reporte_id):
+    """
+    Descargar de nuevo un reporte ya generado. Si la caché desalojó su
+    archivo, se regenera con los mismos filtros y los datos actuales.
+    """
+    reporte = get_object_or_404(ReporteGenerado, pk=reporte_id, generado_por=request.user)
+    if not reporte.disponible:
+        messages.warning(request, 'El reporte aún no está disponible para descarga.')
+        return redirect('reportes:historial')
+    if _etag_vigente(request, reporte.clave_cache):
+        return _no_modificado(reporte.clave_cache)
+    if not default_storage.exists(reporte.archivo_generado):
+        generar_archivo(reporte)
+    return _respuesta_archivo(reporte)
+
+
+@login_required
+@presupuesto_consultas(10)
 def historial_reportes(request):
     """Vista para mostrar el historial de reportes generados"""
     reportes = ReporteGenerado.objects.filter(
@@ -515,5 +335,6 @@ def historial_reportes(request):
         'title': 'Historial de Reportes',
         'current_section': 'reportes',
         'reportes': reportes,
+        'hay_pendientes': reportes.filter(estado__in=['pendiente', 'procesando']).exists(),
     }
     return render(request, 'reportes/historial.html', context)
@@ -0,0 +1,117 @@
+"""
+Registro de consultas SQL por petición
+Cuenta las consultas y su tiempo total y las agrupa por plantilla (el SQL con
+marcadores de parámetros, con las listas IN y VALUES colapsadas): la misma
+plantilla repetida muchas veces en una petición suele ser un patrón N+1.
+
+El registro se instala como execute_wrapper en cada conexión y solo mide
+dentro de `registrar_consultas()`. Los registros activos viven en una
+ContextVar, así que también cubren las vistas asíncronas (sync_to_async copia
+el contexto al hilo que usa la base de datos) y pueden anidarse: el
+middleware y las pruebas miden la misma petición.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+_registros_activos = ContextVar('registros_consultas', default=())
+
+
+def plantilla_sql(sql):
+    """`sql` sin la longitud variable de las listas IN (%s, ...) y VALUES"""
+    sql = re.sub(r'\(%s(?:, %s)+\)', '(%s, ...)', sql)
+    return re.sub(r'(\([^()]*\))(?:, \1)+', r'\1, ...', sql)
+
+
+class RegistroConsultas:
+    """Consultas ejecutadas mientras el registro está activo"""
+
+    def __init__(self):
+        self.total = 0
+        self.duracion = 0.0  # segundos
+        self.plantillas = Counter()
+
+    def agregar(self, sql, duracion):
+        self.total += 1
+        self.duracion += duracion
+        self.plantillas[plantilla_sql(sql)] += 1
+
+    def repetidas(self, minimo):
+        """(plantilla, veces) ejecutadas al menos `minimo` veces, de más a menos"""
+        return [(plantilla, veces) for plantilla, veces in self.plantillas.most_common() if veces >= minimo]
+
+    def resumen(self, cantidad=3):
+        """Texto con las plantillas más repetidas (para logs y fallos de pruebas)"""
+        return '; '.join(
+            f'{veces}x {plantilla[:200]}' for plantilla, veces in self.plantillas.most_common(cantidad)
+        )
+
+
+def _medir(execute, sql, params, many, context):
+    registros = _registros_activos.get()
+    if not registros:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        for registro in registros:
+            registro.agregar(sql, duracion)
+
+
+def _instalar(conexion):
+    if _medir not in conexion.execute_wrappers:
+        conexion.execute_wrappers.append(_medir)
+
+
+@receiver(connection_created)
+def _conexion_creada(sender, connection, **kwargs):
+    _instalar(connection)
+
+
+@contextmanager
+def registrar_consultas(registro=None):
+    """
+    Mide las consultas ejecutadas dentro del bloque; produce el
+    RegistroConsultas. Con `registro` sigue sumando en uno ya existente (el
+    middleware lo reactiva mientras se consume una respuesta en streaming).
+    """
+    # Conexiones abiertas antes de importar este módulo
+    for conexion in connections.all(initialized_only=True):
+        _instalar(conexion)
+    if registro is None:
+        registro = RegistroConsultas()
+    token = _registros_activos.set(_registros_activos.get() + (registro,))
+    try:
+        yield registro
+    finally:
+        _registros_activos.reset(token)
+
+
+def presupuesto_consultas(maximo):
+    """
+    Declara en una vista el máximo de consultas por petición (incluidas las
+    de sesión y autenticación). El middleware registra las peticiones que lo
+    exceden y PresupuestoConsultasMixin lo exige en las pruebas.
+    """
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
+
+
+def presupuesto_de(vista):
+    """Presupuesto declarado en la función de vista o en su clase (as_view)"""
+    presupuesto = getattr(vista, 'presupuesto_consultas', None)
+    if presupuesto is None:
+        presupuesto = getattr(getattr(vista, 'view_class', None), 'presupuesto_consultas', None)
+    return presupuesto
@@ -1,10 +1,16 @@
+import logging
 import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.contrib import auth
 from django.utils.deprecation import MiddlewareMixin
 from django.shortcuts import redirect
 from urllib.parse import urlencode
 
+from .consultas import presupuesto_de, registrar_consultas
+
+logger = logging.getLogger('core.consultas')
+
 class IdleSessionMiddleware(MiddlewareMixin):
     """Cierra la sesión si el usuario supera el periodo de inactividad definido.
 
@@ -41,3 +47,96 @@ class IdleSessionMiddleware(MiddlewareMixin):
             sep = '&' if '?' in login_url else '?'
             return redirect(f"{login_url}{sep}{urlencode({'expired': 1})}")
         session[key] = now
+
+
+class PresupuestoConsultasMiddleware:
+    """Mide las consultas SQL de cada petición.
+
+    - Agrega `Server-Timing` con el tiempo en base de datos, el número de
+      consultas y el tiempo total si settings.CONSULTAS_SERVER_TIMING (por
+      defecto solo con DEBUG: expone tiempos internos).
+    - Registra en el logger `core.consultas` las peticiones que exceden el
+      presupuesto declarado con @presupuesto_consultas o que repiten una misma
+      plantilla de SQL settings.CONSULTAS_REPETICIONES_ALERTA veces (N+1),
+      con las plantillas más repetidas.
+    - Va antes de sesión y autenticación para contar también sus consultas.
+    - En las respuestas en streaming sigue contando mientras se consume el
+      contenido y registra al terminar; la cabecera, enviada antes del
+      contenido, solo cubre la parte previa.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        with registrar_consultas() as registro:
+            response = self.get_response(request)
+        return self._reportar(request, response, registro, inicio)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        with registrar_consultas() as registro:
+            response = await self.get_response(request)
+        return self._reportar(request, response, registro, inicio)
+
+    def _reportar(self, request, response, registro, inicio):
+        if settings.CONSULTAS_SERVER_TIMING:
+            total_ms = (time.perf_counter() - inicio) * 1000
+            response['Server-Timing'] = (
+                f'db;dur={registro.duracion * 1000:.1f};desc="{registro.total} consultas", total;dur={total_ms:.1f}'
+            )
+        if not response.streaming:
+            self._registrar(request, registro, inicio)
+        elif response.is_async:
+            response.streaming_content = self._acontar_flujo(response.streaming_content, request, registro, inicio)
+        else:
+            response.streaming_content = self._contar_flujo(response.streaming_content, request, registro, inicio)
+        return response
+
+    def _contar_flujo(self, contenido, request, registro, inicio):
+        # El registro se reactiva en cada fragmento: el contexto de la
+        # petición ya terminó cuando el servidor consume el contenido
+        try:
+            iterador = iter(contenido)
+            while True:
+                with registrar_consultas(registro):
+                    try:
+                        fragmento = next(iterador)
+                    except StopIteration:
+                        return
+                yield fragmento
+        finally:
+            self._registrar(request, registro, inicio)
+
+    async def _acontar_flujo(self, contenido, request, registro, inicio):
+        try:
+            iterador = aiter(contenido)
+            while True:
+                with registrar_consultas(registro):
+                    try:
+                        fragmento = await anext(iterador)
+                    except StopAsyncIteration:
+                        return
+                yield fragmento
+        finally:
+            self._registrar(request, registro, inicio)
+
+    def _registrar(self, request, registro, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = registro.duracion * 1000
+        resolver_match = getattr(request, 'resolver_match', None)
+        presupuesto = presupuesto_de(resolver_match.func) if resolver_match else None
+        excedido = presupuesto is not None and registro.total > presupuesto
+        if excedido or registro.repetidas(settings.CONSULTAS_REPETICIONES_ALERTA):
+            logger.warning(
+                '%s %s: %d consultas (presupuesto %s) en %.1f ms de %.1f ms. Más repetidas: %s',
+                request.method, request.path, registro.total, presupuesto if presupuesto is not None else '-',
+                db_ms, total_ms, registro.resumen(),
+            )
@@ -0,0 +1,35 @@
+"""
+Utilidades para las pruebas
+"""
+
+from urllib.parse import urlsplit
+
+from django.urls import resolve
+
+from .consultas import presupuesto_de, registrar_consultas
+
+
+class PresupuestoConsultasMixin:
+    """
+    Para TestCase: `assertDentroDelPresupuesto(url)` hace la petición con
+    self.client y falla si la vista no declara @presupuesto_consultas o si la
+    petición lo excede (el mensaje incluye las consultas más repetidas).
+    Las respuestas en streaming se consumen dentro de la medición.
+    """
+
+    def assertDentroDelPresupuesto(self, url, data=None, metodo='get', **extra):
+        vista = resolve(urlsplit(url).path).func
+        presupuesto = presupuesto_de(vista)
+        if presupuesto is None:
+            self.fail(f'{url} no declara presupuesto de consultas')
+        with registrar_consultas() as registro:
+            respuesta = getattr(self.client, metodo)(url, data, **extra)
+            if respuesta.streaming:
+                # El contenido se genera al consumirlo: también cuenta
+                respuesta.streaming_content = list(respuesta.streaming_content)
+        if registro.total > presupuesto:
+            self.fail(
+                f'{url}: {registro.total} consultas, presupuesto {presupuesto}. '
+                f'Más repetidas: {registro.resumen()}'
+            )
+        return respuesta
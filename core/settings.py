@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'apps.eventos',
     'apps.notificaciones',
     'apps.reportes',
+    'apps.busqueda',
 ]
 
 # Ajustes de tipos MIME en algunos entornos minimalistas (Render) donde .css/.js pueden resolverse a text/plain
@@ -48,6 +49,8 @@ mimetypes.add_type("application/javascript", ".js")
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',  # Recomendado primero
     'whitenoise.middleware.WhiteNoiseMiddleware',     # Justo después de Security
+    # Conteo de consultas por petición (antes de sesión y autenticación)
+    'core.middleware.PresupuestoConsultasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -150,6 +153,32 @@ if os.environ.get('FORCE_SIMPLE_STATIC', '0') == '1':
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cola de reportes (`manage.py procesar_reportes`). Activarla solo donde un
+# worker procese la cola y comparta MEDIA_ROOT con el servicio web: sin él,
+# los reportes encolados nunca se generan. Desactivada, todo reporte se genera
+# en la petición.
+REPORTES_COLA = config('REPORTES_COLA', default=False, cast=bool)
+
+# Caché de reportes generados en MEDIA_ROOT/reportes/cache (LRU con tope de tamaño)
+REPORTES_CACHE_MAX_BYTES = config('REPORTES_CACHE_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+REPORTES_CACHE_MAX_ENTRADAS = config('REPORTES_CACHE_MAX_ENTRADAS', default=1000, cast=int)
+
+# Difusión de cambios de notificaciones a las conexiones SSE:
+# DifusionLocal (un solo proceso) o DifusionPostgres (LISTEN/NOTIFY, varios workers)
+NOTIFICACIONES_DIFUSION = config('NOTIFICACIONES_DIFUSION', default='apps.notificaciones.difusion.DifusionLocal')
+# Segundos entre latidos de la conexión SSE (mantienen vivos los proxies)
+NOTIFICACIONES_SSE_LATIDO = config('NOTIFICACIONES_SSE_LATIDO', default=20, cast=int)
+# Bandeja por usuario (BandejaNotificacion) poblada al crear o redirigir una
+# notificación; si se desactiva, el targeting se resuelve en cada lectura.
+# Al activarla sobre datos existentes ejecutar reconciliar_bandejas_notificaciones
+NOTIFICACIONES_BANDEJA = config('NOTIFICACIONES_BANDEJA', default=True, cast=bool)
+
+# Medición de consultas por petición (core.middleware.PresupuestoConsultasMiddleware):
+# cabecera Server-Timing (solo con DEBUG salvo que se active: expone tiempos internos)
+# y repeticiones de una misma consulta que se registran como N+1
+CONSULTAS_SERVER_TIMING = config('CONSULTAS_SERVER_TIMING', default=DEBUG, cast=bool)
+CONSULTAS_REPETICIONES_ALERTA = config('CONSULTAS_REPETICIONES_ALERTA', default=10, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -176,6 +205,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'core.consultas': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     }
 }
 
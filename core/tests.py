@@ -0,0 +1,107 @@
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from apps.authentication.models import User
+from .consultas import plantilla_sql, presupuesto_consultas, registrar_consultas
+from .pruebas import PresupuestoConsultasMixin
+
+
+@presupuesto_consultas(3)
+def _vista_n_mas_uno(request):
+	# Una consulta por usuario: el patrón que el middleware debe señalar
+	nombres = [User.objects.get(pk=pk).username for pk in User.objects.values_list('pk', flat=True)]
+	return JsonResponse({'nombres': nombres})
+
+
+def _vista_sin_presupuesto(request):
+	return JsonResponse({'total': User.objects.count()})
+
+
+@presupuesto_consultas(3)
+def _vista_streaming(request):
+	# Las consultas se ejecutan al consumir el contenido, después de la vista
+	def nombres():
+		for pk in User.objects.order_by('pk').values_list('pk', flat=True):
+			yield f'{User.objects.get(pk=pk).username}\n'
+	return StreamingHttpResponse(nombres())
+
+
+@presupuesto_consultas(3)
+async def _vista_streaming_async(request):
+	async def nombres():
+		async for pk in User.objects.order_by('pk').values_list('pk', flat=True):
+			yield f'{(await User.objects.aget(pk=pk)).username}\n'
+	return StreamingHttpResponse(nombres())
+
+
+urlpatterns = [
+	path('n-mas-uno/', _vista_n_mas_uno),
+	path('sin-presupuesto/', _vista_sin_presupuesto),
+	path('streaming/', _vista_streaming),
+	path('streaming-async/', _vista_streaming_async),
+]
+
+
+@override_settings(ROOT_URLCONF='core.tests', CONSULTAS_REPETICIONES_ALERTA=3)
+class PresupuestoConsultasTests(PresupuestoConsultasMixin, TestCase):
+	def setUp(self):
+		for i in range(4):
+			User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com', password='pass1234')
+
+	def test_plantillas_colapsan_listas(self):
+		self.assertEqual(
+			plantilla_sql('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+			plantilla_sql('SELECT 1 FROM t WHERE id IN (%s, %s)'),
+		)
+		self.assertEqual(
+			plantilla_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+			'INSERT INTO t (a, b) VALUES (%s, ...), ...',
+		)
+
+	def test_registros_anidados(self):
+		with registrar_consultas() as externo:
+			User.objects.count()
+			with registrar_consultas() as interno:
+				User.objects.count()
+		self.assertEqual((externo.total, interno.total), (2, 1))
+		self.assertEqual(externo.repetidas(2)[0][1], 2)
+
+	def test_server_timing(self):
+		with self.settings(CONSULTAS_SERVER_TIMING=True):
+			resp = self.client.get('/sin-presupuesto/')
+		self.assertRegex(resp['Server-Timing'], r'^db;dur=[\d.]+;desc="1 consultas", total;dur=[\d.]+$')
+		with self.settings(CONSULTAS_SERVER_TIMING=False):
+			self.assertNotIn('Server-Timing', self.client.get('/sin-presupuesto/'))
+
+	def test_cuenta_consultas_del_streaming(self):
+		resp = self.client.get('/streaming/')
+		with self.assertLogs('core.consultas', 'WARNING') as logs:
+			self.assertEqual(b''.join(resp.streaming_content), b'u0\nu1\nu2\nu3\n')
+		self.assertIn('GET /streaming/: 5 consultas (presupuesto 3)', logs.output[0])
+		with self.assertRaisesMessage(AssertionError, '5 consultas, presupuesto 3'):
+			self.assertDentroDelPresupuesto('/streaming/')
+
+	async def test_cuenta_consultas_del_streaming_async(self):
+		resp = await self.async_client.get('/streaming-async/')
+		with self.assertLogs('core.consultas', 'WARNING') as logs:
+			contenido = [fragmento async for fragmento in resp.streaming_content]
+		self.assertEqual(b''.join(contenido), b'u0\nu1\nu2\nu3\n')
+		self.assertIn('GET /streaming-async/: 5 consultas (presupuesto 3)', logs.output[0])
+
+	def test_registra_n_mas_uno_y_presupuesto_excedido(self):
+		with self.assertLogs('core.consultas', 'WARNING') as logs:
+			self.client.get('/n-mas-uno/')
+		self.assertIn('GET /n-mas-uno/: 5 consultas (presupuesto 3)', logs.output[0])
+		self.assertIn('4x SELECT', logs.output[0])
+
+		with self.assertNoLogs('core.consultas'):
+			self.client.get('/sin-presupuesto/')
+
+	def test_helper_de_pruebas(self):
+		with self.assertRaisesMessage(AssertionError, '5 consultas, presupuesto 3'):
+			self.assertDentroDelPresupuesto('/n-mas-uno/')
+		with self.assertRaisesMessage(AssertionError, 'no declara presupuesto'):
+			self.assertDentroDelPresupuesto('/sin-presupuesto/')
+		User.objects.exclude(username='u0').delete()
+		self.assertEqual(self.assertDentroDelPresupuesto('/n-mas-uno/').json(), {'nombres': ['u0']})